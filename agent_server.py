@@ -1,16 +1,32 @@
+import logging
+import os
+import sys
+
 from flask import Flask, request, jsonify
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "coralizer"))
+from coral_runtime.logs import configure_logging
+from coral_runtime.metrics import invocation, metrics_from_env
+from coral_runtime.profiler import profile_from_env
+
+logger = logging.getLogger("agent_server")
+
 app = Flask(__name__)
 
 @app.route('/agent', methods=['POST'])
 def handle_message():
-    data = request.json
-    print(f"Received message: {data}")
-    
-    return jsonify({
-        "content": f"Echo: {data.get('content')}",
-        "type": "response"
-    })
+    with invocation("agent_server"):
+        data = request.json
+        # Bodies are only logged at DEBUG (CORAL_LOG_LEVEL=DEBUG), clipped to CORAL_LOG_MAX_FIELD.
+        logger.debug(f"Received message: {data}", extra={"event": "request"})
+
+        return jsonify({
+            "content": f"Echo: {data.get('content')}",
+            "type": "response"
+        })
 
 if __name__ == '__main__':
+    configure_logging()
+    profile_from_env("agent_server")
+    metrics_from_env("agent_server")
     app.run(port=6001)
@@ -0,0 +1,116 @@
+"""Prompt size over a long CAMEL agent run: ChatHistoryMemory vs. TokenBoundedMemory.
+
+Replays ``--steps`` steps of the search agent's loop straight into each memory,
+with no model calls. Each step is the automated nudge, a ``wait_for_mentions``
+call and its result, and a short reply. Every tenth step also carries a task: a
+search call with a sizeable result and a ``send_message`` back. The report
+shows the context the model would get (tokens), how long building it takes,
+and how many records are stored.
+
+The baseline uses the settings from ``examples/camel-search-maths/config.py``.
+Tokens are counted as JSON characters / 4 so the benchmark runs offline.
+
+    cd coralizer && python -m benchmarks.bench_camel_memory --steps 1000
+"""
+import argparse
+import json
+import logging
+import time
+
+from camel.memories import ChatHistoryMemory, MemoryRecord, ScoreBasedContextCreator
+from camel.messages import BaseMessage, FunctionCallingMessage
+from camel.types import OpenAIBackendRole, RoleType
+from camel.utils import BaseTokenCounter
+
+from coral_runtime.camel_memory import TokenBoundedMemory
+
+MESSAGE_WINDOW_SIZE = 4096 * 50
+TOKEN_LIMIT = 20000
+NUDGE = "[automated] continue collaborating with other agents. make sure to mention agents you intend to communicate with"
+SYSTEM = "You are a helpful assistant responsible for doing search operations. " * 20
+
+
+class ApproxTokenCounter(BaseTokenCounter):
+    def count_tokens_from_messages(self, messages):
+        return sum(len(json.dumps(message)) // 4 + 3 for message in messages)
+
+    def encode(self, text):
+        return list(text.encode())
+
+    def decode(self, token_ids):
+        return bytes(token_ids).decode()
+
+
+def record(message, role):
+    return MemoryRecord(message=message, role_at_backend=role)
+
+
+def call(name, args, call_id):
+    return record(FunctionCallingMessage(role_name="search_agent", role_type=RoleType.ASSISTANT, meta_dict=None,
+                                         content="", func_name=name, args=args, tool_call_id=call_id),
+                  OpenAIBackendRole.ASSISTANT)
+
+
+def result(name, value, call_id):
+    return record(FunctionCallingMessage(role_name="search_agent", role_type=RoleType.ASSISTANT, meta_dict=None,
+                                         content="", func_name=name, result=value, tool_call_id=call_id),
+                  OpenAIBackendRole.FUNCTION)
+
+
+def step_records(step: int):
+    records = [record(BaseMessage.make_user_message("user", NUDGE), OpenAIBackendRole.USER)]
+    task = step % 10 == 0
+    mention = f"<message threadId='t{step}' senderId='user_interaction_agent' content='search for topic {step}'/>"
+    records += [
+        call("wait_for_mentions", {"timeoutMs": 8000}, f"w{step}"),
+        result("wait_for_mentions", mention if task else "No new messages", f"w{step}"),
+    ]
+    if task:
+        records += [
+            call("search_google", {"query": f"topic {step}"}, f"s{step}"),
+            result("search_google", json.dumps([{"title": f"Result {i} for topic {step}", "snippet": "lorem ipsum " * 20}
+                                                for i in range(5)]), f"s{step}"),
+            call("send_message", {"threadId": f"t{step}", "content": f"Findings on topic {step}...",
+                                  "mentions": ["user_interaction_agent"]}, f"m{step}"),
+            result("send_message", "Message sent", f"m{step}"),
+        ]
+    reply = f"Sent the findings on topic {step}." if task else "No tasks yet; waiting for mentions."
+    records.append(record(BaseMessage.make_assistant_message("search_agent", reply), OpenAIBackendRole.ASSISTANT))
+    return records
+
+
+def run(memory, steps: int, checkpoints):
+    memory.write_record(record(BaseMessage.make_assistant_message("search_agent", SYSTEM), OpenAIBackendRole.SYSTEM))
+    rows = []
+    for step in range(1, steps + 1):
+        memory.write_records(step_records(step))
+        if step in checkpoints:
+            started = time.perf_counter()
+            _, tokens = memory.get_context()
+            elapsed = time.perf_counter() - started
+            rows.append((step, tokens, elapsed, len(memory.retrieve())))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--budget", type=int, default=8000, help="TokenBoundedMemory token budget")
+    args = parser.parse_args()
+    logging.getLogger("camel").setLevel(logging.ERROR)
+
+    checkpoints = sorted({s for s in (10, 50, 100, 250, 500, 750, 1000, args.steps) if s <= args.steps})
+    creator = ScoreBasedContextCreator(ApproxTokenCounter(), TOKEN_LIMIT)
+    memories = {
+        "ChatHistoryMemory": ChatHistoryMemory(creator, window_size=MESSAGE_WINDOW_SIZE),
+        f"TokenBoundedMemory({args.budget})": TokenBoundedMemory(creator, token_budget=args.budget),
+    }
+    for name, memory in memories.items():
+        print(name)
+        print(f"  {'step':>6} {'prompt tokens':>14} {'get_context':>12} {'records':>8}")
+        for step, tokens, elapsed, records in run(memory, args.steps, checkpoints):
+            print(f"  {step:>6} {tokens:>14} {elapsed * 1000:>9.1f} ms {records:>8}")
+
+
+if __name__ == "__main__":
+    main()
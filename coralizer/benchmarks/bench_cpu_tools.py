@@ -0,0 +1,108 @@
+"""Event-loop lag under a mixed tool load: CPU-bound tools inline, in threads, in processes.
+
+While ``LoopLag`` samples the loop, as a stand-in for the Coral stream reader,
+the agent runs ``--rounds`` rounds of tool calls. Each round has ``--io``
+fetches (a blocking ``--io-ms`` wait in a thread) and ``--cpu`` context scans
+like ``get_url_content_with_context``'s over a ``--page-kb`` KB page. The scans
+run:
+
+- ``inline``: on the loop, as CAMEL runs sync tools;
+- ``threads``: in a thread pool, as ``create_concurrent_executor`` ran all sync tools;
+- ``processes/page``: in the process pool, with the page sent over as an argument;
+- ``processes/url``: in the process pool, fetching the page in the worker so only
+  the URL and the matches are pickled.
+
+    cd coralizer && python -m benchmarks.bench_cpu_tools
+"""
+import argparse
+import asyncio
+import functools
+import pickle
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from coral_runtime.cpu_pool import LoopLag, process_pool, run_in, shutdown_process_pool
+
+PARAGRAPH = ("## Section\n\nLorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor "
+             "incididunt ut labore et dolore magna aliqua. Coral [link](https://example.com/page)\n\n")
+
+
+@functools.lru_cache(maxsize=4)
+def fetch(url: str, size: int) -> str:
+    """The page at ``url``; built here so nothing touches the network."""
+    return (url + "\n" + PARAGRAPH * (size // len(PARAGRAPH)))[:size]
+
+
+def scan(content: str, search_string: str, context_chars: int = 700, max_instances: int = 3) -> str:
+    """The matching part of ``get_url_content_with_context``, counting every match as a real page scan would."""
+    haystack, needle = content.lower(), search_string.lower()
+    instances, count, start = [], 0, 0
+    while (index := haystack.find(needle, start)) != -1:
+        count += 1
+        if len(instances) < max_instances:
+            instances.append(content[max(0, index - context_chars):index + len(needle) + context_chars])
+        start = index + len(needle)
+    return f"Found {count} instance(s) of '{search_string}':\n\n" + "\n".join(instances)
+
+
+def fetch_and_scan(url: str, size: int, search_string: str) -> str:
+    return scan(fetch(url, size), search_string)
+
+
+def io_call(ms: float) -> str:
+    time.sleep(ms / 1e3)
+    return "ok"
+
+
+async def run_mode(mode: str, args, threads: ThreadPoolExecutor):
+    size = args.page_kb * 1024
+    page = fetch("https://example.com/page", size)
+    if mode.startswith("processes"):
+        # Start the workers (and the imports they do) before timing.
+        await asyncio.gather(*(run_in(process_pool(), fetch)("https://example.com/page", size) for _ in range(8)))
+    calls = {
+        "inline": lambda: asyncio.sleep(0, scan(page, "coral")),
+        "threads": lambda: run_in(threads, scan)(page, "coral"),
+        "processes/page": lambda: run_in(process_pool(), scan)(page, "coral"),
+        "processes/url": lambda: run_in(process_pool(), fetch_and_scan)("https://example.com/page", size, "coral"),
+    }
+    sent = {
+        "inline": 0,
+        "threads": 0,
+        "processes/page": len(pickle.dumps((scan, page, "coral"))),
+        "processes/url": len(pickle.dumps((fetch_and_scan, "https://example.com/page", size, "coral"))),
+    }[mode]
+    started = time.perf_counter()
+    async with LoopLag() as lag:
+        for _ in range(args.rounds):
+            await asyncio.gather(
+                *(run_in(threads, io_call)(args.io_ms) for _ in range(args.io)),
+                *(calls[mode]() for _ in range(args.cpu)),
+            )
+    return lag.summary(), time.perf_counter() - started, sent
+
+
+async def main_async(args):
+    threads = ThreadPoolExecutor(max_workers=args.io + args.cpu)
+    print(f"{args.rounds} rounds of {args.io} x {args.io_ms:.0f} ms fetches + {args.cpu} x scan of {args.page_kb} KB")
+    print(f"  {'mode':<16} {'lag p50':>9} {'lag p99':>9} {'lag max':>9} {'total':>8} {'pickled/call':>13}")
+    for mode in ("inline", "threads", "processes/page", "processes/url"):
+        summary, total, sent = await run_mode(mode, args, threads)
+        print(f"  {mode:<16} {summary['p50_ms']:>6.2f} ms {summary['p99_ms']:>6.2f} ms {summary['max_ms']:>6.2f} ms "
+              f"{total:>6.2f} s {sent:>11} B")
+    threads.shutdown()
+    shutdown_process_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--io", type=int, default=4, help="fetches per round")
+    parser.add_argument("--io-ms", type=float, default=50)
+    parser.add_argument("--cpu", type=int, default=4, help="page scans per round")
+    parser.add_argument("--page-kb", type=int, default=4096)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Wall-clock time of one agent turn with several tool calls, stock ``AgentExecutor`` against ours.
+
+A scripted model asks for ``--calls`` tools in one turn, then answers. Each
+tool waits ``--delay`` seconds: as a coroutine (``asyncio.sleep``) or as a sync
+function (``time.sleep``, like a blocking HTTP client). The report shows the
+turn time for:
+
+- ``AgentExecutor``, LangChain's own, which gathers the calls of a turn and
+  runs sync tools in the loop's default thread pool;
+- ``create_concurrent_executor`` with ``max_concurrency`` of 1 and of
+  ``--calls``;
+- the same with ``max_concurrency`` 2, to show the bound.
+
+    cd coralizer && python -m benchmarks.bench_executor --calls 4
+"""
+import argparse
+import asyncio
+import time
+
+from langchain.agents import AgentExecutor, create_tool_calling_agent
+from langchain_core.messages import AIMessage
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.tools import StructuredTool
+
+from benchmarks.bench_scratchpad import ScriptedModel
+from coral_runtime.executor import create_concurrent_executor
+
+PROMPT = ChatPromptTemplate.from_messages([("system", "Scripted."), ("placeholder", "{agent_scratchpad}")])
+
+
+def make_tool(name: str, delay: float, sync: bool) -> StructuredTool:
+    schema = {"type": "object", "properties": {}}
+    if sync:
+        def call(**kwargs):
+            time.sleep(delay)
+            return name
+        return StructuredTool.from_function(func=call, name=name, description=name, args_schema=schema)
+
+    async def acall(**kwargs):
+        await asyncio.sleep(delay)
+        return name
+    return StructuredTool.from_function(coroutine=acall, name=name, description=name, args_schema=schema)
+
+
+async def turn(build, calls: int, delay: float, sync: bool) -> float:
+    tools = [make_tool(f"tool_{i}", delay, sync) for i in range(calls)]
+    turns = [AIMessage(content="", tool_calls=[{"name": tool.name, "args": {}, "id": f"call_{i}"}
+                                                for i, tool in enumerate(tools)]),
+             AIMessage(content="done")]
+    executor = build(create_tool_calling_agent(ScriptedModel(turns=turns), tools, PROMPT), tools)
+    began = time.perf_counter()
+    await executor.ainvoke({})
+    return time.perf_counter() - began
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=4, help="tool calls in the turn")
+    parser.add_argument("--delay", type=float, default=0.5, help="seconds each tool takes")
+    args = parser.parse_args()
+
+    builds = {
+        "AgentExecutor (stock)": lambda agent, tools: AgentExecutor(agent=agent, tools=tools),
+        "concurrent, max 1": lambda agent, tools: create_concurrent_executor(agent, tools, max_concurrency=1),
+        "concurrent, max 2": lambda agent, tools: create_concurrent_executor(agent, tools, max_concurrency=2),
+        f"concurrent, max {args.calls}": lambda agent, tools: create_concurrent_executor(
+            agent, tools, max_concurrency=args.calls),
+    }
+    print(f"one turn of {args.calls} tool calls of {args.delay}s each, seconds")
+    print(f"  {'executor':<24} {'async tools':>12} {'sync tools':>11}")
+    for name, build in builds.items():
+        timings = [asyncio.run(turn(build, args.calls, args.delay, sync)) for sync in (False, True)]
+        print(f"  {name:<24} {timings[0]:>12.2f} {timings[1]:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
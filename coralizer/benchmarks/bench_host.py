@@ -0,0 +1,88 @@
+"""Startup time and RSS: N agents in one host process vs. one process per agent.
+
+Both modes import the full LangChain/MCP stack, connect each agent to a local
+stand-in MCP server (used as both Coral and the agent's own MCP server) and
+build its executor, then report once every agent is ready to serve mentions.
+No model calls are made.
+
+    cd coralizer && python -m benchmarks.bench_host --agents 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.standin import free_port, start_server, wait_listening
+
+CHILD = """
+import asyncio, json, sys
+from coral_runtime.agent import AgentDefinition, run_agent
+from coral_runtime.host import SharedResources
+
+def rss_kb():
+    with open("/proc/self/status") as f:
+        return int(next(line for line in f if line.startswith("VmRSS")).split()[1])
+
+async def main(count, port):
+    url = f"http://127.0.0.1:{port}/sse"
+    shared = SharedResources.create()
+    definitions = [AgentDefinition(f"agent_{i}", "bench agent", url, coral_base_url=url) for i in range(count)]
+    events = [asyncio.Event() for _ in definitions]
+    tasks = [asyncio.create_task(run_agent(d, model=shared.model, describe=shared.describe, ready=e))
+             for d, e in zip(definitions, events)]
+    await asyncio.gather(*(e.wait() for e in events))
+    print(json.dumps({"rss_kb": rss_kb()}), flush=True)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+asyncio.run(main(int(sys.argv[1]), int(sys.argv[2])))
+"""
+
+
+def spawn(count: int, port: int) -> subprocess.Popen:
+    env = dict(os.environ, OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "bench"))
+    return subprocess.Popen([sys.executable, "-c", CHILD, str(count), str(port)],
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=env, text=True)
+
+
+def measure(processes):
+    rss = []
+    for process in processes:
+        # Executors are verbose; the report is the line starting with {"rss_kb".
+        line = next(line for line in process.stdout if line.startswith('{"rss_kb"'))
+        process.wait()
+        rss.append(json.loads(line)["rss_kb"])
+    return rss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, default=10)
+    args = parser.parse_args()
+
+    port = free_port()
+    server = start_server(port)
+    try:
+        asyncio.run(wait_listening(port))
+
+        started = time.monotonic()
+        host_rss = measure([spawn(args.agents, port)])
+        host_seconds = time.monotonic() - started
+
+        started = time.monotonic()
+        per_process_rss = measure([spawn(1, port) for _ in range(args.agents)])
+        per_process_seconds = time.monotonic() - started
+    finally:
+        server.kill()
+
+    print(f"{args.agents} agents")
+    print(f"  one host process:      {host_seconds:6.2f}s to ready, {sum(host_rss) / 1024:8.1f} MB RSS")
+    print(f"  one process per agent: {per_process_seconds:6.2f}s to ready, {sum(per_process_rss) / 1024:8.1f} MB RSS")
+
+
+if __name__ == "__main__":
+    main()
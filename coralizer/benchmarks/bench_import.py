@@ -0,0 +1,68 @@
+"""Cold-start import time of a generated agent, from ``python -X importtime``.
+
+Each target is imported in a fresh interpreter ``--runs`` times; the report
+shows the median cumulative import time and the heaviest modules it pulled in.
+The ``eager`` target is what every generated agent imported at module top
+before the shared runtime deferred those imports.
+
+    cd coralizer && python -m benchmarks.bench_import
+    cd coralizer && python -m benchmarks.bench_import --json import_times.json
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+TARGETS = {
+    "generated_agent": "import firecrawl_coral_agent_sample",
+    "eager": (
+        "import langchain.agents, langchain.prompts, langchain.chat_models, "
+        "langchain_mcp_adapters.client"
+    ),
+}
+
+
+def importtime(statement: str):
+    """Return ``{module: cumulative_us}`` for the top-level imports of ``statement``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True, text=True, check=True,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.rstrip()] = int(cumulative)
+    return modules
+
+
+def measure(statement: str, runs: int):
+    totals, last = [], {}
+    for _ in range(runs):
+        last = importtime(statement)
+        # Top-level entries have no leading indentation; their cumulative times sum to the whole import.
+        totals.append(sum(us for name, us in last.items() if not name.startswith("  ")))
+    heaviest = sorted(((us, name.strip()) for name, us in last.items()), reverse=True)[:5]
+    return {"median_ms": statistics.median(totals) / 1000, "heaviest": [[name, us / 1000] for us, name in heaviest]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = {name: measure(statement, args.runs) for name, statement in TARGETS.items()}
+    for name, result in results.items():
+        print(f"{name}: {result['median_ms']:.1f} ms (median of {args.runs})")
+        for module, ms in result["heaviest"]:
+            print(f"    {ms:8.1f} ms  {module}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
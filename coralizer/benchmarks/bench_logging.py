@@ -0,0 +1,135 @@
+"""Time the agent loop spends logging: verbose executor printing vs. queued logging.
+
+Replays ``--steps`` executor steps through the callbacks an ``AgentExecutor``
+fires. Each step is a chain start, a tool call, three scraped pages of
+``--page-kb`` KB as tool results, a final answer and a log line from the loop.
+Output goes to a pipe read by a child process in 64 KB chunks, with
+``--reader-delay`` seconds between chunks to stand in for a terminal or a log
+shipper. The report shows how long each step blocks the loop, and how long
+the queue took to drain afterwards.
+
+- ``verbose``: ``verbose=True`` (LangChain's ``StdOutCallbackHandler``) plus
+  ``logging.basicConfig``, as the agents ran before;
+- ``queued-text``/``queued-json``: ``configure_logging`` and ``StepLogger`` at INFO;
+- ``queued-json-debug``: the same at DEBUG, so tool results are logged, clipped.
+
+    cd coralizer && python -m benchmarks.bench_logging --steps 2000
+"""
+import argparse
+import io
+import logging
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.callbacks import StdOutCallbackHandler
+
+from coral_runtime.executor import StepLogger
+from coral_runtime.logs import configure_logging, set_log_agent, stop_logging
+
+READER = """
+import sys, time
+delay = float(sys.argv[1])
+while sys.stdin.buffer.read1(65536):
+    time.sleep(delay)
+"""
+
+
+@contextmanager
+def pipe(reader_delay: float):
+    reader = subprocess.Popen([sys.executable, "-c", READER, str(reader_delay)], stdin=subprocess.PIPE)
+    stream = io.TextIOWrapper(reader.stdin, encoding="utf-8", line_buffering=True)
+    try:
+        yield stream
+    finally:
+        stream.close()
+        reader.wait()
+
+
+def step_events(step: int):
+    action = AgentAction(tool="firecrawl_scrape", tool_input={"url": f"https://example.com/{step}"},
+                         log=f"Invoking: `firecrawl_scrape` with `{{'url': 'https://example.com/{step}'}}`\n")
+    finish = AgentFinish(return_values={"output": f"Sent the summary of page {step}."},
+                         log=f"Sent the summary of page {step}.")
+    return action, finish
+
+
+def run_steps(handler, loop_logger, steps: int, page: str):
+    latencies = []
+    for step in range(steps):
+        action, finish = step_events(step)
+        run_id = uuid.uuid4()
+        started = time.perf_counter()
+        loop_logger.info("firecrawl: starting new agent invocation")
+        handler.on_chain_start({"name": "AgentExecutor"}, {}, run_id=run_id)
+        handler.on_agent_action(action, run_id=run_id)
+        for _ in range(3):
+            handler.on_tool_end(page, name="firecrawl_scrape", run_id=run_id)
+        handler.on_agent_finish(finish, run_id=run_id)
+        handler.on_chain_end({}, run_id=run_id)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def verbose(steps, page, reader_delay):
+    with pipe(reader_delay) as stream:
+        root = logging.getLogger()
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+        stdout, sys.stdout = sys.stdout, stream
+        try:
+            latencies = run_steps(StdOutCallbackHandler(), logging.getLogger("bench"), steps, page)
+        finally:
+            sys.stdout = stdout
+            root.removeHandler(handler)
+    # Every write happened on the loop, so there is nothing left to drain.
+    return latencies, 0.0
+
+
+def queued(fmt, level):
+    def run(steps, page, reader_delay):
+        with pipe(reader_delay) as stream:
+            configure_logging(level=level, fmt=fmt, stream=stream)
+            set_log_agent("firecrawl")
+            latencies = run_steps(StepLogger(), logging.getLogger("bench"), steps, page)
+            started = time.perf_counter()
+            stop_logging()
+            drained = time.perf_counter() - started
+        return latencies, drained
+    return run
+
+
+MODES = {
+    "verbose": verbose,
+    "queued-text": queued("text", "INFO"),
+    "queued-json": queued("json", "INFO"),
+    "queued-json-debug": queued("json", "DEBUG"),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--page-kb", type=int, default=50)
+    parser.add_argument("--reader-delay", type=float, default=0.001, help="seconds the reader sleeps per 64 KB")
+    args = parser.parse_args()
+    page = ("Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 20 + "\n") * (args.page_kb * 1024 // 1141 + 1)
+
+    print(f"{args.steps} steps, 3 x {args.page_kb} KB tool results per step")
+    print(f"  {'mode':<18} {'median':>10} {'p99':>10} {'total':>9} {'drain':>8}")
+    for name, mode in MODES.items():
+        latencies, drained = mode(args.steps, page, args.reader_delay)
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        print(f"  {name:<18} {statistics.median(latencies) * 1e6:>7.0f} us {p99 * 1e6:>7.0f} us "
+              f"{sum(latencies):>7.2f} s {drained:>6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
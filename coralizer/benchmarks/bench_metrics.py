@@ -0,0 +1,94 @@
+"""Cost of a metric update, and of a scrape.
+
+Times ``--updates`` increments per thread at 1 and ``--threads`` threads for:
+
+- a plain ``+=`` on a shared attribute, the floor (not thread-safe: it can lose updates);
+- a counter behind a ``threading.Lock``, the usual thread-safe counter;
+- ``CounterSeries.inc`` and ``HistogramSeries.observe`` from ``coral_runtime.metrics``,
+  which write to per-thread cells.
+
+Each row is ns per update, and whether the total came out exact. The report
+then times rendering ``/metrics`` with ``--series`` histogram series, about
+what a host with a dozen agents and their tools exposes.
+
+    cd coralizer && python -m benchmarks.bench_metrics
+"""
+import argparse
+import threading
+import time
+
+from coral_runtime.metrics import Counter, Histogram, Registry
+
+
+class PlainCounter:
+    def __init__(self):
+        self.value = 0
+
+    def inc(self):
+        self.value += 1
+
+
+class LockedCounter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self):
+        with self._lock:
+            self.value += 1
+
+
+def run(update, threads: int, updates: int) -> float:
+    """Seconds for ``threads`` threads to call ``update`` ``updates`` times each."""
+    start = threading.Barrier(threads + 1)
+
+    def work():
+        start.wait()
+        for _ in range(updates):
+            update()
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    start.wait()
+    began = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - began
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=200_000, help="updates per thread")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--series", type=int, default=200, help="histogram series rendered per scrape")
+    args = parser.parse_args()
+
+    registry = Registry()
+    histogram = Histogram("bench_seconds", "Benchmark.", ["agent", "tool", "outcome"], registry=registry)
+    print(f"ns per update, {args.updates} updates per thread")
+    print(f"  {'update':<24} {'threads':>7} {'ns':>7} {'exact':>6}")
+    for threads in (1, args.threads):
+        plain, locked = PlainCounter(), LockedCounter()
+        counter = Counter(f"bench_updates_{threads}_total", "Benchmark.", registry=registry).labels()
+        series = histogram.labels("bench", f"t{threads}", "ok")
+        for name, update, total in (
+            ("plain +=", plain.inc, lambda: plain.value),
+            ("locked +=", locked.inc, lambda: locked.value),
+            ("CounterSeries.inc", counter.inc, counter.value),
+            ("HistogramSeries.observe", lambda: series.observe(0.2), lambda: series.totals()[-1] / 0.2),
+        ):
+            seconds = run(update, threads, args.updates)
+            exact = round(total()) == threads * args.updates
+            print(f"  {name:<24} {threads:>7} {seconds / (threads * args.updates) * 1e9:>7.0f} {'yes' if exact else 'no':>6}")
+
+    for i in range(args.series):
+        histogram.labels(f"agent-{i % 12}", f"tool-{i}", "ok").observe(0.1)
+    began = time.perf_counter()
+    body = registry.render()
+    print(f"scrape: {args.series} histogram series, {len(body.splitlines())} lines, {len(body) // 1024} KB "
+          f"in {(time.perf_counter() - began) * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Message size and tokens with large results inline vs. through the payload store.
+
+For scraped pages of several sizes, the report shows what a worker's reply
+costs in the thread and, in tokens, for each recipient's next model step:
+inline, and as the payload store's preview plus reference. It also shows
+what reading one 4 KB range costs, and the store's time and disk use for
+each page, with and without gzip.
+
+    cd coralizer && python -m benchmarks.bench_payloads
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from coral_runtime.payloads import PayloadStore
+from coral_runtime.schema import count_tokens
+
+WORDS = ("coral agent protocol thread message scrape crawl extract page content markdown link "
+         "table price release version update news report data result source").split()
+
+
+def page(size: int, rng: random.Random) -> str:
+    lines, total = [], 0
+    while total < size:
+        line = " ".join(rng.choice(WORDS) for _ in range(14))
+        line = f"## {line.title()}\n" if rng.random() < 0.05 else f"{line}. [link](https://example.com/{rng.randrange(10**6)})\n"
+        lines.append(line)
+        total += len(line)
+    return "".join(lines)
+
+
+def disk_usage(root: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for path, _, names in os.walk(root) for name in names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-kb", type=int, nargs="+", default=[20, 100, 300, 800])
+    parser.add_argument("--recipients", type=int, default=3, help="participants that read the reply")
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    print(f"{'page':>7} {'inline':>16} {'by reference':>16} {'4 KB fetch':>11} "
+          f"{'put gzip':>9} {'on disk gzip':>13} {'put raw':>8}")
+    for size_kb in args.sizes_kb:
+        text = page(size_kb * 1024, rng)
+        row = {}
+        for compress in ("gzip", None):
+            with tempfile.TemporaryDirectory() as root:
+                store = PayloadStore(root, compress=compress)
+                started = time.perf_counter()
+                stub = store.offload(text)
+                row[compress, "put"] = time.perf_counter() - started
+                row[compress, "disk"] = disk_usage(root)
+                ref = store.put(text).ref
+                started = time.perf_counter()
+                chunk = store.fetch(ref, offset=len(text) // 2, length=4096)
+                row[compress, "fetch"] = time.perf_counter() - started
+        inline_tokens = count_tokens(text) * args.recipients
+        stub_tokens = count_tokens(stub) * args.recipients
+        print(f"{size_kb:>5}KB {len(text) // 1024:>6}KB {inline_tokens:>7}tok "
+              f"{len(stub):>6}B {stub_tokens:>7}tok "
+              f"{count_tokens(chunk):>6}tok "
+              f"{row['gzip', 'put'] * 1e3:>6.1f}ms {row['gzip', 'disk'] // 1024:>10}KB "
+              f"{row[None, 'put'] * 1e3:>6.1f}ms")
+    print(f"tokens are summed over {args.recipients} recipients' next model step; "
+          "a fetch is paid only by the recipient that needs that range")
+
+
+if __name__ == "__main__":
+    main()
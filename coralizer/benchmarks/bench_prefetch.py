@@ -0,0 +1,76 @@
+"""Time a search agent spends waiting on page fetches, with and without prefetch.
+
+Replays ``--tasks`` search tasks. Each task searches (``--results`` hits), then
+takes one model turn (``--model-ms``), then reads ``--reads`` of the hits, one
+per model turn. With ``--skip``, the agent reads the hits ranked after the
+first few, so the prefetch wastes fetches. Fetches take ``--fetch-ms``, +/- 50%.
+The report shows the time spent inside ``get_url_content``, the task wall time
+and the prefetcher's counters.
+
+    cd coralizer && python -m benchmarks.bench_prefetch
+"""
+import argparse
+import random
+import time
+
+from coral_runtime.prefetch import Prefetcher
+
+
+class FakeWeb:
+    def __init__(self, fetch_ms: float, seed: int = 0):
+        self.fetch_ms = fetch_ms
+        self.rng = random.Random(seed)
+
+    def search(self, task: int, results: int):
+        return [{"result_id": i + 1, "title": f"Result {i + 1}", "url": f"https://example.com/{task}/{i}"}
+                for i in range(results)]
+
+    def fetch_page(self, url: str) -> str:
+        time.sleep(self.fetch_ms / 1e3 * self.rng.uniform(0.5, 1.5))
+        return f"# {url}\n" + "page text " * 2000
+
+
+def run(args, prefetch: bool):
+    web = FakeWeb(args.fetch_ms)
+    prefetcher = Prefetcher(web.fetch_page, top_k=args.top_k) if prefetch else None
+    search = prefetcher.after_search(web.search) if prefetcher else web.search
+    read = prefetcher.get if prefetcher else web.fetch_page
+    waiting = 0.0
+    started = time.perf_counter()
+    for task in range(args.tasks):
+        results = search(task, args.results)
+        for hit in results[args.skip:args.skip + args.reads]:
+            time.sleep(args.model_ms / 1e3)  # the model turn that decides to read this hit
+            before = time.perf_counter()
+            read(hit["url"])
+            waiting += time.perf_counter() - before
+        time.sleep(args.model_ms / 1e3)  # the model turn that writes the answer
+    wall = time.perf_counter() - started
+    stats = prefetcher.stats() if prefetcher else {}
+    if prefetcher:
+        prefetcher.close()
+    return waiting, wall, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=10)
+    parser.add_argument("--results", type=int, default=10)
+    parser.add_argument("--reads", type=int, default=2)
+    parser.add_argument("--skip", type=int, default=0, help="hits skipped before the ones read")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--fetch-ms", type=float, default=400)
+    parser.add_argument("--model-ms", type=float, default=300)
+    args = parser.parse_args()
+
+    print(f"{args.tasks} tasks, {args.reads} reads per task starting at hit {args.skip + 1}, "
+          f"fetch ~{args.fetch_ms:.0f} ms, model turn {args.model_ms:.0f} ms, top_k={args.top_k}")
+    print(f"  {'mode':<10} {'in get_url_content':>19} {'wall':>8}  counters")
+    for name, prefetch in (("direct", False), ("prefetch", True)):
+        waiting, wall, stats = run(args, prefetch)
+        counters = " ".join(f"{k}={v}" for k, v in stats.items() if k in ("prefetched", "hits", "misses", "wasted"))
+        print(f"  {name:<10} {waiting:>17.2f} s {wall:>6.2f} s  {counters}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Overhead of the sampling profiler on an agent-shaped workload.
+
+Runs ``--agents`` tasks on one event loop. Each task repeatedly renders tool
+descriptions for ``--tools`` tools (CPU, several ms) and awaits a short sleep
+(I/O). Two sync tools in a thread pool run alongside. Throughput with the
+profiler off and at each ``--hz`` is the median of ``--repeat`` interleaved
+runs. On a loaded machine, that still varies more between runs than the
+profiler costs, so the report also shows the time spent taking samples, as a
+share of the run. Finally it shows the hottest collapsed stacks with their task
+labels.
+
+    cd coralizer && python -m benchmarks.bench_profiler
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from coral_runtime.profiler import SamplingProfiler, watch_loop
+from coral_runtime.schema import get_tools_description
+
+from .micro import coral_tools
+
+
+def sync_tool(stop: float) -> int:
+    rounds = 0
+    while time.perf_counter() < stop:
+        sum(i * i for i in range(2000))
+        time.sleep(0.002)
+        rounds += 1
+    return rounds
+
+
+async def agent(tools, stop: float) -> int:
+    steps = 0
+    while time.perf_counter() < stop:
+        get_tools_description(tools, mode="full")
+        await asyncio.sleep(0.001)
+        steps += 1
+    return steps
+
+
+async def workload(seconds: float, agents: int, tool_count: int) -> int:
+    watch_loop()
+    tools = coral_tools(tool_count)
+    stop = time.perf_counter() + seconds
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="coral-tool") as pool:
+        threads = [loop.run_in_executor(pool, sync_tool, stop) for _ in range(2)]
+        tasks = [asyncio.create_task(agent(tools, stop), name=f"agent-{i}") for i in range(agents)]
+        steps = await asyncio.gather(*tasks)
+        await asyncio.gather(*threads)
+    return sum(steps)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--agents", type=int, default=4)
+    parser.add_argument("--hz", type=float, nargs="+", default=[100, 1000])
+    parser.add_argument("--tools", type=int, default=1000, help="tools rendered per agent step")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    steps = {"off": []}
+    profilers = {}
+    with tempfile.TemporaryDirectory() as root:
+        for _ in range(args.repeat):
+            steps["off"].append(asyncio.run(workload(args.seconds, args.agents, args.tools)))
+            for hz in args.hz:
+                profiler = SamplingProfiler(os.path.join(root, f"bench-{hz:.0f}.collapsed"), hz=hz).start()
+                steps.setdefault(hz, []).append(asyncio.run(workload(args.seconds, args.agents, args.tools)))
+                profiler.stop()
+                profilers[hz] = profiler
+
+    baseline = statistics.median(steps["off"])
+    print(f"{args.agents} agents rendering {args.tools} tools per step, {args.seconds:.0f} s runs, "
+          f"median of {args.repeat}")
+    print(f"  {'profiler':<10} {'steps':>8} {'overhead':>9} {'samples':>8} {'per sample':>11} {'sampler time':>13}")
+    print(f"  {'off':<10} {baseline:>8.0f}")
+    for hz in args.hz:
+        median = statistics.median(steps[hz])
+        profiler = profilers[hz]
+        per_sample = profiler.sampling_time / max(1, profiler.samples)
+        print(f"  {hz:>5.0f} Hz   {median:>8.0f} {(baseline - median) / baseline:>8.1%} {profiler.samples:>8} "
+              f"{per_sample * 1e6:>8.0f} us {profiler.sampling_time / args.seconds:>12.2%}")
+    print(f"hottest stacks at {args.hz[-1]:.0f} Hz (root ... leaf):")
+    for stack, count in profilers[args.hz[-1]].counts.most_common(args.top):
+        frames = stack.split(";")
+        print(f"  {count:>6}  {';'.join(frames[:2])};...;{';'.join(frames[-2:])}")
+
+
+if __name__ == "__main__":
+    main()
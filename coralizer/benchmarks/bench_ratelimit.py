@@ -0,0 +1,92 @@
+"""Many agents calling a rate-limited model endpoint: shared limiter vs. independent clients.
+
+Starts ``benchmarks.fake_model`` and runs ``--agents`` background agents plus
+one interactive agent, each making ``--calls`` chat calls through LangChain's
+``ChatOpenAI``. With ``--baseline`` every agent uses its own plain client and,
+like the agent loops, sleeps 5s after a failed call. Otherwise all agents share
+the process rate limiter and the interactive agent runs at ``INTERACTIVE``
+priority.
+
+    cd coralizer && python -m benchmarks.bench_ratelimit
+    cd coralizer && python -m benchmarks.bench_ratelimit --baseline
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+from langchain_openai import ChatOpenAI
+
+from benchmarks.standin import free_port, wait_listening
+from coral_runtime.ratelimit import BACKGROUND, INTERACTIVE, RateLimiter, rate_limited_async_client, set_priority
+
+
+async def agent(model, calls: int, priority: int, latencies, failures):
+    set_priority(priority)
+    for _ in range(calls):
+        started = time.monotonic()
+        try:
+            await model.ainvoke("Summarise the latest news on rate limits.")
+            latencies.append(time.monotonic() - started)
+        except Exception:
+            failures.append(priority)
+            await asyncio.sleep(5)
+
+
+async def run(port: int, agents: int, calls: int, rpm: float, baseline: bool):
+    base_url = f"http://127.0.0.1:{port}/v1"
+    settings = dict(model="gpt-4o-mini", api_key="fake", base_url=base_url, max_tokens=200)
+    if baseline:
+        models = [ChatOpenAI(**settings) for _ in range(agents + 1)]
+    else:
+        shared = ChatOpenAI(**settings, http_async_client=rate_limited_async_client(RateLimiter(rpm=rpm)))
+        models = [shared] * (agents + 1)
+
+    interactive, background, failures = [], [], []
+    started = time.monotonic()
+    await asyncio.gather(
+        agent(models[0], calls, INTERACTIVE, interactive, failures),
+        *(agent(model, calls, BACKGROUND, background, failures) for model in models[1:]),
+    )
+    elapsed = time.monotonic() - started
+    async with httpx.AsyncClient() as client:
+        stats = (await client.get(f"http://127.0.0.1:{port}/stats")).json()
+    return elapsed, interactive, background, failures, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, default=8, help="background agents")
+    parser.add_argument("--calls", type=int, default=20, help="calls per agent")
+    parser.add_argument("--rpm", type=float, default=600, help="limit enforced by the fake endpoint")
+    parser.add_argument("--baseline", action="store_true", help="independent clients, sleep 5s on failure")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    port = free_port()
+    server = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.fake_model", "--port", str(port), "--rpm", str(args.rpm), "--tpm", "10000000",
+    ])
+    try:
+        asyncio.run(wait_listening(port))
+        elapsed, interactive, background, failures, stats = asyncio.run(
+            run(port, args.agents, args.calls, args.rpm, args.baseline)
+        )
+    finally:
+        server.kill()
+
+    label = "baseline (independent clients)" if args.baseline else "shared rate limiter"
+    print(f"{label}: {args.agents} background + 1 interactive agent, {args.calls} calls each, {args.rpm:.0f} RPM")
+    print(f"  wall time {elapsed:.1f}s, 429s from endpoint {stats['throttled']}, failed calls {len(failures)}")
+    for name, latencies in (("interactive", interactive), ("background", background)):
+        if latencies:
+            print(f"  {name:<11} median latency {statistics.median(latencies) * 1000:7.0f} ms, "
+                  f"max {max(latencies) * 1000:7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
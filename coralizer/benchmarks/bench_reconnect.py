@@ -0,0 +1,133 @@
+"""Recovery time after an SSE drop: SupervisedConnection vs. full restart.
+
+Runs a local stand-in MCP server over SSE, kills it, brings it back after
+``--downtime`` seconds, and times how long the client takes to complete a tool
+call again. ``--baseline`` measures the old strategy instead: sleep 5s, then
+rebuild the session and reload tools from scratch.
+
+A killed server resets the connection, which the client notices at once.
+``--silent`` instead freezes the server (SIGSTOP) at a random point of an idle
+period, like a peer that vanished without closing the stream, and times how
+long the keepalive takes to notice, at the ``SupervisedConnection`` defaults
+unless ``--interval``/``--timeout`` are given.
+
+    cd coralizer && python -m benchmarks.bench_reconnect --cycles 5
+    cd coralizer && python -m benchmarks.bench_reconnect --silent --cycles 5
+"""
+import argparse
+import asyncio
+import logging
+import random
+import signal
+import statistics
+import time
+
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+
+from benchmarks.standin import free_port, start_server, wait_listening
+from coral_runtime.connection import SupervisedConnection
+
+
+async def call_until_ok(call, poll: float = 0.05) -> float:
+    while True:
+        try:
+            await asyncio.wait_for(call(), 2)
+            return time.monotonic()
+        except Exception:
+            await asyncio.sleep(poll)
+
+
+async def supervised_cycles(url: str, port: int, cycles: int, downtime: float):
+    server = start_server(port)
+    await wait_listening(port)
+    recoveries = []
+    async with SupervisedConnection("standin", {"transport": "sse", "url": url},
+                                    keepalive_interval=1, keepalive_timeout=1, backoff_base=0.05, backoff_max=1) as conn:
+        tools = await conn.get_tools()
+        echo = next(t for t in tools if t.name == "echo")
+        for _ in range(cycles):
+            await echo.ainvoke({"text": "ping"})
+            server.kill()
+            server.wait()
+            await asyncio.sleep(downtime)
+            server = start_server(port)
+            restarted = time.monotonic()
+            # The same tool wrapper is reused across the reconnect.
+            recoveries.append(await call_until_ok(lambda: echo.ainvoke({"text": "ping"})) - restarted)
+    server.kill()
+    return recoveries
+
+
+async def baseline_cycles(url: str, port: int, cycles: int, downtime: float, retry_sleep: float = 5.0):
+    server = start_server(port)
+    await wait_listening(port)
+    recoveries = []
+    for _ in range(cycles):
+        server.kill()
+        server.wait()
+        await asyncio.sleep(downtime)
+        server = start_server(port)
+        restarted = time.monotonic()
+        while True:
+            await asyncio.sleep(retry_sleep)
+            try:
+                async with sse_client(url) as (read, write), ClientSession(read, write) as session:
+                    await session.initialize()
+                    await session.list_tools()
+                    await session.call_tool("echo", {"text": "ping"})
+                    recoveries.append(time.monotonic() - restarted)
+                    break
+            except Exception:
+                continue
+    server.kill()
+    return recoveries
+
+
+async def silent_drop_cycles(url: str, port: int, cycles: int, interval, timeout):
+    options = {k: v for k, v in (("keepalive_interval", interval), ("keepalive_timeout", timeout)) if v is not None}
+    detections = []
+    for _ in range(cycles):
+        server = start_server(port)
+        await wait_listening(port)
+        async with SupervisedConnection("standin", {"transport": "sse", "url": url}, **options) as conn:
+            await conn.call_tool("echo", {"text": "ping"})
+            await asyncio.sleep(random.uniform(0, conn.keepalive_interval))
+            server.send_signal(signal.SIGSTOP)
+            frozen = time.monotonic()
+            while conn.connected:
+                await asyncio.sleep(0.01)
+            detections.append(time.monotonic() - frozen)
+            server.send_signal(signal.SIGCONT)
+            server.kill()
+            server.wait()
+    return detections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cycles", type=int, default=5)
+    parser.add_argument("--downtime", type=float, default=0.5, help="seconds the server stays down per cycle")
+    parser.add_argument("--baseline", action="store_true", help="measure the sleep-5s-and-rebuild strategy")
+    parser.add_argument("--silent", action="store_true", help="measure how long a silent drop takes to notice")
+    parser.add_argument("--interval", type=float, help="keepalive interval for --silent (default: the library's)")
+    parser.add_argument("--timeout", type=float, help="keepalive timeout for --silent (default: the library's)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/sse"
+    if args.silent:
+        detections = asyncio.run(silent_drop_cycles(url, port, args.cycles, args.interval, args.timeout))
+        print(f"SupervisedConnection: silent drop noticed after, over {len(detections)} drops")
+        print(f"  median {statistics.median(detections):.1f} s, max {max(detections):.1f} s")
+        return
+    run = baseline_cycles if args.baseline else supervised_cycles
+    recoveries = asyncio.run(run(url, port, args.cycles, args.downtime))
+    label = "baseline (sleep 5s + rebuild)" if args.baseline else "SupervisedConnection"
+    print(f"{label}: recovery after restart over {len(recoveries)} drops")
+    print(f"  median {statistics.median(recoveries) * 1000:.0f} ms, max {max(recoveries) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Cost of routing a request with the local index, and how the index routes a few requests.
+
+Builds a ``RoutingIndex`` from ``--agents`` synthetic agent descriptions plus
+the two example workers, then times ``route`` over the sample requests. For
+comparison, routing through the model costs a ``list_agents`` call plus a full
+LLM turn.
+
+    cd coralizer && python -m benchmarks.bench_routing --agents 50
+"""
+import argparse
+import random
+import time
+
+from coral_runtime.routing import RoutingIndex
+
+EXAMPLE_AGENTS = {
+    "world_news_agent": "You are world_news_agent, responsible for fetching and generating news topics based on mentions from other agents",
+    "firecrawl": "You are an firecrawl agent capable of scraping, crawling and extracting content from web pages and websites.",
+}
+
+REQUESTS = [
+    "What is the latest news about electric cars?",
+    "Scrape https://coralprotocol.org and summarise the page",
+    "crawl the docs site and extract every code sample",
+    "give me today's headlines",
+    "book me a flight to Lisbon",
+]
+
+TOPICS = "weather stocks crypto calendar email translation images music maps recipes sports flights hotels".split()
+
+
+def synthetic_agents(count: int):
+    rng = random.Random(0)
+    agents = {}
+    for i in range(count):
+        topic, other = rng.sample(TOPICS, 2)
+        agents[f"{topic}_agent_{i}"] = f"You are an agent capable of looking up {topic} data and answering {other} questions."
+    return agents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, default=50, help="synthetic agents besides the examples")
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    index = RoutingIndex()
+    index.sync({**synthetic_agents(args.agents), **EXAMPLE_AGENTS})
+    for request in REQUESTS:
+        route = index.route(request)
+        target = f"{route.agent_id} ({route.confidence:.2f})" if route else "-> ask the model"
+        print(f"  {request!r:60} {target}")
+
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        for request in REQUESTS:
+            index.route(request)
+    per_call = (time.perf_counter() - started) / (args.rounds * len(REQUESTS))
+    print(f"route() over {len(index)} agents: {per_call * 1e6:.1f} us per request")
+
+    started = time.perf_counter()
+    index.add("late_joiner", "You are an agent capable of booking flights and hotels.")
+    index.remove("late_joiner")
+    print(f"add + remove one agent: {(time.perf_counter() - started) * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
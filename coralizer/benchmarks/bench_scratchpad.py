@@ -0,0 +1,127 @@
+"""Prompt tokens per model call over a scripted 10-step plan, with and without scratchpad compaction.
+
+Runs the worker's real executor (``create_concurrent_executor`` with the
+``worker_prompt``) against a scripted chat model. The model calls one tool
+per turn: it waits for a mention, scrapes and searches pages of 8 to 60 KB,
+extracts, then replies, with all results synthetic. A callback counts the
+tokens of every prompt sent. The report shows each call's prompt with the
+scratchpad growing as it did before, and with ``ScratchpadCompactor`` at
+``--budget`` tokens.
+
+    cd coralizer && python -m benchmarks.bench_scratchpad --budget 8000
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import StructuredTool
+
+from coral_runtime.agent import worker_prompt
+from coral_runtime.executor import create_concurrent_executor
+from coral_runtime.payloads import PayloadStore
+from coral_runtime.schema import count_tokens
+from coral_runtime.scratchpad import ScratchpadCompactor
+
+# (tool, arguments, KB of result) per step; the last turn answers without a tool.
+PLAN = [
+    ("wait_for_mentions", {"timeoutMs": 30000}, 0.3),
+    ("firecrawl_search", {"query": "coral protocol agents"}, 12),
+    ("firecrawl_scrape", {"url": "https://example.com/a"}, 60),
+    ("firecrawl_scrape", {"url": "https://example.com/b"}, 45),
+    ("firecrawl_scrape", {"url": "https://example.com/c"}, 30),
+    ("firecrawl_map", {"url": "https://example.com"}, 8),
+    ("firecrawl_scrape", {"url": "https://example.com/d"}, 50),
+    ("firecrawl_extract", {"urls": ["https://example.com/a"], "prompt": "pricing"}, 10),
+    ("firecrawl_deep_research", {"query": "coral protocol pricing"}, 40),
+    ("send_message", {"threadId": "t1", "content": "summary", "mentions": ["user_interface_agent"]}, 0.2),
+]
+
+WORDS = "coral agent protocol thread message page content pricing release table data source link".split()
+
+
+class ScriptedModel(BaseChatModel):
+    """Answers each call with the next of ``turns``."""
+
+    turns: list
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=self.turns.pop(0))])
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def page(kb: float, rng: random.Random) -> str:
+    words, size = [], 0
+    while size < kb * 1024:
+        word = rng.choice(WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)
+
+
+def make_tools():
+    rng = random.Random(0)
+    results = {name: page(kb, rng) for name, _, kb in PLAN}
+
+    def tool(name):
+        async def call(**kwargs):
+            return results[name]
+        return StructuredTool.from_function(coroutine=call, name=name, description=f"{name} (synthetic)",
+                                            args_schema={"type": "object", "properties": {}})
+    return [tool(name) for name in dict.fromkeys(name for name, _, _ in PLAN)]
+
+
+class PromptTokens(BaseCallbackHandler):
+    def __init__(self):
+        self.calls = []
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.calls.append(sum(count_tokens(str(message.content)) for message in messages[0]))
+
+
+async def run(compactor=None):
+    turns = [AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"call_{i}"}])
+             for i, (name, args, _) in enumerate(PLAN)] + [AIMessage(content="Replied to the sender.")]
+    tools = make_tools()
+    prompt = worker_prompt(tools[:1] + tools[-1:], tools[1:-1])
+    from langchain.agents import create_tool_calling_agent
+
+    agent = create_tool_calling_agent(ScriptedModel(turns=turns), tools, prompt)
+    counter = PromptTokens()
+    options = {"trim_intermediate_steps": compactor} if compactor is not None else {}
+    executor = create_concurrent_executor(agent, tools, max_iterations=20, **options)
+    await executor.ainvoke({"agent_scratchpad": []}, config={"callbacks": [counter]})
+    return counter.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=int, default=8000, help="scratchpad token budget")
+    parser.add_argument("--keep", type=int, default=2, help="newest steps kept verbatim")
+    args = parser.parse_args()
+
+    before = asyncio.run(run())
+    with tempfile.TemporaryDirectory() as root:
+        compactor = ScratchpadCompactor(PayloadStore(root), budget=args.budget, keep_recent=args.keep)
+        after = asyncio.run(run(compactor))
+
+    print(f"prompt tokens per model call, budget {args.budget}, keep {args.keep}")
+    print(f"  {'call':>4} {'after tool':<24} {'growing':>9} {'compacted':>10}")
+    for i, (full, compact) in enumerate(zip(before, after)):
+        last = PLAN[i - 1][0] if i else "-"
+        print(f"  {i + 1:>4} {last:<24} {full:>9} {compact:>10}")
+    print(f"  {'total':>4} {'':<24} {sum(before):>9} {sum(after):>10}  ({1 - sum(after) / sum(before):.0%} fewer)")
+
+
+if __name__ == "__main__":
+    main()
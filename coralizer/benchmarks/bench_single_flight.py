@@ -0,0 +1,93 @@
+"""Upstream calls under bursty duplicate load, with and without single-flight.
+
+Sends ``--bursts`` bursts of ``--callers`` concurrent calls. Each call asks for
+one of ``--keys`` keys, weighted towards the first ones as popular URLs or
+queries are. An upstream call takes ``--upstream-ms``. Bursts run as
+coroutines on one loop (``async``: agents in a host calling MCP tools) and as
+threads (``sync``: sync tools in the executor's thread pool). The report shows
+upstream calls made and the mean latency callers saw.
+
+    cd coralizer && python -m benchmarks.bench_single_flight
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from coral_runtime.singleflight import SingleFlight, coalesced
+
+
+class Upstream:
+    def __init__(self, ms: float):
+        self.ms = ms
+        self.calls = 0
+
+    async def fetch(self, key: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.ms / 1e3)
+        return f"result for {key}"
+
+    def fetch_sync(self, key: str) -> str:
+        self.calls += 1
+        time.sleep(self.ms / 1e3)
+        return f"result for {key}"
+
+
+def bursts(args):
+    rng = random.Random(0)
+    weights = [1 / (rank + 1) for rank in range(args.keys)]
+    return [rng.choices([f"https://example.com/{k}" for k in range(args.keys)], weights, k=args.callers)
+            for _ in range(args.bursts)]
+
+
+async def run_async(args, coalesce: bool):
+    upstream = Upstream(args.upstream_ms)
+    fetch = coalesced(upstream.fetch, SingleFlight()) if coalesce else upstream.fetch
+    latencies = []
+
+    async def call(key):
+        started = time.perf_counter()
+        await fetch(key)
+        latencies.append(time.perf_counter() - started)
+
+    for burst in bursts(args):
+        await asyncio.gather(*(call(key) for key in burst))
+    return upstream.calls, statistics.mean(latencies)
+
+
+def run_sync(args, coalesce: bool):
+    upstream = Upstream(args.upstream_ms)
+    fetch = coalesced(upstream.fetch_sync, SingleFlight()) if coalesce else upstream.fetch_sync
+    latencies = []
+
+    def call(key):
+        started = time.perf_counter()
+        fetch(key)
+        latencies.append(time.perf_counter() - started)
+
+    with ThreadPoolExecutor(max_workers=args.callers) as pool:
+        for burst in bursts(args):
+            list(pool.map(call, burst))
+    return upstream.calls, statistics.mean(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bursts", type=int, default=20)
+    parser.add_argument("--callers", type=int, default=16)
+    parser.add_argument("--keys", type=int, default=10)
+    parser.add_argument("--upstream-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    print(f"{args.bursts} bursts of {args.callers} callers over {args.keys} keys, upstream {args.upstream_ms:.0f} ms")
+    print(f"  {'path':<6} {'mode':<14} {'upstream calls':>14} {'mean latency':>13}")
+    for path, run in (("async", lambda c: asyncio.run(run_async(args, c))), ("sync", lambda c: run_sync(args, c))):
+        for mode, coalesce in (("direct", False), ("single-flight", True)):
+            calls, latency = run(coalesce)
+            print(f"  {path:<6} {mode:<14} {calls:>14} {latency * 1e3:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
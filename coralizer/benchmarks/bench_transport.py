@@ -0,0 +1,60 @@
+"""Per-tool-call latency to a co-located MCP server: stdio vs. loopback SSE.
+
+Both transports talk to the same stand-in server and go through
+``SupervisedConnection``, as a coralized agent does.
+
+    cd coralizer && python -m benchmarks.bench_transport --calls 500
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.standin import free_port, start_server, stdio_command, wait_listening
+from coral_runtime.connection import SupervisedConnection
+
+
+async def call_latencies(connection, calls: int):
+    latencies = []
+    async with SupervisedConnection("standin", connection) as conn:
+        for _ in range(20):
+            await conn.call_tool("echo", {"text": "warmup"})
+        for _ in range(calls):
+            started = time.perf_counter()
+            await conn.call_tool("echo", {"text": "ping"})
+            latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def report(label, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"  {label:<6} median {statistics.median(latencies) * 1e3:6.2f} ms   p95 {p95 * 1e3:6.2f} ms")
+
+
+async def run(calls: int):
+    command = stdio_command()
+    stdio = await call_latencies({"transport": "stdio", "command": command[0], "args": command[1:]}, calls)
+
+    port = free_port()
+    server = start_server(port)
+    try:
+        await wait_listening(port)
+        sse = await call_latencies({"transport": "sse", "url": f"http://127.0.0.1:{port}/sse"}, calls)
+    finally:
+        server.kill()
+    return stdio, sse
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500)
+    args = parser.parse_args()
+    stdio, sse = asyncio.run(run(args.calls))
+    print(f"echo tool call latency over {args.calls} calls")
+    report("stdio", stdio)
+    report("sse", sse)
+
+
+if __name__ == "__main__":
+    main()
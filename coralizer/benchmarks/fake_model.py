@@ -0,0 +1,100 @@
+"""A local OpenAI-compatible chat endpoint that enforces rate limits like the real one.
+
+It answers ``POST /v1/chat/completions`` after ``--latency`` seconds, counts
+each request against RPM and TPM token buckets (prompt bytes / 4 plus
+``max_tokens``), and returns 429 with ``retry-after-ms`` once a budget is spent.
+``GET /stats`` reports how many requests were served and throttled.
+
+    cd coralizer && python -m benchmarks.fake_model --port 8089 --rpm 600 --tpm 100000
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+
+class Budget:
+    def __init__(self, per_minute: float, burst_seconds: float):
+        self.rate = per_minute / 60.0
+        self.capacity = self.rate * burst_seconds
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def shortfall(self, amount: float) -> float:
+        """Seconds until ``amount`` is available (0 if it is now)."""
+        return max(0.0, (amount - self.level) / self.rate)
+
+
+def create_app(rpm: float, tpm: float, latency: float, burst_seconds: float = 10.0) -> Starlette:
+    requests, tokens = Budget(rpm, burst_seconds), Budget(tpm, burst_seconds)
+    stats = {"served": 0, "throttled": 0}
+
+    async def completions(request: Request):
+        body = await request.body()
+        payload = json.loads(body)
+        cost = len(body) // 4 + (payload.get("max_completion_tokens") or payload.get("max_tokens") or 0)
+        requests.refill()
+        tokens.refill()
+        wait = max(requests.shortfall(1), tokens.shortfall(cost))
+        if wait > 0:
+            stats["throttled"] += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                status_code=429,
+                headers={"retry-after-ms": str(int(wait * 1000) + 1)},
+            )
+        requests.level -= 1
+        tokens.level -= cost
+        await asyncio.sleep(latency)
+        stats["served"] += 1
+        return JSONResponse(
+            {
+                "id": f"chatcmpl-{stats['served']}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get("model", "fake"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(body) // 4, "completion_tokens": 1, "total_tokens": len(body) // 4 + 1},
+            },
+            headers={
+                "x-ratelimit-limit-requests": str(int(rpm)),
+                "x-ratelimit-limit-tokens": str(int(tpm)),
+                "x-ratelimit-remaining-requests": str(int(requests.level)),
+                "x-ratelimit-remaining-tokens": str(int(tokens.level)),
+                "x-ratelimit-reset-requests": f"{requests.shortfall(requests.capacity):.3f}s",
+                "x-ratelimit-reset-tokens": f"{tokens.shortfall(tokens.capacity):.3f}s",
+            },
+        )
+
+    async def get_stats(request: Request):
+        return JSONResponse(stats)
+
+    return Starlette(routes=[
+        Route("/v1/chat/completions", completions, methods=["POST"]),
+        Route("/stats", get_stats),
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--rpm", type=float, default=600)
+    parser.add_argument("--tpm", type=float, default=100000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.rpm, args.tpm, args.latency), host="127.0.0.1", port=args.port, log_level="error")
+
+
+if __name__ == "__main__":
+    main()
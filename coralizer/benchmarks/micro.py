@@ -0,0 +1,337 @@
+"""Micro-benchmarks for the Python helpers that run on every agent step, with regression checks.
+
+Every case uses synthetic fixtures built in memory, so nothing touches the
+network:
+
+- ``tools_description``: ``get_tools_description`` over 10, 50 and 200
+  Coral-style tools, in compact and full mode;
+- ``jina_context``: ``JinaBrowsingToolkit.get_url_content_with_context`` on a
+  2 MB page, with the search string found and not found;
+- ``mcp_resources``: ``convert_mcp_resource_to_blob`` on 4 MB text and binary
+  blobs, and ``load_mcp_resources`` over an in-memory session;
+- ``worker_prompt``: the prompt ``create_agent`` builds, rendered for one step;
+- ``render_agent_file``: the coralizer filling in ``base_coralizer.py``.
+
+Cases whose example dependencies (CAMEL, LangChain) are not installed are
+skipped. Each result is the median and the minimum time per call, in
+microseconds, over ``--repeat`` rounds. ``compare`` fails when a case's median
+is slower than the baseline by more than ``--threshold``. Timings depend on the
+machine, so regenerate the baseline when you move to different hardware.
+
+    cd coralizer && python -m benchmarks.micro run --json current.json
+    cd coralizer && python -m benchmarks.micro compare benchmarks/baselines/micro.json current.json
+    cd coralizer && python -m benchmarks.micro check               # run, then compare with the baseline
+    cd coralizer && python -m benchmarks.micro run --save-baseline
+"""
+import argparse
+import asyncio
+import base64
+import fnmatch
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORALIZER = os.path.dirname(HERE)
+EXAMPLES = os.path.join(os.path.dirname(CORALIZER), "examples")
+BASELINE = os.path.join(HERE, "baselines", "micro.json")
+
+CASES = {}
+
+
+def case(name):
+    """Register ``setup`` under ``name``; it returns the zero-argument callable to time."""
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+def coral_tools(count: int):
+    """Tool dicts shaped like Coral's and a typical MCP server's, with a shared ``$defs`` entry."""
+    tools = []
+    for i in range(count):
+        tools.append({
+            "name": f"tool_{i}",
+            "description": f"Tool number {i}. Sends a message to a thread and waits for the agents it mentions "
+                           "to reply, returning their messages.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "threadId": {"type": "string", "description": "ID of the thread"},
+                    "content": {"type": "string", "description": "Message body"},
+                    "mentions": {"type": "array", "items": {"type": "string"}},
+                    "timeoutMs": {"type": "integer", "default": 8000},
+                    "attachment": {"$ref": "#/$defs/Attachment"},
+                    "mode": {"enum": ["sync", "async"]},
+                },
+                "required": ["threadId", "content"],
+                "$defs": {
+                    "Attachment": {
+                        "type": "object",
+                        "properties": {"uri": {"type": "string"}, "mimeType": {"anyOf": [{"type": "string"}, {"type": "null"}]}},
+                    },
+                },
+            },
+        })
+    return tools
+
+
+def _tools_description(count, mode):
+    def setup():
+        from coral_runtime.schema import get_tools_description
+        tools = coral_tools(count)
+        return lambda: get_tools_description(tools, mode=mode)
+    return setup
+
+
+for _count in (10, 50, 200):
+    for _mode in ("compact", "full"):
+        case(f"tools_description/{_mode}/{_count}")(_tools_description(_count, _mode))
+
+
+def load_example(name: str, path: str):
+    """Import an example module by path; some example file names are not valid module names."""
+    directory = os.path.dirname(path)
+    if directory not in sys.path:
+        sys.path.append(directory)
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def page(size: int) -> str:
+    """A markdown page of about ``size`` characters; "Coral Protocol" appears three times near the end."""
+    paragraph = ("## Section\n\nLorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor "
+                 "incididunt ut labore et dolore magna aliqua. [link](https://example.com/page)\n\n")
+    body = paragraph * (size // len(paragraph))
+    tail = "Built on Coral Protocol. " + paragraph * 4
+    return body + tail * 3
+
+
+def _jina_context(search_string):
+    def setup():
+        tools = load_example("camel_search_tools", os.path.join(EXAMPLES, "camel-search-maths", "tools.py"))
+
+        class PageToolkit(tools.JinaBrowsingToolkit):
+            content = page(2_000_000)
+
+            def get_url_content(self, url):
+                return self.content
+
+        toolkit = PageToolkit()
+        return lambda: toolkit.get_url_content_with_context("https://example.com", search_string)
+    return setup
+
+
+case("jina_context/found")(_jina_context("Coral Protocol"))
+case("jina_context/missing")(_jina_context("not on the page"))
+
+
+def _resource_module():
+    return load_example("camel_interface_resource", os.path.join(EXAMPLES, "camel-resources", "camel-interface-resource.py"))
+
+
+BLOB_SIZE = 4_000_000
+
+
+@case("mcp_resources/convert_text")
+def _convert_text():
+    from mcp.types import TextResourceContents
+    module = _resource_module()
+    contents = TextResourceContents(uri="file:///large.txt", mimeType="text/plain", text="x" * BLOB_SIZE)
+    return lambda: module.convert_mcp_resource_to_blob("file:///large.txt", contents)
+
+
+@case("mcp_resources/convert_blob")
+def _convert_blob():
+    from mcp.types import BlobResourceContents
+    module = _resource_module()
+    blob = base64.b64encode(os.urandom(BLOB_SIZE)).decode()
+    contents = BlobResourceContents(uri="file:///large.bin", mimeType="application/octet-stream", blob=blob)
+    return lambda: module.convert_mcp_resource_to_blob("file:///large.bin", contents)
+
+
+class InMemorySession:
+    """The two ``ClientSession`` calls ``load_mcp_resources`` makes, served from a dict."""
+
+    def __init__(self, resources):
+        from mcp.types import ListResourcesResult, ReadResourceResult, Resource
+        self._list = ListResourcesResult(resources=[Resource(uri=uri, name=uri) for uri in resources])
+        self._contents = {uri: ReadResourceResult(contents=[contents]) for uri, contents in resources.items()}
+
+    async def list_resources(self):
+        return self._list
+
+    async def read_resource(self, uri):
+        return self._contents[str(uri)]
+
+
+@case("mcp_resources/load")
+def _load_resources():
+    from mcp.types import BlobResourceContents, TextResourceContents
+    module = _resource_module()
+    resources = {}
+    for i in range(4):
+        resources[f"file:///text{i}.md"] = TextResourceContents(uri=f"file:///text{i}.md", mimeType="text/markdown",
+                                                               text="y" * (BLOB_SIZE // 4))
+        resources[f"file:///blob{i}.bin"] = BlobResourceContents(uri=f"file:///blob{i}.bin", mimeType="image/png",
+                                                                blob=base64.b64encode(os.urandom(BLOB_SIZE // 4)).decode())
+    session = InMemorySession(resources)
+    loop = asyncio.new_event_loop()
+    return lambda: loop.run_until_complete(module.load_mcp_resources(session))
+
+
+@case("worker_prompt/step")
+def _worker_prompt():
+    from coral_runtime.agent import worker_prompt
+    coral, agent = coral_tools(10), coral_tools(20)
+
+    def step():
+        prompt = worker_prompt(coral, agent, mentions_input=True)
+        return prompt.format_messages(input="Received mentions:\n- thread t1 from user_interaction_agent: hi",
+                                      agent_scratchpad=[])
+    return step
+
+
+@case("render_agent_file")
+def _render_agent_file():
+    sys.path.append(os.path.join(CORALIZER, "utils"))
+    from coralizer import render_agent_file
+    with open(os.path.join(CORALIZER, "utils", "base_coralizer.py")) as f:
+        template = f.read()
+    description = "You are an firecrawl agent capable of scraping, crawling and extracting content from web pages."
+    return lambda: render_agent_file(template, "firecrawl", description, "http://localhost:3000/sse")
+
+
+def measure(func, repeat: int, min_time: float = 0.05):
+    """Per-call seconds for ``repeat`` rounds, each running ``func`` enough times to take ``min_time``."""
+    func()
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        loops *= 2 if elapsed == 0 else max(2, int(min_time / elapsed) + 1)
+    rounds = [elapsed / loops]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        rounds.append((time.perf_counter() - started) / loops)
+    return rounds, loops
+
+
+def run(patterns, repeat: int):
+    results, skipped = {}, {}
+    for name, setup in CASES.items():
+        if patterns and not any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+            continue
+        try:
+            func = setup()
+        except ImportError as e:
+            skipped[name] = str(e)
+            print(f"  {name:<36} skipped ({e})")
+            continue
+        rounds, loops = measure(func, repeat)
+        results[name] = {
+            "median_us": statistics.median(rounds) * 1e6,
+            "min_us": min(rounds) * 1e6,
+            "loops": loops,
+            "repeat": repeat,
+        }
+        print(f"  {name:<36} {results[name]['median_us']:>12.1f} us  (min {results[name]['min_us']:.1f}, {loops} loops)")
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+        },
+        "results": results,
+        "skipped": skipped,
+    }
+
+
+def compare(baseline, current, threshold: float) -> bool:
+    """Print each case's change against the baseline; ``False`` if any regressed beyond ``threshold``."""
+    ok = True
+    print(f"  {'case':<36} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"  {name:<36} {'-':>12} {result['median_us']:>9.1f} us {'new':>8}")
+            continue
+        change = result["median_us"] / before["median_us"] - 1
+        status = ""
+        if change > threshold:
+            status = "  REGRESSION"
+            ok = False
+        print(f"  {name:<36} {before['median_us']:>9.1f} us {result['median_us']:>9.1f} us {change:>+7.0%}{status}")
+    missing = [name for name in baseline["results"] if name not in current["results"]]
+    if missing:
+        print(f"  ({len(missing)} baseline cases not run)")
+    if baseline.get("meta", {}).get("platform") != current.get("meta", {}).get("platform"):
+        print(f"note: baseline is from {baseline.get('meta', {}).get('platform')}, "
+              f"this run is from {current.get('meta', {}).get('platform')}")
+    print(f"{'no regressions' if ok else 'regressions'} beyond {threshold:.0%}")
+    return ok
+
+
+def _load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save(results, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"wrote {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for name in ("run", "check"):
+        command = commands.add_parser(name)
+        command.add_argument("-k", dest="patterns", action="append", default=[],
+                             help="only run cases matching this glob, e.g. 'tools_description/*' (repeatable)")
+        command.add_argument("--repeat", type=int, default=7)
+        command.add_argument("--json", help="write the results to this file")
+    commands.choices["run"].add_argument("--save-baseline", action="store_true", help=f"write the results to {BASELINE}")
+
+    for name in ("compare", "check"):
+        command = commands.choices.get(name) or commands.add_parser(name)
+        command.add_argument("--threshold", type=float, default=0.25,
+                             help="fail when a median is slower than the baseline by more than this fraction")
+    commands.choices["check"].add_argument("--baseline", default=BASELINE)
+    commands.choices["compare"].add_argument("baseline")
+    commands.choices["compare"].add_argument("current")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        sys.exit(0 if compare(_load(args.baseline), _load(args.current), args.threshold) else 1)
+
+    results = run(args.patterns, args.repeat)
+    if args.json:
+        _save(results, args.json)
+    if args.command == "run" and args.save_baseline:
+        _save(results, BASELINE)
+    if args.command == "check":
+        sys.exit(0 if compare(_load(args.baseline), results, args.threshold) else 1)
+
+
+if __name__ == "__main__":
+    main()
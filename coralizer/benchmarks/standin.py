@@ -0,0 +1,46 @@
+"""A local stand-in MCP server for the benchmarks, so they need no network or API keys."""
+import asyncio
+import socket
+import subprocess
+import sys
+import time
+
+# argv: port, transport ("sse" or "stdio"). The port is ignored for stdio.
+STANDIN_SERVER = """
+import sys
+from mcp.server.fastmcp import FastMCP
+server = FastMCP("standin", port=int(sys.argv[1]), log_level="ERROR")
+
+@server.tool()
+def echo(text: str) -> str:
+    return text
+
+server.run(transport=sys.argv[2] if len(sys.argv) > 2 else "sse")
+"""
+
+
+def stdio_command():
+    """Command line that runs the stand-in server over stdio."""
+    return [sys.executable, "-c", STANDIN_SERVER, "0", "stdio"]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, "-c", STANDIN_SERVER, str(port)])
+
+
+async def wait_listening(port: int, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.05)
+    raise TimeoutError(f"stand-in server did not start on port {port}")
@@ -0,0 +1,26 @@
+"""Shared runtime helpers for coralized agents and the Python examples.
+
+Generated agents live next to this package in ``coralizer/`` and import it
+directly. The examples add ``coralizer/`` to ``sys.path`` before importing.
+
+Names below are resolved on first access so that importing the package (as
+every generated agent does) does not pull in LangChain or MCP.
+"""
+import importlib
+
+_EXPORTS = {
+    "AgentDefinition": "agent",
+    "run": "agent",
+    "run_agent": "agent",
+    "run_host": "host",
+    "SupervisedConnection": "connection",
+    "get_tools_description": "schema",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
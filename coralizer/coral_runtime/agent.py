@@ -0,0 +1,326 @@
+"""The coralized worker agent: prompt, executor and mention loop.
+
+A worker connects to Coral and to its own MCP server, waits for mentions, runs
+the instruction with its tools and replies in the same thread. Generated
+``<name>_coral_agent.py`` files are just an ``AgentDefinition`` passed to
+``run``; the multi-agent host (``coral_runtime.host``) calls ``run_agent``.
+
+LangChain and MCP are imported on first use rather than at module import.
+``run_agent`` starts importing them in a background thread while the Coral
+handshake is in flight, so the two overlap instead of adding up.
+"""
+import asyncio
+import importlib
+import logging
+import os
+import urllib.parse
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Literal, Optional
+
+from .answer_cache import PendingMentions, answer_cache_from_env, answer_mentions, record_replies, toolset_key
+from .logs import configure_logging, set_log_agent
+from .metrics import invocation, metrics_from_env, watch_loop_lag
+from .payloads import fetch_payload_tool, offload_messages, offload_results, payload_store_from_env
+from .profiler import profile_from_env, watch_loop
+from .schema import get_tools_description, log_savings, schema_mode_from_env
+from .scratchpad import scratchpad_compactor_from_env
+from .singleflight import coalesce_tools
+
+logger = logging.getLogger(__name__)
+
+# Modules the agent needs before it can build its executor.
+HEAVY_MODULES = (
+    "langchain_mcp_adapters.tools",
+    "langchain.agents",
+    "langchain.chat_models",
+    "langchain.prompts",
+    "langchain_openai",
+)
+
+
+def warm_imports(modules=HEAVY_MODULES) -> "asyncio.Future":
+    """Import ``modules`` in a worker thread; await the result before using them."""
+    return asyncio.ensure_future(asyncio.to_thread(lambda: [importlib.import_module(m) for m in modules]))
+
+
+DEFAULT_CORAL_BASE_URL = "http://localhost:5555/devmode/exampleApplication/privkey/session1/sse"
+
+WORKER_SYSTEM_PROMPT = """You are an agent interacting with the tools from Coral Server and having your own tools. Your task is to perform any instructions coming from any agent.
+            Follow these steps in order:
+            1. Call wait_for_mentions from coral tools (timeoutMs: 30000) to receive mentions from other agents.
+            2. When you receive a mention, keep the thread ID and the sender ID.
+            3. Take 2 seconds to think about the content (instruction) of the message and check only from the list of your tools available for you to action.
+            4. Check the tool schema and make a plan in steps for the task you want to perform.
+            5. Only call the tools you need to perform for each step of the plan to complete the instruction in the content.
+            6. Take 3 seconds and think about the content and see if you have executed the instruction to the best of your ability and the tools. Make this your response as "answer".
+            7. Use `send_message` from coral tools to send a message in the same thread ID to the sender Id you received the mention from, with content: "answer".
+            8. If any error occurs, use `send_message` to send a message in the same thread ID to the sender Id you received the mention from, with content: "error".
+            9. Always respond back to the sender agent even if you have no answer or error.
+            9. Wait for 2 seconds and repeat the process from step 1.
+
+            These are the list of coral tools: {coral_tools_description}
+            These are the list of your tools: {agent_tools_description}"""
+
+def _sse(url: str) -> Dict[str, Any]:
+    return {"transport": "sse", "url": url, "timeout": 300, "sse_read_timeout": 300}
+
+
+@dataclass
+class AgentDefinition:
+    """The fields ``coralizer.py`` fills in for a generated agent.
+
+    The agent's own MCP server is reached over SSE at ``mcp_server_url``, or,
+    with ``mcp_transport="stdio"``, launched locally from ``mcp_command``.
+    ``interactive`` agents have their model calls scheduled ahead of the rest.
+    ``log_level`` overrides ``CORAL_LOG_LEVEL`` for this agent's log records.
+    """
+
+    agent_id: str
+    agent_description: str
+    mcp_server_url: str = ""
+    coral_base_url: str = DEFAULT_CORAL_BASE_URL
+    wait_for_agents: int = 2
+    system_prompt: Optional[str] = None
+    mcp_transport: Literal["sse", "stdio"] = "sse"
+    mcp_command: List[str] = field(default_factory=list)
+    mcp_env: Dict[str, str] = field(default_factory=dict)
+    interactive: bool = False
+    log_level: Optional[str] = None
+
+    def __post_init__(self):
+        if self.mcp_transport == "stdio" and not self.mcp_command:
+            raise ValueError(f"{self.agent_id}: stdio transport needs mcp_command")
+        if self.mcp_transport == "sse" and not self.mcp_server_url:
+            raise ValueError(f"{self.agent_id}: sse transport needs mcp_server_url")
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AgentDefinition":
+        """Build from the camelCase keys used in ``coral_params`` and the fleet file."""
+        return cls(
+            agent_id=data["agentId"],
+            agent_description=data.get("agentDescription", ""),
+            mcp_server_url=data.get("mcpServerUrl", ""),
+            coral_base_url=data.get("coralBaseUrl", DEFAULT_CORAL_BASE_URL),
+            wait_for_agents=data.get("waitForAgents", 2),
+            system_prompt=data.get("systemPrompt"),
+            mcp_transport=data.get("mcpTransport", "sse"),
+            mcp_command=data.get("mcpCommand", []),
+            mcp_env=data.get("mcpEnv", {}),
+            interactive=data.get("interactive", False),
+            log_level=data.get("logLevel"),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "agentId": self.agent_id,
+            "agentDescription": self.agent_description,
+            "mcpServerUrl": self.mcp_server_url,
+            "coralBaseUrl": self.coral_base_url,
+            "waitForAgents": self.wait_for_agents,
+        }
+        if self.system_prompt is not None:
+            data["systemPrompt"] = self.system_prompt
+        if self.mcp_transport != "sse":
+            data.update(mcpTransport=self.mcp_transport, mcpCommand=self.mcp_command)
+            if self.mcp_env:
+                data["mcpEnv"] = self.mcp_env
+        if self.interactive:
+            data["interactive"] = True
+        if self.log_level is not None:
+            data["logLevel"] = self.log_level
+        return data
+
+    @property
+    def mcp_connection(self) -> Dict[str, Any]:
+        """Connection entry for the agent's own MCP server."""
+        if self.mcp_transport == "stdio":
+            return {"transport": "stdio", "command": self.mcp_command[0], "args": self.mcp_command[1:], "env": self.mcp_env}
+        return _sse(self.mcp_server_url)
+
+    @property
+    def coral_url(self) -> str:
+        return self._coral_url(wait_for_agents=self.wait_for_agents)
+
+    @property
+    def coral_reconnect_url(self) -> str:
+        """``coral_url`` without ``waitForAgents``: reconnects skip the startup handshake."""
+        return self._coral_url(wait_for_agents=None)
+
+    def _coral_url(self, wait_for_agents: Optional[int]) -> str:
+        params = {"agentId": self.agent_id, "agentDescription": self.agent_description}
+        if wait_for_agents is not None:
+            params = {"waitForAgents": wait_for_agents, **params}
+        return f"{self.coral_base_url}?{urllib.parse.urlencode(params)}"
+
+
+def create_model(**overrides: Any):
+    """The chat model used by coralized agents; ``overrides`` go to ``init_chat_model``.
+
+    OpenAI models send their requests through the process-wide rate limiter
+    unless an ``http_async_client`` is passed in. Calls are timed by a
+    ``ModelTimer`` unless ``callbacks`` are passed in.
+    """
+    from langchain.chat_models import init_chat_model
+    from .executor import ModelTimer
+    from .ratelimit import rate_limited_async_client
+
+    settings = dict(
+        model="gpt-4o-mini",
+        model_provider="openai",
+        api_key=os.getenv("OPENAI_API_KEY"),
+        temperature=0.3,
+        max_tokens=16000,
+        callbacks=[ModelTimer()],
+    )
+    settings.update(overrides)
+    if settings["model_provider"] == "openai":
+        settings.setdefault("http_async_client", rate_limited_async_client())
+    return init_chat_model(**settings)
+
+
+async def create_agent(
+    agent_id: str,
+    coral_tools,
+    agent_tools,
+    model=None,
+    describe: Callable[..., str] = get_tools_description,
+    system_prompt: Optional[str] = None,
+    mentions_input: bool = False,
+    **executor_options: Any,
+):
+    """Build the worker executor.
+
+    With ``mentions_input`` the prompt takes an ``input`` human turn carrying
+    mentions the runtime has already received. ``executor_options`` go to
+    ``create_concurrent_executor`` (e.g. ``trim_intermediate_steps``).
+    """
+    from langchain.agents import create_tool_calling_agent
+    from .executor import create_concurrent_executor
+
+    combined_tools = coral_tools + agent_tools
+    log_savings(agent_id, combined_tools, logger.info)
+    prompt = worker_prompt(coral_tools, agent_tools, describe, system_prompt, mentions_input)
+    agent = create_tool_calling_agent(model or create_model(), combined_tools, prompt)
+    return create_concurrent_executor(agent, combined_tools, **executor_options)
+
+
+def worker_prompt(
+    coral_tools,
+    agent_tools,
+    describe: Callable[..., str] = get_tools_description,
+    system_prompt: Optional[str] = None,
+    mentions_input: bool = False,
+):
+    """The worker's ``ChatPromptTemplate``, with both tool lists rendered into the system message."""
+    from langchain.prompts import ChatPromptTemplate
+
+    schema_mode = schema_mode_from_env()
+    coral_tools_description = describe(coral_tools, mode=schema_mode)
+    agent_tools_description = describe(agent_tools, mode=schema_mode)
+    messages = [
+        (
+            "system",
+            (system_prompt or WORKER_SYSTEM_PROMPT).format(
+                coral_tools_description=coral_tools_description,
+                agent_tools_description=agent_tools_description,
+            ),
+        ),
+        ("placeholder", "{agent_scratchpad}"),
+    ]
+    if mentions_input:
+        messages.insert(1, ("human", "{input}"))
+    return ChatPromptTemplate.from_messages(messages)
+
+
+async def run_agent(
+    definition: AgentDefinition,
+    model=None,
+    describe: Callable[..., str] = get_tools_description,
+    ready: Optional[asyncio.Event] = None,
+):
+    """Connect ``definition`` to Coral and its MCP server and serve mentions until cancelled.
+
+    Args:
+        definition: Which agent to run.
+        model: Chat model to use; the host passes one shared instance. Defaults to ``create_model()``.
+        describe: Tool description renderer, e.g. a shared ``DescriptionCache``.
+        ready: Set once the executor is built and the mention loop is about to start.
+    """
+    warm = warm_imports()
+    from .connection import SupervisedConnection
+    from .ratelimit import BACKGROUND, INTERACTIVE, set_priority
+
+    name = definition.agent_id
+    watch_loop()
+    watch_loop_lag()
+    set_priority(INTERACTIVE if definition.interactive else BACKGROUND)
+    set_log_agent(name, definition.log_level)
+    async with SupervisedConnection(f"{name}/coral", _sse(definition.coral_url),
+                                    reconnect_connection=_sse(definition.coral_reconnect_url)) as coral_connection, \
+            SupervisedConnection(f"{name}/mcp", definition.mcp_connection) as mcp_connection:
+        await warm
+        agent_tools = await mcp_connection.get_tools()
+        coral_tools = await coral_connection.get_tools()
+        logger.info(f"{name}: coral tools count: {len(coral_tools)} and agent tools count: {len(agent_tools)}")
+
+        # Equal concurrent calls (from this agent's parallel tool calls or other agents in the host) share one call.
+        agent_tools = coalesce_tools(agent_tools)
+
+        cache = answer_cache_from_env()
+        pending: PendingMentions = {}
+        if cache is not None:
+            toolset = toolset_key(coral_tools + agent_tools)
+            coral_tools = record_replies(coral_tools, pending, cache, toolset)
+
+        payloads = payload_store_from_env()
+        if payloads is not None:
+            # Outermost, so the answer cache records the short stub that actually reached the thread.
+            coral_tools = offload_messages(coral_tools, payloads)
+            agent_tools = offload_results(agent_tools, payloads) + [fetch_payload_tool(payloads)]
+
+        # Long plans: older observations are digested so each model call stays within a token budget.
+        scratchpad = scratchpad_compactor_from_env(payloads)
+        executor_options = {}
+        if scratchpad is not None:
+            executor_options["trim_intermediate_steps"] = scratchpad
+            if payloads is None:
+                agent_tools = agent_tools + [fetch_payload_tool(scratchpad.store)]
+
+        # Built once: on a dropped connection only the session is re-established.
+        agent_executor = await create_agent(
+            name, coral_tools, agent_tools, model=model, describe=describe,
+            system_prompt=definition.system_prompt, mentions_input=cache is not None, **executor_options,
+        )
+        if ready is not None:
+            ready.set()
+
+        if cache is None:
+            async def step():
+                await agent_executor.ainvoke({"agent_scratchpad": []})
+        else:
+            async def step():
+                await answer_mentions(name, coral_connection, agent_executor, cache, toolset, pending)
+
+        while True:
+            try:
+                logger.info(f"{name}: starting new agent invocation")
+                with invocation(name):
+                    await step()
+                logger.info(f"{name}: completed agent invocation, restarting loop")
+                await asyncio.sleep(1)
+            except Exception as e:
+                logger.exception(f"{name}: error in agent loop: {e}")
+                if coral_connection.connected and mcp_connection.connected:
+                    await asyncio.sleep(5)
+                else:
+                    logger.info(f"{name}: waiting for connections to recover...")
+                    await coral_connection.wait_ready()
+                    await mcp_connection.wait_ready()
+
+
+def run(definition: AgentDefinition):
+    """Entry point of a generated agent file: serve ``definition`` until interrupted."""
+    configure_logging(agent_levels=[definition.log_level])
+    profile_from_env(definition.agent_id)
+    metrics_from_env(definition.agent_id)
+    asyncio.run(run_agent(definition))
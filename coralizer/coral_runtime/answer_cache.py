@@ -0,0 +1,291 @@
+"""Opt-in answer cache for worker agents that get the same instruction repeatedly.
+
+Worker agents like firecrawl or the world news agent are often asked the same
+thing from different threads ("latest news on X", "scrape URL Y"). With the
+cache enabled, the runtime receives mentions itself, answers repeated
+instructions straight from the cache with ``send_message``, and only runs the
+model and tools for the rest. Answers the agent sends are recorded for next
+time.
+
+Keys are the normalized instruction plus the agent's tool set. Normalizing
+only casefolds and collapses whitespace and punctuation: words in any script,
+numbers, URLs and operators all stay in the key. Entries expire after a TTL
+and the cache is LRU-bounded. With a fuzzy threshold set, near-duplicate
+instructions also hit, using a local word/bigram Jaccard index so no
+embedding service is needed. A fuzzy hit also needs both instructions to name
+the same numbers, URLs and capitalized or non-ASCII words, so "news on
+Lisbon" never answers "news on Porto", however similar the rest is.
+
+Settings (all via environment):
+    CORAL_ANSWER_CACHE=1            enable
+    CORAL_ANSWER_CACHE_TTL=600      seconds an answer stays valid
+    CORAL_ANSWER_CACHE_SIZE=256     maximum number of answers kept
+    CORAL_ANSWER_CACHE_FUZZY=0.85   minimum similarity for a fuzzy hit (unset: exact only)
+"""
+import logging
+import os
+import re
+import time
+import xml.etree.ElementTree as ElementTree
+from collections import OrderedDict, defaultdict, deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from .metrics import CACHE_REQUESTS, mention_answered, mentions_received
+
+logger = logging.getLogger(__name__)
+
+# Human turn used when the runtime has already received the mentions (answer cache mode).
+RECEIVED_MENTIONS_INPUT = """These mentions were already received with wait_for_mentions, so skip step 1 and do not call wait_for_mentions.
+Handle each one from step 2 and reply to its sender in its thread with send_message:
+{mentions}"""
+
+_HIT = CACHE_REQUESTS.labels("answer", "hit")
+_MISS = CACHE_REQUESTS.labels("answer", "miss")
+
+_URL = r"[a-z][a-z0-9+.-]*://\S+?(?=[.,;:!?)\]]*(?:\s|$))"
+_NUMBER = r"\d+(?:[.,]\d+)*"
+_WORD = r"\w+(?:[.:/_'-]\w+)*"
+_OPERATOR = r"[-+*/^=<>%&|~]"
+_TOKEN = re.compile(f"{_URL}|{_NUMBER}|{_WORD}|{_OPERATOR}", re.IGNORECASE)
+_MENTION = re.compile(r"@\w+")
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN.findall(_MENTION.sub(" ", text))
+
+
+def normalize_instruction(text: str) -> str:
+    """Casefold, drop ``@agent`` mentions and other punctuation, collapse whitespace.
+
+    Words in any script, numbers, URLs and operators are kept, so "2.5*4" and
+    "2.5+4" or "news on 北京" and "news on 上海" stay different.
+    """
+    return " ".join(_tokens(text)).casefold()
+
+
+def instruction_anchors(text: str) -> FrozenSet[str]:
+    """Tokens a fuzzy hit must share exactly: numbers, URLs, operators and capitalized or non-ASCII words.
+
+    The first word is skipped, since it is capitalized only for starting the sentence.
+    """
+    anchors = set()
+    for position, token in enumerate(_tokens(text)):
+        if (not token.isascii() or "://" in token or any(c.isdigit() for c in token) or not token[0].isalnum()
+                or (position > 0 and token[0].isupper())):
+            anchors.add(token.casefold())
+    return frozenset(anchors)
+
+
+def toolset_key(tools: Iterable[Any]) -> str:
+    """Stable key for the set of tools an answer was produced with."""
+    return ",".join(sorted(getattr(tool, "name", str(tool)) for tool in tools))
+
+
+def _shingles(normalized: str) -> FrozenSet[str]:
+    words = normalized.split()
+    return frozenset(words + [f"{a} {b}" for a, b in zip(words, words[1:])])
+
+
+@dataclass
+class _Entry:
+    answer: str
+    expires_at: float
+    shingles: FrozenSet[str]
+    anchors: FrozenSet[str]
+
+
+class AnswerCache:
+    """TTL + LRU answer cache with optional lexical fuzzy matching."""
+
+    def __init__(self, ttl: float = 600.0, max_entries: int = 256, fuzzy_threshold: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.fuzzy_threshold = fuzzy_threshold
+        self.clock = clock
+        self.hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._index: Dict[Tuple[str, str], Set[Tuple[str, str]]] = defaultdict(set)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, instruction: str, toolset: str = "") -> Optional[str]:
+        normalized = normalize_instruction(instruction)
+        key = (toolset, normalized)
+        entry = self._live(key)
+        if entry is None and self.fuzzy_threshold is not None:
+            key, entry = self._nearest(toolset, _shingles(normalized), instruction_anchors(instruction))
+            if entry is not None:
+                self.fuzzy_hits += 1
+        if entry is None:
+            self.misses += 1
+            _MISS.inc()
+            return None
+        self.hits += 1
+        _HIT.inc()
+        self._entries.move_to_end(key)
+        return entry.answer
+
+    def put(self, instruction: str, answer: str, toolset: str = ""):
+        normalized = normalize_instruction(instruction)
+        if not normalized:
+            return
+        key = (toolset, normalized)
+        self._remove(key)
+        entry = _Entry(answer, self.clock() + self.ttl, _shingles(normalized), instruction_anchors(instruction))
+        self._entries[key] = entry
+        for shingle in entry.shingles:
+            self._index[(toolset, shingle)].add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _live(self, key) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= self.clock():
+            self._remove(key)
+            return None
+        return entry
+
+    def _nearest(self, toolset: str, shingles: FrozenSet[str], anchors: FrozenSet[str]):
+        candidates: Set[Tuple[str, str]] = set()
+        for shingle in shingles:
+            candidates |= self._index.get((toolset, shingle), set())
+        best_key, best_entry, best_score = None, None, 0.0
+        for key in candidates:
+            entry = self._live(key)
+            if entry is None or entry.anchors != anchors:
+                continue
+            score = len(shingles & entry.shingles) / len(shingles | entry.shingles)
+            if score > best_score:
+                best_key, best_entry, best_score = key, entry, score
+        if best_score >= self.fuzzy_threshold:
+            return best_key, best_entry
+        return None, None
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for shingle in entry.shingles:
+            bucket = self._index.get((key[0], shingle))
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._index[(key[0], shingle)]
+
+
+def answer_cache_from_env() -> Optional[AnswerCache]:
+    """Build the cache from ``CORAL_ANSWER_CACHE*`` settings, or ``None`` when disabled."""
+    if os.getenv("CORAL_ANSWER_CACHE", "").lower() not in ("1", "true", "yes"):
+        return None
+    fuzzy = os.getenv("CORAL_ANSWER_CACHE_FUZZY")
+    return AnswerCache(
+        ttl=float(os.getenv("CORAL_ANSWER_CACHE_TTL", 600)),
+        max_entries=int(os.getenv("CORAL_ANSWER_CACHE_SIZE", 256)),
+        fuzzy_threshold=float(fuzzy) if fuzzy else None,
+    )
+
+
+@dataclass
+class Mention:
+    thread_id: str
+    sender_id: str
+    content: str
+
+
+def parse_mentions(text: str) -> List[Mention]:
+    """Extract messages from a ``wait_for_mentions`` result (Coral's XML-encoded message list)."""
+    try:
+        root = ElementTree.fromstring(text)
+    except ElementTree.ParseError:
+        return []
+    mentions = []
+    for element in root.iter():
+        fields = dict(element.attrib)
+        for child in element:
+            if child.tag in ("threadId", "senderId", "content") and child.text is not None:
+                fields[child.tag] = child.text
+        if {"threadId", "senderId", "content"} <= fields.keys():
+            mentions.append(Mention(fields["threadId"], fields["senderId"], fields["content"]))
+    return mentions
+
+
+def tool_result_text(result: Any) -> str:
+    """Concatenate the text parts of an MCP ``CallToolResult``."""
+    return "\n".join(getattr(part, "text", "") for part in getattr(result, "content", []) or [])
+
+
+PendingMentions = Dict[str, Deque[Mention]]
+
+
+def add_pending(pending: PendingMentions, mentions: Iterable[Mention]):
+    """Queue ``mentions`` for ``record_replies``, in order, per thread."""
+    for mention in mentions:
+        pending.setdefault(mention.thread_id, deque()).append(mention)
+
+
+def record_replies(tools: List[Any], pending: PendingMentions, cache: AnswerCache, toolset: str) -> List[Any]:
+    """Wrap ``send_message`` so replies to ``pending`` mentions are stored in ``cache``.
+
+    ``pending`` maps thread IDs to the mentions being answered there, oldest
+    first; each reply sent to a thread consumes the oldest, so several mentions
+    in one thread each get their own answer. Replies starting with "error" are
+    not cached.
+    """
+    def recording(send):
+        async def send_message(**kwargs):
+            result = await send(**kwargs)
+            thread_id = kwargs.get("threadId")
+            queue = pending.get(thread_id)
+            mention = queue.popleft() if queue else None
+            if queue is not None and not queue:
+                del pending[thread_id]
+            content = kwargs.get("content") or ""
+            if mention is not None and content and not content.strip().lower().startswith("error"):
+                cache.put(mention.content, content, toolset)
+            return result
+        return send_message
+
+    return [
+        tool.model_copy(update={"coroutine": recording(tool.coroutine)})
+        if tool.name == "send_message" and getattr(tool, "coroutine", None) is not None else tool
+        for tool in tools
+    ]
+
+
+async def answer_mentions(name: str, coral_session: Any, agent_executor: Any, cache: AnswerCache, toolset: str,
+                          pending: PendingMentions):
+    """One loop turn in answer cache mode: reply to cached instructions, run the agent on the rest.
+
+    ``coral_session`` is anything with an MCP ``call_tool`` (a ``ClientSession`` or
+    ``SupervisedConnection``). ``agent_executor`` must have been built with an
+    ``{input}`` human turn; it receives the uncached mentions there. Its tools
+    should come from ``record_replies`` with the same ``pending`` dict.
+    """
+    result = await coral_session.call_tool("wait_for_mentions", {"timeoutMs": 30000})
+    mentions = parse_mentions(tool_result_text(result))
+    mentions_received(name, [mention.thread_id for mention in mentions])
+    misses = []
+    for mention in mentions:
+        answer = cache.get(mention.content, toolset)
+        if answer is None:
+            misses.append(mention)
+            continue
+        logger.info(f"{name}: answer cache hit for thread {mention.thread_id}")
+        await coral_session.call_tool(
+            "send_message", {"threadId": mention.thread_id, "content": answer, "mentions": [mention.sender_id]}
+        )
+        mention_answered(name, mention.thread_id)
+    if not misses:
+        return
+    pending.clear()
+    add_pending(pending, misses)
+    listing = "\n".join(
+        f"- threadId: {m.thread_id}, senderId: {m.sender_id}, content: {m.content}" for m in misses
+    )
+    await agent_executor.ainvoke({"agent_scratchpad": [], "input": RECEIVED_MENTIONS_INPUT.format(mentions=listing)})
+    logger.info(f"{name}: answer cache {cache.hits} hits ({cache.fuzzy_hits} fuzzy), {cache.misses} misses")
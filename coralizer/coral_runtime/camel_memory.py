@@ -0,0 +1,202 @@
+"""Token-bounded memory for CAMEL ``ChatAgent``s that step in a loop.
+
+The CAMEL examples step their agents over and over with the same
+"[automated] continue collaborating..." message, so a message-count window
+fills up with repeats and the prompt grows until it hits ``token_limit``.
+``TokenBoundedMemory`` keeps the history under a token budget instead:
+
+- a user message identical to an earlier one replaces it, so repeated nudges
+  are stored once, at their latest position;
+- the system message, and any record written with ``extra_info={"pinned": "true"}``,
+  is never evicted;
+- over budget, the oldest turn (a user message and the assistant and tool
+  messages that follow it) is evicted whole, so tool calls are never split from
+  their results;
+- evicted turns are summarized into one short line each, without calling a
+  model, in a system message after the pinned ones. That summary may take at
+  most a quarter of the budget, and its oldest lines are dropped first.
+
+The history stays within ``token_budget`` unless the pinned records and the
+newest turn alone exceed it; the summary is then dropped as well.
+
+    memory = TokenBoundedMemory.for_model(model, token_budget=MEMORY_TOKEN_BUDGET, token_limit=TOKEN_LIMIT)
+    agent = ChatAgent(system_message=..., model=model, tools=tools, memory=memory)
+
+    cd coralizer && python -m benchmarks.bench_camel_memory --steps 1000
+"""
+import json
+from typing import Callable, Dict, List, Optional, Sequence
+from uuid import UUID
+
+from camel.memories import AgentMemory, BaseContextCreator, ContextRecord, MemoryRecord, ScoreBasedContextCreator
+from camel.messages import BaseMessage, FunctionCallingMessage
+from camel.types import OpenAIBackendRole
+
+Summarizer = Callable[[Sequence[MemoryRecord]], str]
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+def summarize_turn(records: Sequence[MemoryRecord]) -> str:
+    """One line per evicted turn: the request, tool calls with clipped results, and the reply."""
+    parts = []
+    for record in records:
+        message = record.message
+        if isinstance(message, FunctionCallingMessage):
+            if message.result is None:
+                parts.append(f"called {message.func_name}({_clip(json.dumps(message.args or {}), 80)})")
+            else:
+                parts.append(f"{message.func_name} -> {_clip(message.result, 80)}")
+        elif message.content:
+            speaker = "user" if record.role_at_backend == OpenAIBackendRole.USER else "assistant"
+            parts.append(f"{speaker}: {_clip(message.content, 120)}")
+    return "- " + "; ".join(parts)
+
+
+class TokenBoundedMemory(AgentMemory):
+    """Chat history bounded by tokens, with nudge deduplication, pinning and summaries of evicted turns.
+
+    Args:
+        context_creator: Used to count tokens and to build the final context.
+        token_budget: Tokens the stored history, summary included, may take. Defaults to
+            the context creator's ``token_limit``.
+        summary_budget: Tokens the summary of evicted turns may take, capped at
+            ``summary_share`` of ``token_budget``.
+        summary_share: Largest share of ``token_budget`` the summary may take.
+        summarizer: Turns the records of an evicted turn into a summary line.
+    """
+
+    def __init__(self, context_creator: BaseContextCreator, token_budget: Optional[int] = None,
+                 summary_budget: int = 1000, summary_share: float = 0.25, summarizer: Summarizer = summarize_turn,
+                 agent_id: Optional[str] = None):
+        self._context_creator = context_creator
+        self.token_budget = token_budget or context_creator.token_limit
+        self.summary_budget = min(summary_budget, int(self.token_budget * summary_share))
+        self.summarizer = summarizer
+        self._agent_id = agent_id
+        self._records: List[MemoryRecord] = []
+        self._tokens: Dict[UUID, int] = {}
+        # Turn numbers are assigned on write, so dropping a repeated nudge keeps its turn's boundaries.
+        self._turn_of: Dict[UUID, int] = {}
+        self._turn = 0
+        self._summary: List[str] = []
+        self._summary_tokens = 0
+        self.evicted = 0
+        self.deduplicated = 0
+
+    @classmethod
+    def for_model(cls, model, token_budget: Optional[int] = None, token_limit: Optional[int] = None,
+                  **kwargs) -> "TokenBoundedMemory":
+        """Memory for a ``ModelFactory`` model, counting tokens with its tokenizer.
+
+        ``token_limit`` caps the context as ``ChatAgent(token_limit=...)`` does (default: the model's limit).
+        """
+        creator = ScoreBasedContextCreator(model.token_counter, token_limit or model.token_limit)
+        return cls(creator, token_budget, **kwargs)
+
+    @property
+    def agent_id(self) -> Optional[str]:
+        return self._agent_id
+
+    @agent_id.setter
+    def agent_id(self, val: Optional[str]) -> None:
+        self._agent_id = val
+
+    def get_context_creator(self) -> BaseContextCreator:
+        return self._context_creator
+
+    def total_tokens(self) -> int:
+        return sum(self._tokens.values()) + self._summary_tokens
+
+    def _count(self, messages) -> int:
+        return self._context_creator.token_counter.count_tokens_from_messages(messages)
+
+    def write_records(self, records: List[MemoryRecord]) -> None:
+        for record in records:
+            if record.agent_id == "" and self.agent_id is not None:
+                record.agent_id = self.agent_id
+            if record.role_at_backend == OpenAIBackendRole.USER and not isinstance(record.message, FunctionCallingMessage):
+                self._drop_repeats(record.message.content)
+                self._turn += 1
+            self._records.append(record)
+            self._tokens[record.uuid] = self._count([record.to_openai_message()])
+            self._turn_of[record.uuid] = self._turn
+        self._evict()
+
+    def _drop_repeats(self, content: str):
+        repeats = [r for r in self._records if r.role_at_backend == OpenAIBackendRole.USER
+                   and r.message.content == content and not self._pinned(r)]
+        for record in repeats:
+            self._forget(record)
+        self.deduplicated += len(repeats)
+
+    @staticmethod
+    def _pinned(record: MemoryRecord) -> bool:
+        return record.role_at_backend == OpenAIBackendRole.SYSTEM or record.extra_info.get("pinned") == "true"
+
+    def _forget(self, record: MemoryRecord):
+        self._records.remove(record)
+        del self._tokens[record.uuid]
+        del self._turn_of[record.uuid]
+
+    def _turns(self) -> List[List[MemoryRecord]]:
+        turns: Dict[int, List[MemoryRecord]] = {}
+        for record in self._records:
+            if not self._pinned(record):
+                turns.setdefault(self._turn_of[record.uuid], []).append(record)
+        return list(turns.values())
+
+    def _evict(self):
+        if self.total_tokens() <= self.token_budget:
+            return
+        turns = self._turns()
+        # The newest turn always stays, even if it alone is over budget.
+        for turn in turns[:-1]:
+            if self.total_tokens() <= self.token_budget:
+                break
+            for record in turn:
+                self._forget(record)
+            self.evicted += 1
+            self._add_summary(self.summarizer(turn))
+        if self.total_tokens() > self.token_budget:
+            # Only pinned records and the newest turn are left; they matter more than the summary.
+            self._summary.clear()
+            self._summary_tokens = 0
+
+    def _add_summary(self, line: str):
+        self._summary.append(line)
+        while True:
+            self._summary_tokens = self._count([self._summary_message().to_openai_message(OpenAIBackendRole.SYSTEM)])
+            if self._summary_tokens <= self.summary_budget:
+                return
+            self._summary.pop(0)
+            if not self._summary:
+                self._summary_tokens = 0
+                return
+
+    def _summary_message(self) -> BaseMessage:
+        return BaseMessage.make_assistant_message(
+            role_name="memory",
+            content="Summary of earlier turns that no longer fit in the context:\n" + "\n".join(self._summary),
+        )
+
+    def retrieve(self) -> List[ContextRecord]:
+        pinned = [r for r in self._records if self._pinned(r)]
+        rest = [r for r in self._records if not self._pinned(r)]
+        records = pinned
+        if self._summary:
+            records = pinned + [MemoryRecord(message=self._summary_message(), role_at_backend=OpenAIBackendRole.SYSTEM,
+                                             agent_id=self.agent_id or "")]
+        # The context creator orders records by the ContextRecord timestamp, so number them in our order.
+        return [ContextRecord(memory_record=record, score=1.0, timestamp=float(position))
+                for position, record in enumerate(records + rest)]
+
+    def clear(self) -> None:
+        self._records.clear()
+        self._tokens.clear()
+        self._turn_of.clear()
+        self._summary.clear()
+        self._summary_tokens = 0
@@ -0,0 +1,210 @@
+"""Supervised MCP connection that survives SSE drops without rebuilding the agent.
+
+``SupervisedConnection`` owns the transport and ``ClientSession`` in a
+background task and exposes the ``list_tools``/``call_tool`` surface of a
+session. Tools loaded from it call through the supervisor, so when the
+connection dies only the session is re-established; the ``AgentExecutor`` and
+tool wrappers built at startup are reused as-is.
+
+For ``stdio`` connections the supervisor also owns the server process: it is
+spawned on connect, terminated on close, and respawned if it dies.
+
+Liveness is checked with MCP pings every ``keepalive_interval`` seconds, and
+immediately after any failed tool call. A stream that dies silently is
+therefore noticed within ``keepalive_interval + keepalive_timeout`` seconds
+(8 s at the defaults). Reconnects use exponential backoff with full jitter.
+"""
+import asyncio
+import logging
+import os
+import random
+import time
+from contextlib import AsyncExitStack
+from typing import Any, Dict, List, Optional
+
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+from mcp.client.stdio import StdioServerParameters, stdio_client
+from mcp.shared.exceptions import McpError
+
+from .metrics import CONNECTION_UP, RECONNECTS
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionFailed(RuntimeError):
+    """Raised when a supervised connection gives up after ``max_attempts``."""
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff: uniform in ``[0, min(cap, base * 2**attempt)]``."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class SupervisedConnection:
+    """A self-healing MCP client session.
+
+    Args:
+        name: Label used in logs, e.g. ``"coral"`` or ``"mcp"``.
+        connection: Same shape as a ``MultiServerMCPClient`` connection entry: ``transport``
+            plus ``url``, ``timeout``, ``sse_read_timeout``, ``headers`` for ``"sse"``, or
+            ``command``, ``args``, ``env``, ``cwd`` for ``"stdio"``. The stdio server inherits
+            this process's environment, with ``env`` applied on top.
+        keepalive_interval: Seconds between pings, whether or not tools are being called.
+        keepalive_timeout: Seconds a ping may take before the session is considered dead.
+        backoff_base: First reconnect delay ceiling, doubled per failed attempt.
+        backoff_max: Upper bound on the reconnect delay ceiling.
+        max_attempts: Consecutive failed connects before giving up; ``None`` retries forever.
+        reconnect_connection: Connection entry to use once connected before, e.g. the Coral URL
+            without ``waitForAgents`` so the startup handshake is not repeated. Defaults to ``connection``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        connection: Dict[str, Any],
+        keepalive_interval: float = 5.0,
+        keepalive_timeout: float = 3.0,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        max_attempts: Optional[int] = None,
+        reconnect_connection: Optional[Dict[str, Any]] = None,
+    ):
+        self.name = name
+        self.connection = connection
+        self.reconnect_connection = reconnect_connection
+        self.keepalive_interval = keepalive_interval
+        self.keepalive_timeout = keepalive_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_attempts = max_attempts
+        self.session: Optional[ClientSession] = None
+        self.reconnects = 0
+        self.last_recovery_seconds: Optional[float] = None
+        self._ready = asyncio.Event()
+        self._check = asyncio.Event()
+        self._failure: Optional[BaseException] = None
+        self._lost_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        CONNECTION_UP.labels(name).set_function(lambda: self.connected)
+
+    @property
+    def connected(self) -> bool:
+        return self._ready.is_set()
+
+    async def __aenter__(self):
+        self._task = asyncio.create_task(self._supervise(), name=f"mcp-supervisor-{self.name}")
+        await self.wait_ready()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    async def wait_ready(self) -> ClientSession:
+        """Wait until a live session exists, raising ``ConnectionFailed`` if the supervisor gave up."""
+        if self._task is None:
+            raise ConnectionFailed(f"{self.name}: not started")
+        if self._task.done():
+            raise ConnectionFailed(f"{self.name}: supervisor stopped") from self._failure
+        if self._ready.is_set():
+            return self.session
+        ready = asyncio.create_task(self._ready.wait())
+        try:
+            done, _ = await asyncio.wait({ready, self._task}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            ready.cancel()
+        if ready not in done:
+            raise ConnectionFailed(f"{self.name}: supervisor stopped") from self._failure
+        return self.session
+
+    async def list_tools(self, *args, **kwargs):
+        session = await self.wait_ready()
+        return await session.list_tools(*args, **kwargs)
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None, *args, **kwargs):
+        session = await self.wait_ready()
+        try:
+            return await session.call_tool(name, arguments, *args, **kwargs)
+        except McpError:
+            raise
+        except Exception:
+            # Likely a transport failure; ping now instead of at the next interval.
+            self._check.set()
+            raise
+
+    async def get_tools(self) -> List[Any]:
+        """Load LangChain tools that call through this connection across reconnects."""
+        from langchain_mcp_adapters.tools import load_mcp_tools
+        return await load_mcp_tools(self)
+
+    def _open_transport(self):
+        connection = self.connection
+        if self._lost_at is not None and self.reconnect_connection is not None:
+            connection = self.reconnect_connection
+        transport = connection.get("transport", "sse")
+        if transport == "sse":
+            return sse_client(
+                connection["url"],
+                headers=connection.get("headers"),
+                timeout=connection.get("timeout", 5),
+                sse_read_timeout=connection.get("sse_read_timeout", 300),
+            )
+        if transport == "stdio":
+            return stdio_client(StdioServerParameters(
+                command=connection["command"],
+                args=connection.get("args", []),
+                env={**os.environ, **(connection.get("env") or {})},
+                cwd=connection.get("cwd"),
+            ))
+        raise ValueError(f"{self.name}: unsupported transport '{transport}'")
+
+    async def _keepalive(self, session: ClientSession):
+        while True:
+            try:
+                await asyncio.wait_for(self._check.wait(), self.keepalive_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._check.clear()
+            await asyncio.wait_for(session.send_ping(), self.keepalive_timeout)
+
+    async def _supervise(self):
+        attempt = 0
+        while True:
+            try:
+                async with AsyncExitStack() as stack:
+                    streams = await stack.enter_async_context(self._open_transport())
+                    session = await stack.enter_async_context(ClientSession(streams[0], streams[1]))
+                    await session.initialize()
+                    self.session = session
+                    if self._lost_at is not None:
+                        self.reconnects += 1
+                        RECONNECTS.labels(self.name).inc()
+                        self.last_recovery_seconds = time.monotonic() - self._lost_at
+                        self._lost_at = None
+                        logger.info(f"{self.name}: reconnected in {self.last_recovery_seconds:.2f}s")
+                    else:
+                        logger.info(f"{self.name}: connected")
+                    attempt = 0
+                    self._ready.set()
+                    try:
+                        await self._keepalive(session)
+                    finally:
+                        self._ready.clear()
+                        self.session = None
+                        self._lost_at = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._failure = e
+                logger.warning(f"{self.name}: connection lost or failed: {e!r}")
+            if self.max_attempts is not None and attempt >= self.max_attempts:
+                logger.error(f"{self.name}: giving up after {attempt} attempts")
+                return
+            delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+            attempt += 1
+            await asyncio.sleep(delay)
@@ -0,0 +1,170 @@
+"""Keep CPU-heavy tools off the event loop that holds the Coral connection.
+
+An agent calls its tools on the same asyncio loop that reads the Coral SSE
+stream. A sync tool run inline stalls that stream for as long as it runs. So
+does a pure-Python tool in a thread, because it holds the GIL. Tools are
+therefore split in two:
+
+- I/O-bound sync tools (HTTP fetches, API clients) run in threads, which
+  release the GIL while they wait;
+- CPU-bound tools run in a shared process pool.
+
+A tool is CPU-bound if it is marked ``@cpu_bound``, if it is passed with
+``cpu=True``, or if its name is listed in ``CORAL_CPU_TOOLS``. Every other sync
+tool is treated as I/O-bound. Async tools are left alone.
+
+Only the function reference, its arguments and its result cross the process
+boundary, so choose the split to keep those small. For example, fetch and scan
+a page in the worker and return the matches, rather than sending the page over.
+Functions that cannot be pickled, such as closures or ``@tool``-decorated
+functions, run in threads and log a warning.
+
+Settings (all via environment):
+    CORAL_CPU_TOOLS=name,name    tools to treat as CPU-bound
+    CORAL_CPU_WORKERS=<cpus - 1> processes in the pool
+    CORAL_CPU_POOL=0             run CPU-bound tools in threads instead
+
+    cd coralizer && python -m benchmarks.bench_cpu_tools
+"""
+import asyncio
+import atexit
+import functools
+import logging
+import multiprocessing
+import os
+import pickle
+import statistics
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def cpu_bound(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Mark ``func`` (a function, or a method in its class body) as CPU-bound."""
+    func._coral_cpu_bound = True
+    return func
+
+
+def cpu_tool_names_from_env() -> Set[str]:
+    return {name.strip() for name in os.getenv("CORAL_CPU_TOOLS", "").split(",") if name.strip()}
+
+
+def process_pool_enabled() -> bool:
+    return os.getenv("CORAL_CPU_POOL", "1").strip().lower() not in ("0", "false", "no")
+
+
+def is_cpu_bound(func: Callable[..., Any], name: Optional[str] = None) -> bool:
+    """Whether ``func`` (or the tool ``name``) should run in the process pool."""
+    if getattr(getattr(func, "__func__", func), "_coral_cpu_bound", False):
+        return True
+    return (name or getattr(func, "__name__", "")) in cpu_tool_names_from_env()
+
+
+def picklable(func: Callable[..., Any]) -> bool:
+    try:
+        pickle.dumps(func)
+        return True
+    except Exception:
+        return False
+
+
+def process_pool() -> ProcessPoolExecutor:
+    """The shared pool for CPU-bound tools, started on first use.
+
+    Workers are spawned rather than forked: the agent process runs threads (the
+    log listener, tool threads), and forking while one of them holds a lock
+    can deadlock the child.
+    """
+    global _pool
+    if _pool is None:
+        workers = int(os.getenv("CORAL_CPU_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+        _pool = ProcessPoolExecutor(max_workers=max(1, workers), mp_context=multiprocessing.get_context("spawn"))
+        atexit.register(shutdown_process_pool)
+    return _pool
+
+
+def shutdown_process_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def run_in(executor: Optional[Executor], func: Callable[..., Any]) -> Callable[..., Any]:
+    """An async callable that runs ``func`` in ``executor`` (``None``: the loop's default thread pool)."""
+    async def run(*args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(executor, functools.partial(func, *args, **kwargs))
+    return run
+
+
+def executor_for(func: Callable[..., Any], name: Optional[str] = None, cpu: Optional[bool] = None,
+                 threads: Optional[Executor] = None) -> Optional[Executor]:
+    """The process pool for CPU-bound ``func``, else ``threads``."""
+    if cpu is None:
+        cpu = is_cpu_bound(func, name)
+    if not cpu or not process_pool_enabled():
+        return threads
+    if not picklable(func):
+        logger.warning(f"tool {name or getattr(func, '__name__', func)} is CPU-bound but cannot be pickled; "
+                       f"running it in a thread")
+        return threads
+    return process_pool()
+
+
+def async_tool(func: Callable[..., Any], cpu: Optional[bool] = None) -> Callable[..., Any]:
+    """``func`` as a coroutine function that runs off the event loop, for CAMEL's ``FunctionTool``.
+
+    Keeps the signature and docstring the tool schema is built from. ``cpu``
+    overrides the classification; async functions are returned unchanged.
+    """
+    if asyncio.iscoroutinefunction(func):
+        return func
+    run = run_in(executor_for(func, cpu=cpu), func)
+
+    @functools.wraps(func)
+    async def call(*args, **kwargs):
+        return await run(*args, **kwargs)
+    return call
+
+
+class LoopLag:
+    """Measures how late the event loop wakes a task that sleeps for ``interval`` seconds.
+
+    A responsive loop wakes it almost on time. While something blocks the loop,
+    such as a tool or a callback, every read on the Coral stream waits by the same
+    amount. Use it as ``async with LoopLag() as lag:`` and read ``lag.summary()``.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _sample(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - started - self.interval))
+
+    async def __aenter__(self):
+        self._task = asyncio.create_task(self._sample(), name="loop-lag")
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+    def summary(self) -> Dict[str, float]:
+        """Median, p99 and max lag in milliseconds."""
+        if not self.samples:
+            return {"p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        samples = sorted(self.samples)
+        return {
+            "p50_ms": statistics.median(samples) * 1e3,
+            "p99_ms": samples[max(0, int(len(samples) * 0.99) - 1)] * 1e3,
+            "max_ms": samples[-1] * 1e3,
+        }
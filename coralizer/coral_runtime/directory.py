@@ -0,0 +1,117 @@
+"""Client-side cache of the Coral agent directory.
+
+``AgentDirectory`` fetches ``list_agents`` once and then polls it in the
+background, applying only the agents that joined, left or changed their
+description. Coral does not send notifications when agents join or leave, so
+polling is the only way to learn about changes. Listeners are called with the
+IDs that were added and removed.
+
+Reading the directory costs nothing, so agents get it as a local tool
+(``agent_directory``) instead of calling ``list_agents`` for every user request.
+The tool's output says how old the cached copy is.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from .answer_cache import tool_result_text
+from .routing import parse_agent_list
+
+logger = logging.getLogger(__name__)
+
+Listener = Callable[[List[str], List[str]], None]
+
+
+class AgentDirectory:
+    """Cached ``list_agents`` result, kept fresh by polling.
+
+    Args:
+        session: Anything with an MCP ``call_tool``, e.g. a ``SupervisedConnection``.
+        self_id: This agent's own ID, left out of the directory.
+        poll_interval: Seconds between background refreshes.
+    """
+
+    def __init__(self, session: Any, self_id: Optional[str] = None, poll_interval: float = 10.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.session = session
+        self.self_id = self_id
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.agents: Dict[str, str] = {}
+        self.updated_at: Optional[float] = None
+        self.version = 0
+        self._listeners: List[Listener] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, listener: Listener):
+        """Call ``listener(added, removed)`` whenever the directory changes."""
+        self._listeners.append(listener)
+
+    def age(self) -> Optional[float]:
+        """Seconds since the last successful refresh, or ``None`` before the first one."""
+        return None if self.updated_at is None else self.clock() - self.updated_at
+
+    def apply(self, agents: Dict[str, str]):
+        """Replace the cached directory with ``agents``, notifying listeners of what changed."""
+        agents = {agent_id: description for agent_id, description in agents.items() if agent_id != self.self_id}
+        added = [agent_id for agent_id, description in agents.items() if self.agents.get(agent_id) != description]
+        removed = [agent_id for agent_id in self.agents if agent_id not in agents]
+        self.agents = agents
+        self.updated_at = self.clock()
+        if added or removed:
+            self.version += 1
+            logger.info(f"agent directory: {len(agents)} agents (added {added}, removed {removed})")
+            for listener in self._listeners:
+                listener(added, removed)
+        return added, removed
+
+    async def refresh(self):
+        result = await self.session.call_tool("list_agents", {"includeDetails": True})
+        return self.apply(parse_agent_list(tool_result_text(result)))
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"agent directory: refresh failed, keeping the cached copy: {e!r}")
+
+    async def start(self):
+        """Load the directory once (failures are retried by the poller) and start polling."""
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.warning(f"agent directory: initial load failed: {e!r}")
+        self._task = asyncio.create_task(self._poll(), name="agent-directory")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    def render(self) -> str:
+        """The cached directory in ``list_agents`` format, with its age."""
+        age = self.age()
+        if age is None:
+            return "The agent directory has not been loaded yet; call list_agents."
+        lines = [f"ID: {agent_id}, Description: {description}" for agent_id, description in self.agents.items()]
+        header = f"Connected agents ({len(self.agents)}), directory refreshed {age:.0f}s ago:"
+        return "\n".join([header] + lines) if lines else f"No other agents are connected (checked {age:.0f}s ago)."
+
+
+AGENT_DIRECTORY_DESCRIPTION = (
+    "Return the connected agents and their descriptions from the local cache, with how old it is. "
+    "Instant; use it instead of list_agents."
+)
@@ -0,0 +1,212 @@
+"""AgentExecutor that bounds the tool calls of one model turn and keeps sync tools off shared pools.
+
+LangChain's ``AgentExecutor`` already gathers the tool calls of a turn, and
+``Tool`` already runs sync tools in the loop's default thread pool, so a turn
+of independent calls takes about as long as its slowest tool either way.
+``ConcurrentAgentExecutor`` adds:
+
+- a ``max_concurrency`` bound on the calls of one run, so a turn of twenty
+  scrapes doesn't open twenty connections at once;
+- sync tools in a process-wide ``coral-tool`` thread pool rather than the
+  loop's default one, which the loop also needs for DNS lookups when the Coral
+  connection reconnects;
+- CPU-bound sync tools in the process pool (see ``coral_runtime.cpu_pool``).
+
+Observations are returned to the agent in call order.
+
+Instead of ``verbose=True`` printing the whole scratchpad to stdout,
+executors log each step through ``StepLogger`` (see ``coral_runtime.logs``).
+"""
+import asyncio
+import atexit
+import logging
+import os
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextvars import ContextVar
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from langchain.agents import AgentExecutor
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tools import BaseTool
+
+from .cpu_pool import executor_for
+from .logs import current_log_agent, verbose_from_env
+from .metrics import MODEL_CALLS, agent_label, timed_tools
+
+step_logger = logging.getLogger("coral_runtime.steps")
+
+
+def tool_concurrency_from_env(default: int = 4) -> int:
+    """Read the per-turn tool concurrency limit from ``CORAL_TOOL_CONCURRENCY``."""
+    return max(1, int(os.getenv("CORAL_TOOL_CONCURRENCY", default)))
+
+
+_threads: Optional[ThreadPoolExecutor] = None
+
+
+def tool_thread_pool() -> ThreadPoolExecutor:
+    """The process-wide pool for sync tools, started on first use and shared by every executor.
+
+    Per-executor limits come from ``max_concurrency``; the pool is sized like
+    asyncio's default one.
+    """
+    global _threads
+    if _threads is None:
+        _threads = ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) + 4), thread_name_prefix="coral-tool")
+        atexit.register(shutdown_tool_thread_pool)
+    return _threads
+
+
+def shutdown_tool_thread_pool():
+    global _threads
+    if _threads is not None:
+        _threads.shutdown(wait=False, cancel_futures=True)
+        _threads = None
+
+
+def _in_pool(func: Callable[..., Any], pool: Optional[Executor]):
+    async def run(*args, **kwargs):
+        # Resolved per call, so a pool shut down and restarted is picked up.
+        executor = pool or tool_thread_pool()
+        return await asyncio.get_running_loop().run_in_executor(executor, partial(func, *args, **kwargs))
+    return run
+
+
+def offload_sync_tools(tools: Sequence[BaseTool], pool: Optional[Executor] = None) -> List[BaseTool]:
+    """Give every sync-only tool a coroutine that runs it in ``pool``, or in the process pool if CPU-bound.
+
+    ``pool`` defaults to ``tool_thread_pool()``.
+    """
+    wrapped = []
+    for tool in tools:
+        func = getattr(tool, "func", None)
+        if func is not None and getattr(tool, "coroutine", None) is None:
+            tool = tool.model_copy(update={"coroutine": _in_pool(func, executor_for(func, tool.name, threads=pool))})
+        wrapped.append(tool)
+    return wrapped
+
+
+class StepLogger(BaseCallbackHandler):
+    """Logs tool calls, tool results and final answers as leveled events.
+
+    Tool calls and answers are INFO, tool results DEBUG. Runs inline: it only
+    queues a record, so it does not need a worker thread.
+    """
+
+    run_inline = True
+
+    def __init__(self, logger: logging.Logger = step_logger):
+        self.logger = logger
+
+    def _agent(self) -> str:
+        return current_log_agent() or "agent"
+
+    def on_agent_action(self, action, **kwargs: Any):
+        self.logger.info(f"{self._agent()}: calling {action.tool} with {action.tool_input}",
+                         extra={"event": "tool_call", "tool": action.tool, "tool_input": action.tool_input})
+
+    def on_tool_end(self, output: Any, **kwargs: Any):
+        if self.logger.isEnabledFor(logging.DEBUG):
+            output = str(getattr(output, "content", output))
+            self.logger.debug(f"{self._agent()}: {kwargs.get('name') or 'tool'} returned {len(output)} chars: {output}",
+                              extra={"event": "tool_result", "chars": len(output)})
+
+    def on_tool_error(self, error: BaseException, **kwargs: Any):
+        self.logger.warning(f"{self._agent()}: {kwargs.get('name') or 'tool'} failed: {error!r}",
+                            extra={"event": "tool_error"})
+
+    def on_agent_finish(self, finish, **kwargs: Any):
+        self.logger.info(f"{self._agent()}: finished: {finish.return_values.get('output', '')}",
+                         extra={"event": "agent_finish"})
+
+
+class ModelTimer(BaseCallbackHandler):
+    """Counts each chat model call in ``coral_model_call_seconds``; pass it in the model's ``callbacks``."""
+
+    run_inline = True
+
+    def __init__(self):
+        self._started: Dict[UUID, Tuple[float, str]] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any):
+        self._started[run_id] = (time.perf_counter(), agent_label())
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any):
+        self._finish(run_id, "ok")
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._finish(run_id, "error")
+
+    def _finish(self, run_id: UUID, outcome: str):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            MODEL_CALLS.labels(agent=started[1], outcome=outcome).observe(time.perf_counter() - started[0])
+
+
+def logging_options(**kwargs: Any):
+    """``AgentExecutor`` keyword arguments that log steps, or print them with ``CORAL_VERBOSE=1``."""
+    if "verbose" in kwargs or "callbacks" in kwargs:
+        return kwargs
+    if verbose_from_env():
+        return {"verbose": True, **kwargs}
+    return {"callbacks": [StepLogger()], **kwargs}
+
+
+_tool_slots: ContextVar[Optional[asyncio.Semaphore]] = ContextVar("coral_tool_slots", default=None)
+
+
+class ConcurrentAgentExecutor(AgentExecutor):
+    """``AgentExecutor`` whose tool calls share a concurrency limit per run.
+
+    Each ``ainvoke`` gets its own limit, so sessions sharing one executor (the
+    interface agent) don't hold each other's calls back while one waits on
+    the user.
+    """
+
+    max_concurrency: int = 4
+
+    async def _acall(self, inputs, run_manager=None):
+        token = _tool_slots.set(asyncio.Semaphore(self.max_concurrency))
+        try:
+            return await super()._acall(inputs, run_manager)
+        finally:
+            _tool_slots.reset(token)
+
+    async def _aperform_agent_action(self, name_to_tool_map, color_mapping, agent_action, run_manager=None):
+        slots = _tool_slots.get()
+        if slots is None:
+            return await super()._aperform_agent_action(name_to_tool_map, color_mapping, agent_action, run_manager)
+        async with slots:
+            return await super()._aperform_agent_action(name_to_tool_map, color_mapping, agent_action, run_manager)
+
+
+def create_concurrent_executor(
+    agent: Any,
+    tools: Sequence[BaseTool],
+    max_concurrency: Optional[int] = None,
+    mentions: bool = True,
+    **kwargs: Any,
+) -> ConcurrentAgentExecutor:
+    """Build a ``ConcurrentAgentExecutor`` with sync tools moved onto the shared tool thread pool and tool calls timed.
+
+    Args:
+        agent: The runnable agent, e.g. from ``create_tool_calling_agent``.
+        tools: Tools the agent may call.
+        max_concurrency: Tool calls allowed in flight per executor. Defaults to
+            ``CORAL_TOOL_CONCURRENCY`` (4); 1 restores sequential execution.
+        mentions: Feed ``wait_for_mentions`` and ``send_message`` results to the
+            mention metrics (see ``metrics.timed``). False for the interface
+            agent, which has no mentions of its own.
+        **kwargs: Passed through to ``AgentExecutor`` (``max_iterations``...). Steps are
+            logged through ``StepLogger`` unless ``verbose`` or ``callbacks`` are given.
+    """
+    max_concurrency = max_concurrency or tool_concurrency_from_env()
+    return ConcurrentAgentExecutor(
+        agent=agent,
+        tools=timed_tools(offload_sync_tools(tools), mentions),
+        max_concurrency=max_concurrency,
+        **logging_options(**kwargs),
+    )
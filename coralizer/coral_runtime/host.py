@@ -0,0 +1,117 @@
+"""Run many coralized agents as tasks of one process.
+
+Instead of one Python process per ``<name>_coral_agent.py``, the host loads a
+fleet file of agent definitions and runs every agent on a single event loop.
+Agents share one chat model (and with it one HTTP connection pool and the
+process rate limiter) and one tool-description cache. Each agent runs under its own supervisor: if it
+crashes it is restarted with backoff, and the other agents keep running.
+
+    cd coralizer && python -m coral_runtime.host coral_agents.json
+
+The fleet file is a JSON list of objects with the keys ``coralizer.py``
+writes: ``agentId``, ``agentDescription``, ``mcpServerUrl`` and optionally
+``coralBaseUrl``, ``waitForAgents``, ``interactive`` and ``logLevel``.
+"""
+import asyncio
+import json
+import logging
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from .agent import AgentDefinition, create_model, run_agent
+from .connection import backoff_delay
+from .logs import configure_logging
+from .metrics import metrics_from_env, watch_loop_lag
+from .profiler import profile_from_env, watch_loop
+from .ratelimit import rate_limited_async_client
+from .schema import DescriptionCache
+
+logger = logging.getLogger(__name__)
+
+
+def load_definitions(path: str) -> List[AgentDefinition]:
+    with open(path, "r") as f:
+        return [AgentDefinition.from_dict(entry) for entry in json.load(f)]
+
+
+@dataclass
+class SharedResources:
+    """State shared by every agent in the host process."""
+
+    model: Any
+    http_client: httpx.AsyncClient
+    describe: DescriptionCache = field(default_factory=DescriptionCache)
+
+    @classmethod
+    def create(cls, max_connections: int = 100, **model_overrides: Any) -> "SharedResources":
+        http_client = rate_limited_async_client(max_connections=max_connections)
+        model = create_model(http_async_client=http_client, **model_overrides)
+        return cls(model=model, http_client=http_client)
+
+    async def aclose(self):
+        await self.http_client.aclose()
+
+
+async def supervise_agent(
+    definition: AgentDefinition,
+    shared: SharedResources,
+    ready: Optional[asyncio.Event] = None,
+    restart_base: float = 1.0,
+    restart_max: float = 60.0,
+):
+    """Run one agent forever, restarting it with backoff if it fails."""
+    failures = 0
+    while True:
+        try:
+            await run_agent(definition, model=shared.model, describe=shared.describe, ready=ready)
+            failures = 0
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception(f"{definition.agent_id}: agent crashed: {e}")
+            failures += 1
+        delay = backoff_delay(failures, restart_base, restart_max)
+        logger.info(f"{definition.agent_id}: restarting in {delay:.1f}s")
+        await asyncio.sleep(delay)
+
+
+async def run_host(definitions: List[AgentDefinition], shared: Optional[SharedResources] = None):
+    """Run every agent in ``definitions`` until cancelled."""
+    ids = [definition.agent_id for definition in definitions]
+    if len(set(ids)) != len(ids):
+        raise ValueError(f"agentId values must be unique, got {ids}")
+    watch_loop()
+    watch_loop_lag()
+    shared = shared or SharedResources.create()
+    tasks: Dict[str, asyncio.Task] = {
+        definition.agent_id: asyncio.create_task(supervise_agent(definition, shared), name=f"agent-{definition.agent_id}")
+        for definition in definitions
+    }
+    logger.info(f"Hosting {len(tasks)} agents: {', '.join(tasks)}")
+    try:
+        await asyncio.gather(*tasks.values())
+    finally:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        await shared.aclose()
+
+
+def main(argv: List[str]):
+    if len(argv) != 1:
+        print("usage: python -m coral_runtime.host <coral_agents.json>")
+        sys.exit(2)
+    from dotenv import load_dotenv
+    load_dotenv()
+    definitions = load_definitions(argv[0])
+    configure_logging(agent_levels=[definition.log_level for definition in definitions])
+    profile_from_env("coral-host")
+    metrics_from_env("coral-host")
+    asyncio.run(run_host(definitions))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,537 @@
+"""Async channels between interface agents and the humans they serve.
+
+The interface agents used to ask the user with ``input()`` from inside an
+async tool. That blocks the event loop, and with it the SSE stream to Coral,
+for as long as the user takes to answer. A ``HumanChannel`` asks without
+blocking. Each user has a *session*, and ``ask`` waits for the answer of the
+user whose session the current task serves. One process can therefore talk
+to many users at once:
+
+- ``ConsoleChannel``: one session on the terminal, read with an async stdin reader;
+- ``WebChannel``: a local endpoint with a chat page and a WebSocket per session
+  (``/ws/<session>``), plus plain HTTP long-polling for scripts;
+- ``QueueChannel``: in memory, for tests and embedding.
+
+``serve_sessions`` runs a handler (e.g. one ``AgentExecutor.ainvoke``) over and
+over for every session that opens, with ``current_session`` set, until the
+session closes.
+
+All sessions share one Coral agent, and Coral keeps a single pending
+``wait_for_mentions`` per agent. A ``MentionRouter`` therefore reads the
+agent's mentions in one place and hands each to the session whose thread it is
+in.
+
+Settings (all via environment):
+    CORAL_HUMAN_CHANNEL=console     "console" or "web"
+    CORAL_HUMAN_HOST=127.0.0.1      where ``WebChannel`` listens
+    CORAL_HUMAN_PORT=8765
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import xml.etree.ElementTree as ElementTree
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, TextIO
+
+logger = logging.getLogger(__name__)
+
+current_session: ContextVar[Optional[str]] = ContextVar("coral_human_session", default=None)
+
+
+class SessionClosed(Exception):
+    """The user left while a question was waiting for an answer."""
+
+
+@dataclass
+class _Session:
+    id: str
+    outbox: "asyncio.Queue[str]" = field(default_factory=asyncio.Queue)
+    pending: Optional[asyncio.Future] = None
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    closed: bool = False
+
+
+class HumanChannel:
+    """Questions out, answers in, per user session.
+
+    Transports open and close sessions, deliver each session's questions from
+    its ``outbox`` to the user, and pass the user's replies to ``answer``.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, _Session] = {}
+        self._opened: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+
+    def open_session(self, session_id: str) -> _Session:
+        session = self._sessions.get(session_id)
+        if session is None or session.closed:
+            session = self._sessions[session_id] = _Session(session_id)
+            self._opened.put_nowait(session_id)
+            logger.info(f"human channel: session {session_id} opened")
+        return session
+
+    def close_session(self, session_id: str):
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return
+        session.closed = True
+        if session.pending is not None and not session.pending.done():
+            session.pending.set_exception(SessionClosed(session_id))
+        logger.info(f"human channel: session {session_id} closed")
+
+    def is_open(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    async def ask(self, question: str, session_id: Optional[str] = None) -> str:
+        """Send ``question`` to the user of ``session_id`` (default: ``current_session``) and await the answer."""
+        session_id = session_id or current_session.get()
+        session = self._sessions.get(session_id)
+        if session is None:
+            raise SessionClosed(session_id)
+        async with session.lock:
+            session.pending = asyncio.get_running_loop().create_future()
+            session.outbox.put_nowait(question)
+            try:
+                return await session.pending
+            finally:
+                session.pending = None
+
+    def answer(self, session_id: str, text: str) -> bool:
+        """Deliver the user's reply; ``False`` if the session has no question waiting."""
+        session = self._sessions.get(session_id)
+        if session is None or session.pending is None or session.pending.done():
+            return False
+        session.pending.set_result(text)
+        return True
+
+    async def sessions(self) -> AsyncIterator[str]:
+        """Sessions as they open; ends when the channel stops."""
+        while True:
+            session_id = await self._opened.get()
+            if session_id is None:
+                return
+            yield session_id
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        for session_id in list(self._sessions):
+            self.close_session(session_id)
+        self._opened.put_nowait(None)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+
+class QueueChannel(HumanChannel):
+    """In-memory channel: the caller plays the users with ``next_question`` and ``answer``."""
+
+    async def next_question(self, session_id: str, timeout: Optional[float] = None) -> str:
+        """The next question asked in ``session_id``, which must have been opened with ``open_session``."""
+        session = self._sessions.get(session_id)
+        if session is None:
+            raise SessionClosed(session_id)
+        return await asyncio.wait_for(session.outbox.get(), timeout)
+
+
+async def stdin_lines(stream: Optional[TextIO] = None) -> AsyncIterator[str]:
+    """Lines from stdin without blocking the event loop.
+
+    A daemon thread does the blocking reads, so exiting never waits for the
+    user. Reading through the loop instead would put a terminal into
+    non-blocking mode, and writes to stdout on it would start failing.
+    """
+    loop = asyncio.get_running_loop()
+    lines: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+    stream = stream or sys.stdin
+
+    def deliver(line: Optional[str]):
+        try:
+            loop.call_soon_threadsafe(lines.put_nowait, line)
+        except RuntimeError:
+            pass  # the loop has closed
+
+    def read():
+        for line in iter(stream.readline, ""):
+            deliver(line.rstrip("\n"))
+        deliver(None)
+
+    threading.Thread(target=read, name="stdin-reader", daemon=True).start()
+    while (line := await lines.get()) is not None:
+        yield line
+
+
+class ConsoleChannel(HumanChannel):
+    """A single ``console`` session on the terminal."""
+
+    SESSION = "console"
+
+    def __init__(self, prompt: str = "Your response: "):
+        super().__init__()
+        self.prompt = prompt
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        session = self.open_session(self.SESSION)
+        self._task = asyncio.create_task(self._pump(session), name="human-console")
+
+    async def _pump(self, session: _Session):
+        lines = stdin_lines()
+        while True:
+            question = await session.outbox.get()
+            print(f"Agent asks: {question}")
+            print(self.prompt, end="", flush=True)
+            line = await anext(lines, None)
+            if line is None:
+                self.close_session(session.id)
+                return
+            self.answer(session.id, line)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        await super().stop()
+
+
+CHAT_PAGE = """<!doctype html>
+<meta charset="utf-8"><title>Coral agent</title>
+<style>body{font:15px sans-serif;max-width:720px;margin:2em auto}#log p{white-space:pre-wrap}
+.agent{color:#225}.you{color:#252;text-align:right}</style>
+<div id="log"></div><form><input id="text" style="width:85%" autofocus><button>Send</button></form>
+<script>
+const session = new URLSearchParams(location.search).get("session") || crypto.randomUUID();
+const ws = new WebSocket(`${location.protocol === "https:" ? "wss" : "ws"}://${location.host}/ws/${session}`);
+const log = (who, text) => { const p = document.createElement("p"); p.className = who; p.textContent = text; document.getElementById("log").append(p); };
+ws.onmessage = (event) => log("agent", JSON.parse(event.data).text);
+ws.onclose = () => log("agent", "(disconnected)");
+document.querySelector("form").onsubmit = (event) => {
+  event.preventDefault(); const input = document.getElementById("text");
+  ws.send(JSON.stringify({type: "answer", text: input.value})); log("you", input.value); input.value = "";
+};
+</script>"""
+
+
+class WebChannel(HumanChannel):
+    """Sessions over a local HTTP server (needs ``starlette`` and ``uvicorn``).
+
+    - ``GET /``: a chat page; each browser tab is its own session.
+    - ``WS /ws/<session>``: questions arrive as ``{"type": "question", "text": ...}``,
+      answers go back as ``{"type": "answer", "text": ...}`` (or plain text).
+    - ``POST /sessions/<session>``: open a session for long-polling.
+    - ``GET /sessions/<session>/question?timeout=30``: long-poll for the next question;
+      404 with ``{"closed": true}`` once the session is closed or if it was never opened.
+    - ``POST /sessions/<session>/answer`` with ``{"text": ...}``; 409 if nothing was asked.
+    - ``DELETE /sessions/<session>``: end the session.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self._server = None
+        self._task: Optional[asyncio.Task] = None
+
+    def app(self):
+        from starlette.applications import Starlette
+        from starlette.responses import HTMLResponse, JSONResponse, Response
+        from starlette.routing import Route, WebSocketRoute
+        from starlette.websockets import WebSocketDisconnect
+
+        async def page(request):
+            return HTMLResponse(CHAT_PAGE)
+
+        async def websocket(ws):
+            session_id = ws.path_params["session"]
+            await ws.accept()
+            session = self.open_session(session_id)
+
+            async def send_questions():
+                while True:
+                    await ws.send_json({"type": "question", "text": await session.outbox.get()})
+
+            sender = asyncio.create_task(send_questions())
+            try:
+                while True:
+                    raw = await ws.receive_text()
+                    try:
+                        message = json.loads(raw)
+                        text = message.get("text", "") if isinstance(message, dict) else str(message)
+                    except ValueError:
+                        text = raw
+                    if not self.answer(session_id, text):
+                        await ws.send_json({"type": "error", "text": "The agent is not waiting for an answer yet."})
+            except WebSocketDisconnect:
+                pass
+            finally:
+                sender.cancel()
+                self.close_session(session_id)
+
+        async def open_(request):
+            self.open_session(request.path_params["session"])
+            return Response(status_code=204)
+
+        async def question(request):
+            # Never opens a session: polling after DELETE must not start a new conversation.
+            session = self._sessions.get(request.path_params["session"])
+            if session is None or session.closed:
+                return JSONResponse({"closed": True}, status_code=404)
+            try:
+                text = await asyncio.wait_for(session.outbox.get(), float(request.query_params.get("timeout", 30)))
+            except asyncio.TimeoutError:
+                text = None
+            return JSONResponse({"question": text})
+
+        async def answer(request):
+            body = await request.json()
+            if not self.answer(request.path_params["session"], str(body.get("text", ""))):
+                return JSONResponse({"error": "no question is waiting for an answer"}, status_code=409)
+            return Response(status_code=204)
+
+        async def end(request):
+            self.close_session(request.path_params["session"])
+            return Response(status_code=204)
+
+        return Starlette(routes=[
+            Route("/", page),
+            WebSocketRoute("/ws/{session}", websocket),
+            Route("/sessions/{session}/question", question),
+            Route("/sessions/{session}/answer", answer, methods=["POST"]),
+            Route("/sessions/{session}", open_, methods=["POST"]),
+            Route("/sessions/{session}", end, methods=["DELETE"]),
+        ])
+
+    async def start(self):
+        import uvicorn
+
+        config = uvicorn.Config(self.app(), host=self.host, port=self.port, log_level="warning", lifespan="off")
+        self._server = uvicorn.Server(config)
+        self._server.install_signal_handlers = lambda: None
+        self._task = asyncio.create_task(self._server.serve(), name="human-web")
+        while not self._server.started:
+            if self._task.done():
+                await self._task
+            await asyncio.sleep(0.01)
+        logger.info(f"human channel: chat at http://{self.host}:{self.port}/")
+
+    async def stop(self):
+        await super().stop()
+        if self._server is not None:
+            self._server.should_exit = True
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+NO_MENTIONS = "No new messages received within the timeout period"
+_THREAD_ID = re.compile(r"^ID:\s*(\S+)", re.MULTILINE)
+
+
+def _text(result: Any) -> str:
+    if isinstance(result, tuple):
+        # LangChain MCP tools return (content, artifact).
+        result = result[0]
+    if isinstance(result, list):
+        return "\n".join(str(part) for part in result)
+    return result if isinstance(result, str) else str(result)
+
+
+@dataclass
+class _Inbox:
+    messages: List[ElementTree.Element] = field(default_factory=list)
+    ready: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class MentionRouter:
+    """Reads one agent's mentions and hands each to the session whose thread it is in.
+
+    One reader task calls ``wait_for_mentions`` for the whole agent. A session
+    owns the threads it creates or sends to (``own``). Its ``wait`` returns only
+    mentions from those threads, plus mentions in threads that no session owns;
+    those go to the session that has waited longest.
+
+    Args:
+        connection: Anything with an MCP ``call_tool`` (``SupervisedConnection``, ``ClientSession``).
+        channel: If given, mentions for sessions that have closed are dropped.
+        poll_ms: ``timeoutMs`` of the reader's ``wait_for_mentions`` calls.
+    """
+
+    def __init__(self, connection: Any, channel: Optional[HumanChannel] = None, poll_ms: int = 30000):
+        self.connection = connection
+        self.channel = channel
+        self.poll_ms = poll_ms
+        self._owners: Dict[str, str] = {}
+        self._inboxes: Dict[str, _Inbox] = {}
+        self._unowned: List[ElementTree.Element] = []
+        self._waiting: List[str] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def own(self, thread_id: Optional[str], session_id: Optional[str] = None):
+        """Route mentions in ``thread_id`` to ``session_id`` (default: ``current_session``)."""
+        session_id = session_id or current_session.get()
+        if thread_id and session_id:
+            self._owners[thread_id] = session_id
+
+    def deliver(self, text: str) -> int:
+        """Route the messages of one ``wait_for_mentions`` result; returns how many were kept."""
+        try:
+            root = ElementTree.fromstring(text)
+        except ElementTree.ParseError:
+            return 0
+        kept = 0
+        for element in root.iter():
+            thread_id = element.get("threadId") or element.findtext("threadId")
+            if not thread_id:
+                continue
+            session_id = self._owners.get(thread_id)
+            if session_id is not None and self.channel is not None and not self.channel.is_open(session_id):
+                logger.info(f"mention router: session {session_id} closed, dropping a mention in thread {thread_id}")
+                del self._owners[thread_id]
+                continue
+            if session_id is None and self._waiting:
+                session_id = self._waiting[0]
+            if session_id is None:
+                self._unowned.append(element)
+            else:
+                inbox = self._inboxes.setdefault(session_id, _Inbox())
+                inbox.messages.append(element)
+                inbox.ready.set()
+            kept += 1
+        return kept
+
+    async def wait(self, timeout_ms: int = 30000, session_id: Optional[str] = None) -> str:
+        """``wait_for_mentions`` for one session: its mentions as Coral's XML, or Coral's "no messages" text."""
+        session_id = session_id or current_session.get()
+        inbox = self._inboxes.setdefault(session_id, _Inbox())
+        if not inbox.messages and self._unowned:
+            inbox.messages, self._unowned = self._unowned, []
+        if not inbox.messages:
+            self._waiting.append(session_id)
+            try:
+                await asyncio.wait_for(inbox.ready.wait(), timeout_ms / 1000)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self._waiting.remove(session_id)
+        messages, inbox.messages = inbox.messages, []
+        inbox.ready.clear()
+        if not messages:
+            return NO_MENTIONS
+        root = ElementTree.Element("messages")
+        root.extend(messages)
+        return ElementTree.tostring(root, encoding="unicode")
+
+    def _routed(self, name: str, call: Callable[..., Awaitable[Any]], artifact: bool = False):
+        if name == "wait_for_mentions":
+            async def wait_for_mentions(timeoutMs: int = 30000, **kwargs):
+                text = await self.wait(timeoutMs)
+                return (text, None) if artifact else text
+            return wait_for_mentions
+        if name == "create_thread":
+            async def create_thread(**kwargs):
+                result = await call(**kwargs)
+                match = _THREAD_ID.search(_text(result))
+                self.own(match.group(1) if match else None)
+                return result
+            return create_thread
+        if name == "send_message":
+            async def send_message(**kwargs):
+                self.own(kwargs.get("threadId"))
+                return await call(**kwargs)
+            return send_message
+        return None
+
+    def tools(self, tools: List[Any]) -> List[Any]:
+        """LangChain Coral tools whose ``wait_for_mentions`` is answered by this router."""
+        wrapped = []
+        for tool in tools:
+            coroutine = getattr(tool, "coroutine", None)
+            routed = coroutine and self._routed(
+                tool.name, coroutine, artifact=getattr(tool, "response_format", "") == "content_and_artifact")
+            wrapped.append(tool.model_copy(update={"coroutine": routed}) if routed else tool)
+        return wrapped
+
+    def camel_tools(self, tools: List[Any]) -> List[Any]:
+        """CAMEL ``FunctionTool``s from ``MCPToolkit`` whose ``wait_for_mentions`` is answered by this router."""
+        wrapped = []
+        for tool in tools:
+            routed = self._routed(tool.get_function_name(), tool.func)
+            wrapped.append(type(tool)(routed, openai_tool_schema=tool.get_openai_tool_schema()) if routed else tool)
+        return wrapped
+
+    async def _read(self):
+        from .answer_cache import tool_result_text
+
+        while True:
+            try:
+                result = await self.connection.call_tool("wait_for_mentions", {"timeoutMs": self.poll_ms})
+                self.deliver(tool_result_text(result))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"mention router: wait_for_mentions failed: {e!r}")
+                await asyncio.sleep(1)
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._read(), name="mention-router")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+
+def human_channel_from_env(default: str = "console") -> HumanChannel:
+    """The channel named by ``CORAL_HUMAN_CHANNEL``."""
+    kind = os.getenv("CORAL_HUMAN_CHANNEL", default).strip().lower()
+    if kind == "console":
+        return ConsoleChannel()
+    if kind == "web":
+        return WebChannel(os.getenv("CORAL_HUMAN_HOST", "127.0.0.1"), int(os.getenv("CORAL_HUMAN_PORT", 8765)))
+    raise ValueError(f"CORAL_HUMAN_CHANNEL must be 'console' or 'web', got '{kind}'")
+
+
+async def serve_sessions(channel: HumanChannel, handle: Callable[[str], Awaitable[None]]):
+    """Run ``handle(session_id)`` repeatedly, as its own task, for every session until it closes.
+
+    ``current_session`` is set inside each task, so ``channel.ask`` reaches the
+    right user. Errors are logged and the session's loop continues.
+    """
+    async def loop(session_id: str):
+        current_session.set(session_id)
+        while channel.is_open(session_id):
+            try:
+                await handle(session_id)
+            except SessionClosed:
+                break
+            except Exception as e:
+                logger.exception(f"human session {session_id}: {e}")
+                await asyncio.sleep(1)
+
+    tasks = set()
+    try:
+        async for session_id in channel.sessions():
+            task = asyncio.create_task(loop(session_id), name=f"human-session-{session_id}")
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,228 @@
+"""Non-blocking, optionally structured logging for agent loops.
+
+``configure_logging`` routes every log record through a queue to a listener
+thread, which formats it and writes it to stderr. The agent loop only pays for
+building the record and putting it on the queue, not for formatting or stdout
+I/O. Long messages and ``extra`` fields are clipped before they are queued, so
+a scraped page costs at most ``CORAL_LOG_MAX_FIELD`` characters.
+
+Each agent can log at its own level. ``set_log_agent`` tags the records of the
+current task with the agent's ID and applies its level, which the host takes
+from ``logLevel`` in the fleet file. ``configure_logging`` gets those levels up
+front and sets the root logger to the lowest, once; the per-agent levels are
+then enforced by ``AgentFilter``, so one verbose agent does not change what
+the others log. In JSON mode each line is an object with
+``ts``, ``level``, ``logger``, ``agent``, ``msg`` and any ``extra`` fields.
+Records below WARNING that carry an ``event`` extra can be sampled, keeping
+one in every ``CORAL_LOG_SAMPLE_EVERY`` per agent and event.
+
+Settings (all via environment):
+    CORAL_LOG_FORMAT=text           "text" or "json"
+    CORAL_LOG_LEVEL=INFO            level for records outside a per-agent level
+    CORAL_LOG_MAX_FIELD=2000        characters kept per message or field
+    CORAL_LOG_SAMPLE_EVERY=1        keep 1 in N sub-WARNING records per (agent, event)
+    CORAL_VERBOSE=0                 1 restores LangChain's verbose executor printing
+
+    cd coralizer && python -m benchmarks.bench_logging --steps 2000
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Iterable, Optional, TextIO, Tuple, Union
+
+LOG_FORMATS = ("text", "json")
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
+
+# Attributes every LogRecord has; anything else came in through ``extra``.
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "agent"}
+
+_agent: ContextVar[Tuple[Optional[str], Optional[int]]] = ContextVar("coral_log_agent", default=(None, None))
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_default_level = logging.INFO
+
+
+def log_format_from_env(default: str = "text") -> str:
+    fmt = os.getenv("CORAL_LOG_FORMAT", default).strip().lower()
+    if fmt not in LOG_FORMATS:
+        raise ValueError(f"CORAL_LOG_FORMAT must be one of {LOG_FORMATS}, got '{fmt}'")
+    return fmt
+
+
+def verbose_from_env() -> bool:
+    """Whether executors should print their scratchpad the way ``verbose=True`` does."""
+    return os.getenv("CORAL_VERBOSE", "0").strip().lower() in ("1", "true", "yes")
+
+
+def _level(level: Union[str, int]) -> int:
+    if isinstance(level, int):
+        return level
+    value = logging.getLevelName(level.strip().upper())
+    if not isinstance(value, int):
+        raise ValueError(f"unknown log level '{level}'")
+    return value
+
+
+def set_log_agent(agent_id: Optional[str], level: Union[str, int, None] = None):
+    """Tag records logged from the current task (and tasks it starts) with ``agent_id``.
+
+    With ``level``, that agent logs at ``level`` instead of ``CORAL_LOG_LEVEL``.
+    A level below every level given to ``configure_logging`` is cut off by the
+    root logger, so pass it there as well.
+    """
+    levelno = None if level is None else _level(level)
+    return _agent.set((agent_id, levelno))
+
+
+def current_log_agent() -> Optional[str]:
+    return _agent.get()[0]
+
+
+def clip(value: Any, limit: int) -> Any:
+    """``value`` with strings longer than ``limit`` cut down, inside lists and dicts too."""
+    if isinstance(value, str):
+        if len(value) <= limit:
+            return value
+        return f"{value[:limit]}... [{len(value) - limit} more chars]"
+    if isinstance(value, dict):
+        return {key: clip(item, limit) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [clip(item, limit) for item in value]
+    return value
+
+
+class AgentFilter(logging.Filter):
+    """Stamps records with the current agent and drops them below that agent's level.
+
+    Records below WARNING with an ``event`` extra are kept one in ``sample_every``.
+    Counts are kept for the ``max_keys`` most recent (agent, event) pairs.
+    """
+
+    def __init__(self, sample_every: int = 1, max_keys: int = 1024):
+        super().__init__()
+        self.sample_every = max(1, sample_every)
+        self.max_keys = max_keys
+        # Filters run on whichever thread logs, so the counts are shared under a lock.
+        self._seen: "OrderedDict[Tuple[Optional[str], str], int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        agent_id, levelno = _agent.get()
+        if record.levelno < (levelno if levelno is not None else _default_level):
+            return False
+        record.agent = agent_id
+        event = getattr(record, "event", None)
+        if self.sample_every > 1 and event is not None and record.levelno < logging.WARNING:
+            key = (agent_id, event)
+            with self._lock:
+                seen = self._seen.pop(key, 0)
+                self._seen[key] = seen + 1
+                if len(self._seen) > self.max_keys:
+                    self._seen.popitem(last=False)
+            if seen % self.sample_every:
+                return False
+        return True
+
+
+class ClippingQueueHandler(logging.handlers.QueueHandler):
+    """Queues records with their message and ``extra`` fields clipped; formatting happens on the listener."""
+
+    def __init__(self, log_queue, max_field: int = 2000):
+        super().__init__(log_queue)
+        self.max_field = max_field
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = clip(record.getMessage(), self.max_field)
+        record.args = None
+        if record.exc_info:
+            # Tracebacks hold frames; render them here while they are still valid.
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                record.__dict__[key] = clip(value, self.max_field)
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: timestamp, level, logger, agent, message and ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        event = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "agent": getattr(record, "agent", None),
+            "msg": record.getMessage(),
+        }
+        event.update((key, value) for key, value in record.__dict__.items() if key not in _RECORD_ATTRIBUTES)
+        if record.exc_text:
+            event["exc"] = record.exc_text
+        return json.dumps(event, default=str, ensure_ascii=False)
+
+
+def configure_logging(
+    level: Union[str, int, None] = None,
+    fmt: Optional[str] = None,
+    stream: Optional[TextIO] = None,
+    max_field: Optional[int] = None,
+    sample_every: Optional[int] = None,
+    agent_levels: Iterable[Union[str, int, None]] = (),
+) -> logging.handlers.QueueListener:
+    """Send all logging through a background queue listener; settings default to the environment.
+
+    Replaces the root logger's handlers, so call it once at startup instead of
+    ``logging.basicConfig``. Calling it again reconfigures. ``agent_levels`` are
+    the levels agents will pass to ``set_log_agent``; the root logger is set to
+    the lowest of them and ``level``.
+    """
+    global _listener, _default_level
+    _default_level = _level(level or os.getenv("CORAL_LOG_LEVEL", "INFO"))
+    fmt = fmt or log_format_from_env()
+    max_field = max_field or int(os.getenv("CORAL_LOG_MAX_FIELD", 2000))
+    sample_every = sample_every or int(os.getenv("CORAL_LOG_SAMPLE_EVERY", 1))
+    if fmt not in LOG_FORMATS:
+        raise ValueError(f"fmt must be one of {LOG_FORMATS}, got '{fmt}'")
+    stop_logging()
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = ClippingQueueHandler(log_queue, max_field)
+    handler.addFilter(AgentFilter(sample_every))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    levels = [_level(agent_level) for agent_level in agent_levels if agent_level is not None]
+    root.setLevel(min([_default_level] + levels))
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+_stop_lock = threading.Lock()
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    with _stop_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,496 @@
+"""Prometheus metrics for agent processes, served on a local HTTP endpoint.
+
+Until now an agent's only signal was its log. With ``CORAL_METRICS_PORT``
+set, the process also serves its counters in the Prometheus text format at
+``http://127.0.0.1:<port>/metrics``, from a daemon thread. A scraper can then
+alert on a stalled loop or a growing model queue, and an autoscaler can add
+agents when they saturate.
+
+Updating a metric is cheap enough to leave on everywhere. Each series keeps
+one cell per thread that writes to it. A thread only adds to its own cell, so
+an update takes no lock and threads never contend. A scrape adds the cells up.
+Gauges for state some object already tracks, such as whether a connection is
+up, are read from it at scrape time.
+
+Metrics (histograms also give ``_count``, e.g. invocations per outcome):
+    coral_agent_invocation_seconds{agent,outcome}    one mention loop turn, CAMEL step or request
+    coral_model_call_seconds{agent,outcome}          chat model calls
+    coral_model_queue_seconds                        wait for the process rate limiter
+    coral_model_requests_queued                      model requests waiting for the rate limiter now
+    coral_model_throttled_total                      429 responses from the model endpoint
+    coral_tool_call_seconds{agent,tool,outcome}      tool calls
+    coral_tool_calls_in_flight{agent}
+    coral_mentions_received_total{agent}
+    coral_mentions_answered_total{agent}             threads replied to with send_message
+    coral_mentions_unanswered_total{agent}           threads left without a reply when the turn ended
+    coral_mentions_in_flight{agent}                  threads received and not replied to yet
+    coral_reconnects_total{connection}
+    coral_connection_up{connection}
+    coral_cache_requests_total{cache,result}         result "hit" or "miss"
+    coral_event_loop_lag_seconds                     how late the loop wakes a sleeping probe
+
+Settings (all via environment):
+    CORAL_METRICS_PORT=9464          serve metrics on this port; unset: off, 0: any free port
+    CORAL_METRICS_HOST=127.0.0.1     address to listen on
+    CORAL_METRICS_LAG_INTERVAL=0.25  seconds between event loop lag probes
+
+    cd coralizer && python -m benchmarks.bench_metrics
+"""
+import asyncio
+import bisect
+import contextlib
+import functools
+import inspect
+import logging
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .logs import current_log_agent
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds. Model and tool calls take from milliseconds to minutes.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], **extra: str) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{value}"' for name, value in extra.items()]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Series:
+    """One labelled series: a row of numbers per writing thread, summed when read."""
+
+    def __init__(self, size: int):
+        self._size = size
+        self._cells: List[List[float]] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _cell(self) -> List[float]:
+        try:
+            return self._local.cell
+        except AttributeError:
+            # Once per thread. A thread's cell outlives it, so nothing it counted is lost.
+            cell = self._local.cell = [0.0] * self._size
+            with self._lock:
+                self._cells.append(cell)
+            return cell
+
+    def totals(self) -> List[float]:
+        with self._lock:
+            cells = list(self._cells)
+        return [sum(column) for column in zip(*cells)] if cells else [0.0] * self._size
+
+
+class CounterSeries(_Series):
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, amount: float = 1):
+        self._cell()[0] += amount
+
+    def value(self) -> float:
+        return self.totals()[0]
+
+
+class GaugeSeries(_Series):
+    def __init__(self):
+        super().__init__(1)
+        self._function: Optional[Callable[[], float]] = None
+
+    def inc(self, amount: float = 1):
+        self._cell()[0] += amount
+
+    def dec(self, amount: float = 1):
+        self._cell()[0] -= amount
+
+    def set_function(self, function: Callable[[], float]):
+        """Read the value from ``function`` at scrape time instead of counting it."""
+        self._function = function
+
+    def value(self) -> float:
+        return float(self._function()) if self._function is not None else self.totals()[0]
+
+
+class HistogramSeries(_Series):
+    def __init__(self, bounds: Tuple[float, ...]):
+        # One count per bucket (the last is +Inf), then the sum.
+        super().__init__(len(bounds) + 2)
+        self._bounds = bounds
+
+    def observe(self, value: float):
+        cell = self._cell()
+        cell[bisect.bisect_left(self._bounds, value)] += 1
+        cell[-1] += value
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Optional["Registry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], _Series] = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _new_series(self) -> _Series:
+        raise NotImplementedError
+
+    def labels(self, *values: Any, **labels: Any):
+        """The series for these label values, given in order or by name."""
+        key = tuple(str(value) for value in values) if values else tuple(str(labels[name]) for name in self.labelnames)
+        series = self._series.get(key)
+        if series is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {key}")
+            with self._lock:
+                series = self._series.setdefault(key, self._new_series())
+        return series
+
+    def _samples(self, labels: Tuple[str, ...], series: _Series) -> Iterable[str]:
+        raise NotImplementedError
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = list(self._series.items())
+        for key, series in items:
+            try:
+                lines.extend(self._samples(key, series))
+            except Exception as e:
+                logger.warning(f"metrics: could not read {self.name}{list(key)}: {e!r}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_series(self) -> CounterSeries:
+        return CounterSeries()
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+    def _samples(self, key, series):
+        yield f"{self.name}{_labels(self.labelnames, key)} {_number(series.value())}"
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_series(self) -> GaugeSeries:
+        return GaugeSeries()
+
+    def set_function(self, function: Callable[[], float]):
+        self.labels().set_function(function)
+
+    def _samples(self, key, series):
+        yield f"{self.name}{_labels(self.labelnames, key)} {_number(series.value())}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS, registry: Optional["Registry"] = None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_series(self) -> HistogramSeries:
+        return HistogramSeries(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _samples(self, key, series):
+        totals = series.totals()
+        count = 0.0
+        for bound, bucket in zip(self.buckets + (math.inf,), totals):
+            count += bucket
+            yield f"{self.name}_bucket{_labels(self.labelnames, key, le=_number(bound))} {_number(count)}"
+        yield f"{self.name}_sum{_labels(self.labelnames, key)} {_number(totals[-1])}"
+        yield f"{self.name}_count{_labels(self.labelnames, key)} {_number(count)}"
+
+
+class Registry:
+    """The metrics a ``/metrics`` scrape returns."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        return "\n".join(line for metric in metrics for line in metric.collect()) + "\n"
+
+
+REGISTRY = Registry()
+
+PROCESS_INFO = Gauge("coral_process_info", "Always 1; the label names the process.", ["name"])
+AGENT_INVOCATIONS = Histogram("coral_agent_invocation_seconds",
+                              "Agent loop turns (an executor run, a CAMEL step or a request) by outcome.",
+                              ["agent", "outcome"])
+MODEL_CALLS = Histogram("coral_model_call_seconds", "Chat model calls by outcome.", ["agent", "outcome"])
+MODEL_QUEUE = Histogram("coral_model_queue_seconds", "Time model requests waited for the process rate limiter.")
+MODEL_QUEUED = Gauge("coral_model_requests_queued", "Model requests waiting for the process rate limiter.")
+MODEL_THROTTLED = Counter("coral_model_throttled_total", "Model responses with status 429.")
+TOOL_CALLS = Histogram("coral_tool_call_seconds", "Tool calls by tool and outcome.", ["agent", "tool", "outcome"])
+TOOLS_IN_FLIGHT = Gauge("coral_tool_calls_in_flight", "Tool calls running now.", ["agent"])
+MENTIONS_RECEIVED = Counter("coral_mentions_received_total", "Mentions received with wait_for_mentions.", ["agent"])
+MENTIONS_ANSWERED = Counter("coral_mentions_answered_total", "Threads with a mention replied to with send_message.",
+                            ["agent"])
+MENTIONS_UNANSWERED = Counter("coral_mentions_unanswered_total",
+                              "Threads with a mention left without a reply when the agent's turn ended.", ["agent"])
+MENTIONS_IN_FLIGHT = Gauge("coral_mentions_in_flight", "Threads with a mention received and not replied to yet.",
+                           ["agent"])
+RECONNECTS = Counter("coral_reconnects_total", "Sessions re-established after a dropped connection.", ["connection"])
+CONNECTION_UP = Gauge("coral_connection_up", "1 while the connection has a live session.", ["connection"])
+CACHE_REQUESTS = Counter("coral_cache_requests_total", "Cache lookups by result (hit or miss).", ["cache", "result"])
+LOOP_LAG = Histogram("coral_event_loop_lag_seconds", "How late the event loop woke a probe sleeping on it.",
+                     buckets=LAG_BUCKETS)
+
+_name: Optional[str] = None
+_server: Optional[ThreadingHTTPServer] = None
+_probes: Dict[int, asyncio.Task] = {}
+_open_threads: Dict[str, Set[str]] = {}
+
+
+def agent_label() -> str:
+    """The current task's agent (see ``logs.set_log_agent``), else the process name."""
+    return current_log_agent() or _name or "unknown"
+
+
+@contextlib.contextmanager
+def observe(histogram: Histogram, **labels: str):
+    """Time the block into ``histogram`` with ``outcome`` "ok", "error" or "cancelled"."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    finally:
+        histogram.labels(outcome=outcome, **labels).observe(time.perf_counter() - started)
+
+
+@contextlib.contextmanager
+def invocation(agent: str):
+    """Time one turn of ``agent``'s loop; threads it received but did not reply to count as unanswered."""
+    try:
+        with observe(AGENT_INVOCATIONS, agent=agent):
+            yield
+    finally:
+        settle_mentions(agent)
+
+
+# Mention bookkeeping runs on the agent's event loop, so it needs no lock.
+def mentions_received(agent: str, thread_ids: Sequence[str]):
+    if not thread_ids:
+        return
+    MENTIONS_RECEIVED.labels(agent).inc(len(thread_ids))
+    open_threads = _open_threads.setdefault(agent, set())
+    new = set(thread_ids) - open_threads
+    open_threads |= new
+    MENTIONS_IN_FLIGHT.labels(agent).inc(len(new))
+
+
+def mention_answered(agent: str, thread_id: Optional[str]):
+    open_threads = _open_threads.get(agent)
+    if open_threads and thread_id in open_threads:
+        open_threads.discard(thread_id)
+        MENTIONS_ANSWERED.labels(agent).inc()
+        MENTIONS_IN_FLIGHT.labels(agent).dec()
+
+
+def settle_mentions(agent: str):
+    open_threads = _open_threads.pop(agent, None)
+    if open_threads:
+        MENTIONS_UNANSWERED.labels(agent).inc(len(open_threads))
+        MENTIONS_IN_FLIGHT.labels(agent).dec(len(open_threads))
+
+
+def _result_text(result: Any) -> str:
+    if isinstance(result, tuple):
+        # LangChain MCP tools return (content, artifact).
+        result = result[0]
+    if isinstance(result, list):
+        return "\n".join(str(part) for part in result)
+    return result if isinstance(result, str) else str(result)
+
+
+def _track_mentions(agent: str, tool: str, result: Any, arguments: Dict[str, Any]):
+    if tool == "wait_for_mentions":
+        from .answer_cache import parse_mentions
+        mentions_received(agent, [mention.thread_id for mention in parse_mentions(_result_text(result))])
+    elif tool == "send_message":
+        mention_answered(agent, arguments.get("threadId"))
+
+
+def timed(func: Callable[..., Any], name: Optional[str] = None, mentions: bool = True) -> Callable[..., Any]:
+    """``func`` (sync or async) with its calls counted as tool ``name``; keeps its signature.
+
+    With ``mentions``, the results of ``wait_for_mentions`` and ``send_message``
+    also feed the mention metrics.
+    """
+    name = name or getattr(func, "__name__", "tool")
+
+    def finish(agent, result, kwargs):
+        if mentions:
+            _track_mentions(agent, name, result, kwargs)
+        return result
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def call(*args, **kwargs):
+            agent = agent_label()
+            in_flight = TOOLS_IN_FLIGHT.labels(agent)
+            in_flight.inc()
+            try:
+                with observe(TOOL_CALLS, agent=agent, tool=name):
+                    result = await func(*args, **kwargs)
+            finally:
+                in_flight.dec()
+            return finish(agent, result, kwargs)
+        return call
+
+    @functools.wraps(func)
+    def call(*args, **kwargs):
+        agent = agent_label()
+        in_flight = TOOLS_IN_FLIGHT.labels(agent)
+        in_flight.inc()
+        try:
+            with observe(TOOL_CALLS, agent=agent, tool=name):
+                result = func(*args, **kwargs)
+        finally:
+            in_flight.dec()
+        return finish(agent, result, kwargs)
+    return call
+
+
+def timed_tools(tools: List[Any], mentions: bool = True) -> List[Any]:
+    """LangChain tools with their calls timed (see ``timed``)."""
+    wrapped = []
+    for tool in tools:
+        update = {}
+        if getattr(tool, "coroutine", None) is not None:
+            update["coroutine"] = timed(tool.coroutine, tool.name, mentions)
+        if getattr(tool, "func", None) is not None:
+            update["func"] = timed(tool.func, tool.name, mentions)
+        wrapped.append(tool.model_copy(update=update) if update else tool)
+    return wrapped
+
+
+def timed_camel_tools(tools: List[Any], mentions: bool = True) -> List[Any]:
+    """CAMEL ``FunctionTool``s with their calls timed (see ``timed``), each keeping its schema."""
+    return [
+        type(tool)(timed(tool.func, tool.get_function_name(), mentions), openai_tool_schema=tool.get_openai_tool_schema())
+        for tool in tools
+    ]
+
+
+def timed_model(model: Any) -> Any:
+    """Count a CAMEL model backend's calls in ``coral_model_call_seconds``. Returns ``model``.
+
+    CAMEL has no callbacks, so the instance's ``arun`` is wrapped.
+    """
+    arun = model.arun
+
+    @functools.wraps(arun)
+    async def timed_arun(*args, **kwargs):
+        with observe(MODEL_CALLS, agent=agent_label()):
+            return await arun(*args, **kwargs)
+    model.arun = timed_arun
+    return model
+
+
+async def _probe_lag(interval: float):
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        LOOP_LAG.observe(max(0.0, time.perf_counter() - started - interval))
+
+
+def watch_loop_lag(interval: Optional[float] = None):
+    """While metrics are served, sample the running loop's lag into ``coral_event_loop_lag_seconds``.
+
+    Call from inside the loop; further calls on the same loop do nothing.
+    """
+    if _server is None:
+        return
+    loop = asyncio.get_running_loop()
+    probe = _probes.get(id(loop))
+    if probe is None or probe.done():
+        interval = interval or float(os.getenv("CORAL_METRICS_LAG_INTERVAL", 0.25))
+        _probes[id(loop)] = loop.create_task(_probe_lag(interval), name="loop-lag")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"metrics: {self.address_string()} {format % args}")
+
+
+def serve_metrics(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve ``REGISTRY`` at ``http://host:port/metrics`` from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="coral-metrics", daemon=True).start()
+    return server
+
+
+def metrics_from_env(name: Optional[str] = None) -> Optional[ThreadingHTTPServer]:
+    """Serve metrics if ``CORAL_METRICS_PORT`` is set; returns the server, or ``None``.
+
+    Call once at startup. ``name`` labels ``coral_process_info`` and series
+    recorded outside any agent's task.
+    """
+    global _name, _server
+    _name = name or _name
+    port = os.getenv("CORAL_METRICS_PORT", "").strip()
+    if not port or _server is not None:
+        return _server
+    host = os.getenv("CORAL_METRICS_HOST", "127.0.0.1")
+    _server = serve_metrics(int(port), host)
+    PROCESS_INFO.labels(_name or "python").inc()
+    logger.info(f"metrics: serving http://{host}:{_server.server_address[1]}/metrics")
+    return _server
@@ -0,0 +1,431 @@
+"""Out-of-band store for large results passed between agents on one machine.
+
+A scraped page or search dump of a few hundred KB used to go inline into
+``send_message``. From there it reached every participant through
+``wait_for_mentions`` and the thread resource, and filled each model's context
+on the way. With the store enabled:
+
+- tool results longer than the threshold are written to a content-addressed
+  directory, and the model sees a short preview plus a reference such as
+  ``payload:sha256:<hex>`` (``offload_results``);
+- ``send_message`` contents over the threshold are stored the same way before
+  they reach Coral (``offload_messages``);
+- every agent gets a ``fetch_payload`` tool to read a byte range of a
+  reference on demand. Ranges are widened or narrowed to whole UTF-8
+  characters, so a multibyte character is never split across two reads.
+
+The store is a directory on the local filesystem, so agents that exchange
+references must share it (same machine, or a shared mount). Payloads are
+keyed by SHA-256, so storing the same result twice costs nothing, and they
+can be gzip-compressed at rest. Payloads not stored again for ``ttl`` seconds
+are deleted, and so are the least recently stored ones while the store is over
+``max_bytes``. The store is swept when it is opened and then, from ``put``, at
+most once a minute or as soon as this process has pushed it over the limit.
+The async wrappers hash and compress in a worker thread.
+
+Settings (all via environment):
+    CORAL_PAYLOADS=1                    enable
+    CORAL_PAYLOAD_DIR=<tmp>/coral-payloads
+    CORAL_PAYLOAD_THRESHOLD=8000        characters above which a result is stored
+    CORAL_PAYLOAD_PREVIEW=600           characters of preview left inline
+    CORAL_PAYLOAD_COMPRESS=gzip         "gzip" or "none"
+    CORAL_PAYLOAD_MAX_MB=512            size of the store on disk (0: unbounded)
+    CORAL_PAYLOAD_TTL=86400             seconds a payload is kept (0: forever)
+
+    cd coralizer && python -m benchmarks.bench_payloads
+"""
+import asyncio
+import functools
+import gzip
+import hashlib
+import inspect
+import json
+import os
+import re
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Tuple, Union
+
+REF_PREFIX = "payload:sha256:"
+_REF = re.compile(r"payload:sha256:([0-9a-f]{64})")
+_EXACT_REF = re.compile(r"(?:payload:sha256:)?([0-9a-f]{64})")
+
+FETCH_PAYLOAD_DESCRIPTION = (
+    "Read part of a large result that was stored out of band. Pass the reference exactly as it appears "
+    "(payload:sha256:...), the byte offset to start at and how many bytes to read (at most 20000). "
+    "Read only the ranges you need."
+)
+
+MAX_FETCH = 20000
+SWEEP_INTERVAL = 60.0
+
+
+@dataclass
+class PayloadRef:
+    digest: str
+    size: int
+    mime: str = "text/plain"
+
+    @property
+    def ref(self) -> str:
+        return REF_PREFIX + self.digest
+
+
+def parse_ref(text: str) -> Optional[str]:
+    """The digest of the first payload reference in ``text``, if any."""
+    match = _REF.search(text or "")
+    return match.group(1) if match else None
+
+
+def ref_digest(ref: str) -> str:
+    """The digest of ``ref``, which must be ``payload:sha256:<64 hex>`` or a bare 64-hex digest.
+
+    Raises ``ValueError`` for anything else, so a reference never becomes an
+    arbitrary path under (or outside) the store.
+    """
+    match = _EXACT_REF.fullmatch((ref or "").strip())
+    if match is None:
+        raise ValueError(f"not a payload reference: {ref!r}; expected {REF_PREFIX}<64 hex digits>")
+    return match.group(1)
+
+
+def _is_continuation(byte: int) -> bool:
+    """Whether ``byte`` continues a multibyte UTF-8 character rather than starting one."""
+    return byte & 0xC0 == 0x80
+
+
+class PayloadStore:
+    """Content-addressed payloads on the filesystem, optionally gzip-compressed.
+
+    Args:
+        root: Directory shared by the agents that exchange references.
+        threshold: Results longer than this many characters are stored by ``offload``.
+        preview_chars: Characters of the result kept inline next to the reference.
+        compress: ``"gzip"`` or ``None``.
+        max_bytes: Bytes on disk above which the least recently stored payloads are
+            deleted; ``None`` for no limit.
+        ttl: Seconds after which a payload that was not stored again is deleted;
+            ``None`` to keep payloads forever.
+    """
+
+    def __init__(self, root: str, threshold: int = 8000, preview_chars: int = 600, compress: Optional[str] = "gzip",
+                 max_bytes: Optional[int] = 512 * 2 ** 20, ttl: Optional[float] = 86400.0):
+        if compress not in (None, "gzip"):
+            raise ValueError(f"compress must be 'gzip' or None, got '{compress}'")
+        self.root = root
+        self.threshold = threshold
+        self.preview_chars = preview_chars
+        self.compress = compress
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stored = 0
+        self.bytes_offloaded = 0
+        self.deleted = 0
+        self._disk_bytes = 0
+        self._swept_at = 0.0
+        self.sweep()
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def put(self, data: Union[str, bytes], mime: str = "text/plain") -> PayloadRef:
+        """Store ``data`` (once per distinct content) and return its reference."""
+        raw = data.encode() if isinstance(data, str) else data
+        digest = hashlib.sha256(raw).hexdigest()
+        path = self._path(digest)
+        try:
+            # Storing it again counts as recent use for the TTL and the size limit.
+            os.utime(path + ".json")
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            body = gzip.compress(raw, compresslevel=6) if self.compress else raw
+            meta = {"size": len(raw), "mime": mime, "compression": self.compress}
+            # Write the body before the metadata; a reader only trusts payloads whose metadata exists.
+            for suffix, content in ((".body", body), (".json", json.dumps(meta).encode())):
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+                with os.fdopen(fd, "wb") as f:
+                    f.write(content)
+                os.replace(tmp, path + suffix)
+                self._disk_bytes += len(content)
+        self.stored += 1
+        if (self.max_bytes is not None and self._disk_bytes > self.max_bytes
+                or time.monotonic() - self._swept_at >= SWEEP_INTERVAL):
+            self.sweep(keep=path)
+        return PayloadRef(digest, len(raw), mime)
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        # (last stored, bytes on disk, path without suffix) of every payload, plus leftovers of interrupted writes.
+        entries = []
+        try:
+            shards = os.scandir(self.root)
+        except FileNotFoundError:
+            return entries
+        with shards:
+            for shard in shards:
+                if not shard.is_dir():
+                    continue
+                files = {}
+                for entry in os.scandir(shard.path):
+                    try:
+                        files[entry.name] = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                for name, st in files.items():
+                    base, suffix = os.path.splitext(name)
+                    if suffix == ".json":
+                        body = files.get(base + ".body")
+                        entries.append((st.st_mtime, st.st_size + (body.st_size if body else 0),
+                                        os.path.join(shard.path, base)))
+                    elif suffix != ".body" or base + ".json" not in files:
+                        # A body without metadata or a temporary file. One being written is the newest, so it goes last.
+                        entries.append((st.st_mtime, st.st_size, os.path.join(shard.path, name)))
+        return entries
+
+    def _delete(self, path: str):
+        # Metadata first, so readers stop trusting the payload before its body goes.
+        for name in (path + ".json", path + ".body", path):
+            try:
+                os.remove(name)
+            except (FileNotFoundError, IsADirectoryError):
+                pass
+
+    def sweep(self, keep: Optional[str] = None) -> int:
+        """Delete expired payloads, then the least recently stored ones while over ``max_bytes``.
+
+        Returns how many were deleted. Other agents sharing the directory sweep
+        it too; a reference they hold to a deleted payload reads as missing.
+        ``keep`` (a payload path without suffix) is never deleted: ``put`` passes
+        the payload it is about to return.
+        """
+        now = time.time()
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        deleted = 0
+        for stored_at, size, path in entries:
+            expired = self.ttl is not None and now - stored_at > self.ttl
+            if not expired and (self.max_bytes is None or total <= self.max_bytes):
+                break
+            if path == keep:
+                continue
+            self._delete(path)
+            total -= size
+            deleted += 1
+        self._disk_bytes = total
+        self._swept_at = time.monotonic()
+        self.deleted += deleted
+        return deleted
+
+    def stat(self, ref: str) -> PayloadRef:
+        digest = ref_digest(ref)
+        try:
+            with open(self._path(digest) + ".json") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            raise KeyError(f"no payload {REF_PREFIX}{digest} in {self.root}") from None
+        return PayloadRef(digest, meta["size"], meta["mime"])
+
+    def read(self, ref: str, offset: int = 0, length: Optional[int] = None) -> bytes:
+        """Bytes ``offset`` to ``offset + length`` of the payload (to the end without ``length``)."""
+        digest = ref_digest(ref)
+        with open(self._path(digest) + ".json") as f:
+            compression = json.load(f)["compression"]
+        opener = gzip.open if compression == "gzip" else open
+        with opener(self._path(digest) + ".body", "rb") as f:
+            f.seek(max(0, offset))
+            return f.read(-1 if length is None else max(0, length))
+
+    def fetch(self, ref: str, offset: int = 0, length: int = 4000) -> str:
+        """Text of a byte range with a footer saying what is left; the ``fetch_payload`` tool.
+
+        The range starts at the first character boundary at or after ``offset``
+        and ends at the last one within ``length`` bytes, or after one whole
+        character if none fits; the footer gives the range actually read.
+        """
+        offset = max(0, offset)
+        length = min(max(1, length), MAX_FETCH)
+        try:
+            meta = self.stat(ref)
+        except (KeyError, ValueError) as e:
+            return f"Error: {e.args[0]}"
+        # A UTF-8 character is at most 4 bytes, so 3 bytes of slack on each edge are enough to find a boundary.
+        try:
+            window = self.read(meta.digest, offset, length + 4)
+        except FileNotFoundError:
+            return f"Error: no payload {meta.ref} in {self.root}"
+        start = 0
+        while start < min(3, len(window)) and _is_continuation(window[start]):
+            start += 1
+        end = min(len(window), start + length)
+        while start < end < len(window) and _is_continuation(window[end]):
+            end -= 1
+        if end == start:
+            # Not even one character fits in ``length``: return that one character.
+            end = min(len(window), start + 1)
+            while end < min(len(window), start + 4) and _is_continuation(window[end]):
+                end += 1
+        chunk = window[start:end]
+        start, end = offset + start, offset + end
+        remaining = max(0, meta.size - end)
+        footer = f"[bytes {start}-{end} of {meta.size}; {remaining} remaining"
+        footer += f", continue with offset={end}]" if remaining else "]"
+        return chunk.decode(errors="replace") + "\n" + footer
+
+    def stub(self, ref: PayloadRef, text: str) -> str:
+        """The short text that replaces a stored result: a preview and how to read the rest."""
+        preview = text[:self.preview_chars].rstrip()
+        return (f"{preview}\n...\n[Full result stored out of band as {ref.ref} ({ref.size} bytes, {ref.mime}). "
+                f"Pass this reference on instead of the content; read it with "
+                f"fetch_payload(ref=\"{ref.ref}\", offset=0, length=4000).]")
+
+    def offload(self, result: Any) -> Any:
+        """``result`` itself if it is short or already a stub; otherwise its stub.
+
+        Strings are stored as they are, dicts and lists as JSON; other values are left alone.
+        """
+        text, mime = self._storable(result)
+        if text is None:
+            return result
+        ref = self.put(text, mime)
+        self.bytes_offloaded += ref.size
+        return self.stub(ref, text)
+
+    async def aoffload(self, result: Any) -> Any:
+        """``offload`` for the event loop: hashing and compressing run in a worker thread."""
+        text, mime = self._storable(result)
+        if text is None:
+            return result
+        ref = await asyncio.to_thread(self.put, text, mime)
+        self.bytes_offloaded += ref.size
+        return self.stub(ref, text)
+
+    def _storable(self, result: Any) -> Tuple[Optional[str], str]:
+        # The text to store for ``result`` and its MIME type, or None if it stays inline.
+        mime = "text/plain"
+        text = result
+        if isinstance(result, (dict, list)):
+            text, mime = json.dumps(result, default=str, ensure_ascii=False), "application/json"
+        if not isinstance(text, str) or len(text) <= self.threshold or parse_ref(text):
+            return None, mime
+        return text, mime
+
+
+def payload_store_from_env() -> Optional[PayloadStore]:
+    """A ``PayloadStore`` from the ``CORAL_PAYLOAD*`` settings, or ``None`` unless ``CORAL_PAYLOADS`` is set."""
+    if os.getenv("CORAL_PAYLOADS", "").strip().lower() not in ("1", "true", "yes"):
+        return None
+    compress = os.getenv("CORAL_PAYLOAD_COMPRESS", "gzip").strip().lower()
+    return PayloadStore(
+        root=os.getenv("CORAL_PAYLOAD_DIR", os.path.join(tempfile.gettempdir(), "coral-payloads")),
+        threshold=int(os.getenv("CORAL_PAYLOAD_THRESHOLD", 8000)),
+        preview_chars=int(os.getenv("CORAL_PAYLOAD_PREVIEW", 600)),
+        compress=None if compress == "none" else compress,
+        max_bytes=int(float(os.getenv("CORAL_PAYLOAD_MAX_MB", 512)) * 2 ** 20) or None,
+        ttl=float(os.getenv("CORAL_PAYLOAD_TTL", 86400)) or None,
+    )
+
+
+def _mcp_content(output: Any) -> Any:
+    # MCP tools return (content, artifact); the content is a string or a list of strings.
+    content, artifact = output
+    if isinstance(content, list):
+        content = "\n".join(str(part) for part in content)
+    return content, artifact
+
+
+def _offload_output(store: PayloadStore, output: Any) -> Any:
+    if isinstance(output, tuple) and len(output) == 2:
+        content, artifact = _mcp_content(output)
+        return store.offload(content), artifact
+    return store.offload(output)
+
+
+async def _aoffload_output(store: PayloadStore, output: Any) -> Any:
+    if isinstance(output, tuple) and len(output) == 2:
+        content, artifact = _mcp_content(output)
+        return await store.aoffload(content), artifact
+    return await store.aoffload(output)
+
+
+def offload_results(tools: List[Any], store: PayloadStore) -> List[Any]:
+    """LangChain tools whose long results are stored, leaving a preview and a reference."""
+    def offloading(call):
+        @functools.wraps(call)
+        async def call_and_offload(*args, **kwargs):
+            return await _aoffload_output(store, await call(*args, **kwargs))
+        return call_and_offload
+
+    def offloading_sync(func):
+        @functools.wraps(func)
+        def call_and_offload(*args, **kwargs):
+            return _offload_output(store, func(*args, **kwargs))
+        return call_and_offload
+
+    wrapped = []
+    for tool in tools:
+        update = {}
+        if getattr(tool, "coroutine", None) is not None:
+            update["coroutine"] = offloading(tool.coroutine)
+        if getattr(tool, "func", None) is not None:
+            update["func"] = offloading_sync(tool.func)
+        wrapped.append(tool.model_copy(update=update) if update else tool)
+    return wrapped
+
+
+def offload_messages(tools: List[Any], store: PayloadStore) -> List[Any]:
+    """Wrap Coral's ``send_message`` so long contents go to the store and the thread gets the stub."""
+    def offloading(send):
+        @functools.wraps(send)
+        async def send_message(**kwargs):
+            if "content" in kwargs:
+                kwargs["content"] = await store.aoffload(kwargs["content"])
+            return await send(**kwargs)
+        return send_message
+
+    return [
+        tool.model_copy(update={"coroutine": offloading(tool.coroutine)})
+        if tool.name == "send_message" and getattr(tool, "coroutine", None) is not None else tool
+        for tool in tools
+    ]
+
+
+def fetch_payload_tool(store: PayloadStore):
+    """The LangChain ``fetch_payload`` tool."""
+    from langchain_core.tools import StructuredTool
+
+    return StructuredTool.from_function(
+        func=store.fetch,
+        name="fetch_payload",
+        description=FETCH_PAYLOAD_DESCRIPTION,
+    )
+
+
+def offloaded(func: Callable[..., Any], store: PayloadStore) -> Callable[..., Any]:
+    """``func`` with long string results offloaded; keeps the signature and docstring CAMEL's ``FunctionTool`` reads."""
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def call_and_offload(*args, **kwargs):
+            return await store.aoffload(await func(*args, **kwargs))
+        return call_and_offload
+
+    @functools.wraps(func)
+    def call_and_offload(*args, **kwargs):
+        return store.offload(func(*args, **kwargs))
+    return call_and_offload
+
+
+def camel_fetch_payload(store: PayloadStore) -> Callable[..., str]:
+    """A ``fetch_payload`` function for CAMEL's ``FunctionTool``."""
+    def fetch_payload(ref: str, offset: int = 0, length: int = 4000) -> str:
+        r"""Read part of a large result that was stored out of band.
+
+        Args:
+            ref (str): The reference exactly as it appears, e.g. payload:sha256:....
+            offset (int): Byte offset to start reading at.
+            length (int): Number of bytes to read, at most 20000.
+
+        Returns:
+            str: The text of that range, followed by how many bytes remain.
+        """
+        return store.fetch(ref, offset, length)
+    return fetch_payload
@@ -0,0 +1,209 @@
+"""Speculative page prefetch for search agents.
+
+After ``search_google``, a search agent nearly always reads the top hits with
+``get_url_content``. Each read used to start only after another model round
+trip. With a ``Prefetcher``, the top ``top_k`` result URLs are fetched in
+background threads as soon as the search returns, and kept in a small bounded
+cache. A later read of one of those pages returns at once, or waits for the
+fetch that is already under way.
+
+Counters (``stats()``):
+    prefetched  background fetches started
+    hits        reads answered by a prefetched page, finished or still in flight
+    misses      reads that had to fetch the page themselves
+    wasted      prefetched pages evicted or expired without ever being read
+    errors      prefetches that failed (the read then fetches again)
+
+Settings (all via environment):
+    CORAL_PREFETCH=1              enable
+    CORAL_PREFETCH_TOP_K=3        result URLs to prefetch per search
+    CORAL_PREFETCH_PAGES=16       pages kept, including fetches in flight
+    CORAL_PREFETCH_MB=16          total size of the pages kept
+    CORAL_PREFETCH_TTL=300        seconds a page stays fresh
+
+    cd coralizer && python -m benchmarks.bench_prefetch
+"""
+import functools
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+_HIT = CACHE_REQUESTS.labels("prefetch", "hit")
+_MISS = CACHE_REQUESTS.labels("prefetch", "miss")
+
+
+def page_key(url: str) -> str:
+    """``url`` without its scheme or trailing slash, so ``http://a/`` and ``https://a`` share an entry."""
+    for scheme in ("https://", "http://"):
+        if url.startswith(scheme):
+            url = url[len(scheme):]
+            break
+    return url.rstrip("/")
+
+
+def result_urls(results: Any) -> List[str]:
+    """URLs in a search result, in rank order: ``search_google``'s list of ``{"url": ...}`` dicts, or a list of URLs."""
+    if isinstance(results, dict):
+        results = [results]
+    if not isinstance(results, list):
+        return []
+    urls = []
+    for item in results:
+        url = (item.get("url") or item.get("link")) if isinstance(item, dict) else item
+        if isinstance(url, str) and url.startswith(("http://", "https://")):
+            urls.append(url)
+    return urls
+
+
+@dataclass
+class _Entry:
+    future: Future
+    added: float = field(default_factory=time.monotonic)
+    size: int = 0
+    prefetched: bool = True
+    read: bool = False
+
+
+class Prefetcher:
+    """A bounded page cache filled ahead of time from search results.
+
+    Args:
+        fetch: Fetches one page and raises on failure, e.g. ``JinaBrowsingToolkit.fetch_page``.
+        top_k: Result URLs to prefetch per search.
+        max_pages: Pages kept, counting fetches in flight.
+        max_bytes: Total characters of page text kept.
+        ttl: Seconds before a page is fetched again.
+        workers: Concurrent background fetches.
+    """
+
+    def __init__(self, fetch: Callable[[str], str], top_k: int = 3, max_pages: int = 16,
+                 max_bytes: int = 16 * 1024 * 1024, ttl: float = 300.0, workers: int = 3):
+        self.fetch = fetch
+        self.top_k = top_k
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="coral-prefetch")
+        self._pages: "OrderedDict[str, _Entry]" = OrderedDict()
+        # Reentrant: a fetch that has already finished runs its done-callback inside ``prefetch``.
+        self._lock = threading.RLock()
+        self.counts = {"prefetched": 0, "hits": 0, "misses": 0, "wasted": 0, "errors": 0}
+
+    def prefetch(self, urls: Iterable[str]) -> int:
+        """Start fetching the first ``top_k`` of ``urls`` that are not cached yet; returns how many started."""
+        started = 0
+        with self._lock:
+            for url in list(urls)[:self.top_k]:
+                key = page_key(url)
+                entry = self._pages.get(key)
+                if entry is not None and not self._expired(entry):
+                    continue
+                entry = _Entry(self._pool.submit(self.fetch, url))
+                entry.future.add_done_callback(functools.partial(self._fetched, key, entry))
+                self._store(key, entry)
+                started += 1
+            self.counts["prefetched"] += started
+        return started
+
+    def get(self, url: str) -> str:
+        """The page at ``url``: from the cache, from a prefetch in flight, or fetched now."""
+        key = page_key(url)
+        with self._lock:
+            entry = self._pages.get(key)
+            if entry is not None and self._expired(entry):
+                self._drop(key)
+                entry = None
+            if entry is not None:
+                self._pages.move_to_end(key)
+                if entry.prefetched and not entry.read:
+                    self.counts["hits"] += 1
+                    _HIT.inc()
+                entry.read = True
+            else:
+                self.counts["misses"] += 1
+                _MISS.inc()
+        if entry is not None:
+            try:
+                return entry.future.result()
+            except Exception:
+                # The prefetch failed; the read gets its own attempt (and its own error, if any).
+                with self._lock:
+                    if self._pages.get(key) is entry:
+                        self._drop(key)
+        page = self.fetch(url)
+        with self._lock:
+            future = Future()
+            future.set_result(page)
+            self._store(key, _Entry(future, size=len(page), prefetched=False, read=True))
+        return page
+
+    def after_search(self, search: Callable[..., Any]) -> Callable[..., Any]:
+        """``search`` that prefetches the top result URLs before returning them."""
+        @functools.wraps(search)
+        def search_and_prefetch(*args, **kwargs):
+            results = search(*args, **kwargs)
+            self.prefetch(result_urls(results))
+            return results
+        return search_and_prefetch
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self.counts, "pages": len(self._pages), "bytes": sum(e.size for e in self._pages.values())}
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _expired(self, entry: _Entry) -> bool:
+        return time.monotonic() - entry.added > self.ttl
+
+    def _fetched(self, key: str, entry: _Entry, future: Future):
+        with self._lock:
+            error = None if future.cancelled() else future.exception()
+            if future.cancelled() or error is not None:
+                self.counts["errors"] += 1
+                logger.debug(f"prefetch of {key} failed: {error!r}")
+                if self._pages.get(key) is entry:
+                    del self._pages[key]
+                return
+            entry.size = len(future.result())
+            if self._pages.get(key) is entry:
+                self._evict()
+
+    def _store(self, key: str, entry: _Entry):
+        if key in self._pages:
+            self._drop(key)
+        self._pages[key] = entry
+        self._evict()
+
+    def _drop(self, key: str):
+        entry = self._pages.pop(key)
+        if entry.prefetched and not entry.read:
+            self.counts["wasted"] += 1
+
+    def _evict(self):
+        while self._pages and (len(self._pages) > self.max_pages
+                               or sum(e.size for e in self._pages.values()) > self.max_bytes):
+            self._drop(next(iter(self._pages)))
+
+
+def prefetcher_from_env(fetch: Callable[[str], str]) -> Optional[Prefetcher]:
+    """A ``Prefetcher`` for ``fetch`` from the ``CORAL_PREFETCH*`` settings, or ``None`` unless ``CORAL_PREFETCH`` is set."""
+    if os.getenv("CORAL_PREFETCH", "").strip().lower() not in ("1", "true", "yes"):
+        return None
+    return Prefetcher(
+        fetch,
+        top_k=int(os.getenv("CORAL_PREFETCH_TOP_K", 3)),
+        max_pages=int(os.getenv("CORAL_PREFETCH_PAGES", 16)),
+        max_bytes=int(float(os.getenv("CORAL_PREFETCH_MB", 16)) * 1024 * 1024),
+        ttl=float(os.getenv("CORAL_PREFETCH_TTL", 300)),
+    )
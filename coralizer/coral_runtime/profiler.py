@@ -0,0 +1,218 @@
+"""A sampling profiler that can stay on in production agents.
+
+A daemon thread wakes ``hz`` times a second, reads the Python stack of every
+other thread with ``sys._current_frames()`` and counts each distinct stack. The
+counts are written as collapsed stacks, one ``frame;frame;frame count`` line
+per stack, which ``flamegraph.pl``, speedscope and inferno read directly. The
+profiled threads are never paused or traced, so at the default 100 Hz the cost
+is a fraction of a percent of one core (``benchmarks.bench_profiler``).
+
+Each stack starts with its thread name. On a thread that runs an event loop
+registered with ``watch_loop``, it then has the name and coroutine of the task
+that was running, e.g. ``thread:MainThread;task:agent-firecrawl (run_agent)``.
+A flame graph therefore splits loop time by agent and coroutine, not just into
+asyncio's ``_run_once``. Samples of threads waiting in known idle spots, such
+as the selector, an idle pool worker or the log listener, are dropped unless
+``include_idle`` is set.
+
+Like any in-process sampler, it needs the GIL to take a sample. A thread
+that holds the GIL is seen only when the interpreter switches threads, every
+5 ms. CPU bursts shorter than that look like the wait that follows them, but
+the long stalls that hold up the Coral stream are caught.
+
+Start it with ``CORAL_PROFILE=1``, or toggle it on a running process with
+``kill -USR2 <pid>``. Stopping writes the file; while running, it is
+rewritten every ``CORAL_PROFILE_FLUSH`` seconds.
+
+Settings (all via environment):
+    CORAL_PROFILE=1               profile from startup
+    CORAL_PROFILE_HZ=100          samples per second
+    CORAL_PROFILE_DIR=<tmp>/coral-profiles
+    CORAL_PROFILE_FLUSH=60        seconds between rewrites of the file
+    CORAL_PROFILE_IDLE=1          keep idle samples
+
+    cd coralizer && python -m benchmarks.bench_profiler
+"""
+import asyncio
+import atexit
+import logging
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# (file name, function) of leaf frames where a thread is waiting, not working.
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("thread.py", "_worker"),
+    ("handlers.py", "dequeue"),
+    ("queue.py", "get"),
+    ("socketserver.py", "serve_forever"),
+}
+
+_loops: Dict[int, asyncio.AbstractEventLoop] = {}
+_profiler: Optional["SamplingProfiler"] = None
+_name: Optional[str] = None
+
+
+def watch_loop():
+    """Label samples of the calling thread with the running loop's current task. Call from inside the loop."""
+    _loops[threading.get_ident()] = asyncio.get_running_loop()
+
+
+def _task_label(loop: asyncio.AbstractEventLoop) -> Optional[str]:
+    if loop.is_closed():
+        return None
+    try:
+        task = asyncio.current_task(loop)
+    except RuntimeError:
+        return None
+    if task is None:
+        return None
+    coro = task.get_coro()
+    name = getattr(coro, "__qualname__", type(coro).__name__)
+    return f"task:{task.get_name()} ({name})".replace(";", ",")
+
+
+class SamplingProfiler:
+    """Samples all threads' stacks ``hz`` times a second and writes them as collapsed stacks to ``path``."""
+
+    def __init__(self, path: str, hz: float = 100, flush_every: float = 60.0, include_idle: bool = False):
+        self.path = path
+        self.interval = 1.0 / hz
+        self.flush_every = flush_every
+        self.include_idle = include_idle
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self.sampling_time = 0.0
+        self._labels: Dict[object, str] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> "SamplingProfiler":
+        if not self.running:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="coral-profiler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> str:
+        """Stop sampling, write the file and return its path."""
+        if self.running:
+            self._stop.set()
+            self._thread.join()
+        self.write()
+        return self.path
+
+    def _run(self):
+        flushed = time.monotonic()
+        while not self._stop.wait(self.interval):
+            started = time.perf_counter()
+            self.sample()
+            self.sampling_time += time.perf_counter() - started
+            if time.monotonic() - flushed >= self.flush_every:
+                self.write()
+                flushed = time.monotonic()
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            name = getattr(code, "co_qualname", code.co_name)
+            label = self._labels[code] = f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+        return label
+
+    def sample(self):
+        """Count the current stack of every thread but this one."""
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            code = frame.f_code
+            if not self.include_idle and (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                continue
+            stack: List[str] = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.append(f"thread:{names.get(ident, ident)}")
+            loop = _loops.get(ident)
+            task = _task_label(loop) if loop is not None else None
+            if task is not None:
+                stack.insert(-1, task)
+            self.counts[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def write(self):
+        """Replace the file at ``path`` with the stacks counted so far, most frequent first."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".")
+        with os.fdopen(fd, "w") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+        os.replace(tmp, self.path)
+
+
+def profile_path(name: Optional[str] = None) -> str:
+    directory = os.getenv("CORAL_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "coral-profiles"))
+    name = name or os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0] or "python"
+    return os.path.join(directory, f"{name}-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}.collapsed")
+
+
+def start_profiling(name: Optional[str] = None) -> SamplingProfiler:
+    """Start the process's profiler with the ``CORAL_PROFILE_*`` settings, if it isn't running."""
+    global _profiler
+    if _profiler is None or not _profiler.running:
+        _profiler = SamplingProfiler(
+            profile_path(name or _name),
+            hz=float(os.getenv("CORAL_PROFILE_HZ", 100)),
+            flush_every=float(os.getenv("CORAL_PROFILE_FLUSH", 60)),
+            include_idle=os.getenv("CORAL_PROFILE_IDLE", "").strip().lower() in ("1", "true", "yes"),
+        ).start()
+        logger.info(f"profiler: sampling at {1 / _profiler.interval:.0f} Hz into {_profiler.path}")
+    return _profiler
+
+
+def stop_profiling() -> Optional[str]:
+    """Stop the process's profiler and return the path of the file it wrote."""
+    if _profiler is None or not _profiler.running:
+        return None
+    path = _profiler.stop()
+    logger.info(f"profiler: {_profiler.samples} samples written to {path}")
+    return path
+
+
+def _toggle(signum, frame):
+    # Runs in the main thread between bytecodes; the profiler thread does the work.
+    if _profiler is not None and _profiler.running:
+        threading.Thread(target=stop_profiling, name="coral-profiler-stop", daemon=True).start()
+    else:
+        start_profiling()
+
+
+def profile_from_env(name: Optional[str] = None):
+    """Install the ``SIGUSR2`` toggle, and start profiling now if ``CORAL_PROFILE`` is set.
+
+    Call once at startup from the main thread. ``name`` prefixes the files written.
+    """
+    global _name
+    _name = name
+    if hasattr(signal, "SIGUSR2") and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGUSR2, _toggle)
+    if os.getenv("CORAL_PROFILE", "").strip().lower() in ("1", "true", "yes"):
+        start_profiling(name)
+
+
+atexit.register(stop_profiling)
@@ -0,0 +1,432 @@
+"""Process-wide rate limiting and prioritisation of chat model calls.
+
+Every model client in a process shares one ``RateLimiter`` (``default_limiter()``)
+with token buckets for requests and tokens per minute. Calls that have to wait
+queue by priority, so the user-facing interface agent goes ahead of background
+workers. If the provider still answers 429, the limiter pauses every caller for
+the ``retry-after`` period (exponential backoff when there is none) and the
+call is retried. Budgets that are not configured are taken from the
+provider's ``x-ratelimit-limit-*`` headers, and ``x-ratelimit-remaining-*``
+lowers the local buckets when the provider has less left than assumed.
+
+The limiter plugs in as an httpx transport, so any client built on httpx can
+use it. That covers LangChain's ``ChatOpenAI`` through ``http_async_client`` or
+``http_client``:
+
+    model = init_chat_model(..., http_async_client=rate_limited_async_client())
+
+CAMEL model backends build their own clients; ``rate_limited_model(model)``
+swaps them for limited ones.
+
+Priority follows the running task. Call ``set_priority(INTERACTIVE)`` at the
+start of an agent's task; calls made from that task, including from its tools,
+are then scheduled first. Async callers on any event loop and sync callers on
+any thread wait in the same queue.
+
+The transport retries 429s itself, up to ``max_retries`` times. When it gives
+up, it marks the response ``x-should-retry: false``, which the OpenAI SDK
+obeys. The SDK's own ``max_retries`` then only covers connection errors and
+5xx responses, so the two retry counts don't multiply on 429s. Other clients
+that retry 429s on their own should set their retries to 0 for this transport.
+
+Settings (all via environment):
+    CORAL_RATE_LIMIT_RPM=500        requests per minute (unset: the provider's reported limit)
+    CORAL_RATE_LIMIT_TPM=200000     tokens per minute (unset: the provider's reported limit)
+"""
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+import httpx
+
+from .metrics import MODEL_QUEUE, MODEL_QUEUED, MODEL_THROTTLED
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+BACKGROUND = 10
+
+_priority: ContextVar[int] = ContextVar("coral_model_call_priority", default=BACKGROUND)
+
+
+def set_priority(level: int):
+    """Schedule model calls made from the current task (and tasks it starts) at ``level``."""
+    return _priority.set(level)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+def retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Seconds to wait according to ``retry-after-ms`` or ``retry-after`` (seconds or HTTP date)."""
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_tokens(body: bytes) -> int:
+    """Tokens a chat completion request counts against TPM: prompt (about 4 bytes per token) plus ``max_tokens``."""
+    try:
+        payload = json.loads(body) if body else {}
+    except ValueError:
+        payload = {}
+    if not isinstance(payload, dict):
+        payload = {}
+    completion = payload.get("max_completion_tokens") or payload.get("max_tokens") or 0
+    return max(1, len(body) // 4 + int(completion))
+
+
+class _Bucket:
+    def __init__(self, per_minute: float, burst_seconds: float, now: float):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.updated = now
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, amount: float) -> float:
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def take(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+
+class _Waiter:
+    """A caller in the queue. ``wake`` tells it that it may have reached the head; it is only called under the lock."""
+
+    __slots__ = ("tokens", "cancelled", "wake")
+
+    def __init__(self, tokens: int):
+        self.tokens = tokens
+        self.cancelled = False
+        self.wake: Callable[[], None] = lambda: None
+
+
+def _set_result(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+def _waker(loop: asyncio.AbstractEventLoop, future: asyncio.Future) -> Callable[[], None]:
+    def wake():
+        try:
+            loop.call_soon_threadsafe(_set_result, future)
+        except RuntimeError:
+            pass  # the waiter's loop has closed
+    return wake
+
+
+class RateLimiter:
+    """Token buckets for RPM/TPM, a priority queue of waiters, and 429-driven pauses.
+
+    Thread-safe: every loop and thread that makes model calls can share one
+    limiter. The waiter at the head of the queue sleeps until the budget allows
+    its call. The others sleep until they become the head.
+
+    Args:
+        rpm: Requests per minute. ``None`` adopts the provider's ``x-ratelimit-limit-requests`` once seen.
+        tpm: Tokens per minute. ``None`` adopts ``x-ratelimit-limit-tokens`` likewise.
+        burst_seconds: How many seconds of budget may be spent at once.
+        backoff_base: First pause after a 429 without ``retry-after``; doubles per consecutive 429.
+        backoff_max: Longest such pause.
+    """
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None, burst_seconds: float = 10.0,
+                 backoff_base: float = 1.0, backoff_max: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.burst_seconds = burst_seconds
+        now = clock()
+        self._buckets: Dict[str, _Bucket] = {
+            kind: _Bucket(limit, burst_seconds, now) for kind, limit in (("requests", rpm), ("tokens", tpm)) if limit
+        }
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self._consecutive_429 = 0
+        self._waiters: List[Tuple[int, int, _Waiter]] = []
+        self._order = itertools.count()
+        self.requests = 0
+        self.throttled = 0
+
+    def _reserve(self, tokens: int) -> float:
+        """Spend one request and ``tokens`` if the budget allows now; otherwise return the seconds to wait."""
+        now = self.clock()
+        wait = self._paused_until - now
+        for kind, bucket in self._buckets.items():
+            bucket.refill(now)
+            wait = max(wait, bucket.wait_for(1 if kind == "requests" else tokens))
+        if wait > 0:
+            return wait
+        for kind, bucket in self._buckets.items():
+            bucket.take(1 if kind == "requests" else tokens)
+        self.requests += 1
+        return 0.0
+
+    def _enqueue(self, tokens: int, priority: Optional[int]) -> _Waiter:
+        waiter = _Waiter(tokens)
+        level = current_priority() if priority is None else priority
+        with self._lock:
+            heapq.heappush(self._waiters, (level, next(self._order), waiter))
+        return waiter
+
+    def _head(self) -> Optional[_Waiter]:
+        while self._waiters and self._waiters[0][2].cancelled:
+            heapq.heappop(self._waiters)
+        return self._waiters[0][2] if self._waiters else None
+
+    def _try(self, waiter: _Waiter) -> Optional[float]:
+        """Under the lock: 0 if ``waiter`` got its budget, the seconds to wait if it is the head, else ``None``."""
+        if self._head() is not waiter:
+            return None
+        wait = self._reserve(waiter.tokens)
+        if wait > 0:
+            return wait
+        heapq.heappop(self._waiters)
+        head = self._head()
+        if head is not None:
+            head.wake()
+        return 0.0
+
+    def _leave(self, waiter: _Waiter):
+        with self._lock:
+            was_head = self._head() is waiter
+            waiter.cancelled = True
+            if was_head:
+                head = self._head()
+                if head is not None:
+                    head.wake()
+
+    async def acquire(self, tokens: int = 1, priority: Optional[int] = None):
+        """Wait for budget. Lower ``priority`` goes first; equal priorities are served in arrival order."""
+        loop = asyncio.get_running_loop()
+        waiter = self._enqueue(tokens, priority)
+        try:
+            while True:
+                with self._lock:
+                    wait = self._try(waiter)
+                    if wait is None:
+                        woken = loop.create_future()
+                        waiter.wake = _waker(loop, woken)
+                if wait == 0:
+                    return
+                if wait is None:
+                    await woken
+                else:
+                    await asyncio.sleep(wait)
+        except BaseException:
+            self._leave(waiter)
+            raise
+
+    def acquire_sync(self, tokens: int = 1, priority: Optional[int] = None):
+        """Blocking ``acquire`` for sync clients, in the same priority queue."""
+        woken = threading.Event()
+        waiter = self._enqueue(tokens, priority)
+        waiter.wake = woken.set
+        try:
+            while True:
+                with self._lock:
+                    wait = self._try(waiter)
+                    if wait is None:
+                        woken.clear()
+                if wait == 0:
+                    return
+                if wait is None:
+                    woken.wait()
+                else:
+                    time.sleep(wait)
+        except BaseException:
+            self._leave(waiter)
+            raise
+
+    def observe(self, status_code: int, headers: Mapping[str, str]) -> Optional[float]:
+        """Feed back a response. Returns the pause before a retry if it was throttled, else ``None``."""
+        now = self.clock()
+        with self._lock:
+            self._learn_limits(headers, now)
+            if status_code == 429:
+                self.throttled += 1
+                MODEL_THROTTLED.inc()
+                self._consecutive_429 += 1
+                delay = retry_after(headers)
+                if delay is None:
+                    cap = min(self.backoff_max, self.backoff_base * 2 ** (self._consecutive_429 - 1))
+                    delay = random.uniform(cap / 2, cap)
+                self._paused_until = max(self._paused_until, now + delay)
+                # Resume at the refill rate instead of bursting straight back into the limit.
+                for bucket in self._buckets.values():
+                    bucket.level = min(bucket.level, 0.0)
+                return delay
+            self._consecutive_429 = 0
+            # Trust the provider's count when it has less budget left than we think.
+            for kind, bucket in self._buckets.items():
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                if remaining is not None and remaining.isdigit():
+                    bucket.refill(now)
+                    bucket.level = min(bucket.level, float(remaining))
+            return None
+
+    def _learn_limits(self, headers: Mapping[str, str], now: float):
+        """Adopt ``x-ratelimit-limit-*`` budgets the provider reports for kinds that were left unlimited."""
+        for kind in ("requests", "tokens"):
+            limit = headers.get(f"x-ratelimit-limit-{kind}")
+            if kind not in self._buckets and limit and limit.isdigit() and int(limit) > 0:
+                self._buckets[kind] = _Bucket(float(limit), self.burst_seconds, now)
+                logger.info(f"rate limiter: using the provider's limit of {limit} {kind} per minute")
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            queued = sum(not waiter.cancelled for _, _, waiter in self._waiters)
+        return {"requests": self.requests, "throttled": self.throttled, "queued": queued}
+
+
+_default: Optional[RateLimiter] = None
+_default_lock = threading.Lock()
+
+
+def rate_limiter_from_env() -> RateLimiter:
+    def limit(name):
+        value = os.getenv(name)
+        return float(value) if value else None
+
+    return RateLimiter(rpm=limit("CORAL_RATE_LIMIT_RPM"), tpm=limit("CORAL_RATE_LIMIT_TPM"))
+
+
+def default_limiter() -> RateLimiter:
+    """The limiter shared by every model client in this process."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = rate_limiter_from_env()
+            MODEL_QUEUED.set_function(lambda: _default.stats()["queued"])
+        return _default
+
+
+def _request_tokens(request: httpx.Request) -> int:
+    try:
+        return estimate_tokens(request.content)
+    except httpx.RequestNotRead:
+        return 1
+
+
+def _final(response: httpx.Response) -> httpx.Response:
+    # The transport has spent its retries on this 429; stop the OpenAI SDK from retrying it again on top.
+    response.headers["x-should-retry"] = "false"
+    return response
+
+
+class AsyncRateLimitedTransport(httpx.AsyncBaseTransport):
+    """httpx transport that sends each request through a ``RateLimiter`` and retries 429s after the pause."""
+
+    def __init__(self, limiter: Optional[RateLimiter] = None, transport: Optional[httpx.AsyncBaseTransport] = None,
+                 max_retries: int = 5):
+        self.limiter = limiter or default_limiter()
+        self.transport = transport or httpx.AsyncHTTPTransport()
+        self.max_retries = max_retries
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        tokens = _request_tokens(request)
+        for attempt in range(self.max_retries + 1):
+            queued = time.perf_counter()
+            await self.limiter.acquire(tokens)
+            MODEL_QUEUE.observe(time.perf_counter() - queued)
+            response = await self.transport.handle_async_request(request)
+            delay = self.limiter.observe(response.status_code, response.headers)
+            if delay is None:
+                return response
+            if attempt == self.max_retries:
+                return _final(response)
+            await response.aclose()
+            logger.warning(f"model endpoint throttled the request, retrying in {delay:.1f}s")
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class RateLimitedTransport(httpx.BaseTransport):
+    """Sync counterpart of ``AsyncRateLimitedTransport``."""
+
+    def __init__(self, limiter: Optional[RateLimiter] = None, transport: Optional[httpx.BaseTransport] = None,
+                 max_retries: int = 5):
+        self.limiter = limiter or default_limiter()
+        self.transport = transport or httpx.HTTPTransport()
+        self.max_retries = max_retries
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        tokens = _request_tokens(request)
+        for attempt in range(self.max_retries + 1):
+            queued = time.perf_counter()
+            self.limiter.acquire_sync(tokens)
+            MODEL_QUEUE.observe(time.perf_counter() - queued)
+            response = self.transport.handle_request(request)
+            delay = self.limiter.observe(response.status_code, response.headers)
+            if delay is None:
+                return response
+            if attempt == self.max_retries:
+                return _final(response)
+            response.close()
+            logger.warning(f"model endpoint throttled the request, retrying in {delay:.1f}s")
+        return response
+
+    def close(self):
+        self.transport.close()
+
+
+MODEL_TIMEOUT = httpx.Timeout(600, connect=10)
+
+
+def rate_limited_async_client(limiter: Optional[RateLimiter] = None, max_connections: int = 100) -> httpx.AsyncClient:
+    """An ``httpx.AsyncClient`` for model calls that goes through ``limiter`` (default: the process limiter)."""
+    transport = httpx.AsyncHTTPTransport(
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max(1, max_connections // 5)),
+    )
+    return httpx.AsyncClient(transport=AsyncRateLimitedTransport(limiter, transport), timeout=MODEL_TIMEOUT)
+
+
+def rate_limited_client(limiter: Optional[RateLimiter] = None) -> httpx.Client:
+    """Sync counterpart of ``rate_limited_async_client``."""
+    return httpx.Client(transport=RateLimitedTransport(limiter), timeout=MODEL_TIMEOUT)
+
+
+def rate_limited_model(model, limiter: Optional[RateLimiter] = None):
+    """Send a CAMEL model backend's OpenAI calls through ``limiter``. Returns ``model``.
+
+    CAMEL builds its own OpenAI clients with ``max_retries=3``, so they are
+    swapped for copies on the limited transport with SDK retries off; the
+    transport does the retrying. Backends without OpenAI clients are left as is.
+    """
+    import openai
+
+    if isinstance(getattr(model, "_async_client", None), openai.AsyncOpenAI):
+        model._async_client = model._async_client.with_options(
+            http_client=rate_limited_async_client(limiter), max_retries=0)
+    if isinstance(getattr(model, "_client", None), openai.OpenAI):
+        model._client = model._client.with_options(http_client=rate_limited_client(limiter), max_retries=0)
+    return model
@@ -0,0 +1,191 @@
+"""Local routing index: pick the agent for a user request without an LLM round-trip.
+
+The interface agents used to call ``list_agents`` and then ask the model to
+choose an agent from the descriptions. ``RoutingIndex`` ranks agents by BM25
+over their IDs and ``agentDescription`` strings instead. Agents joining or
+leaving update the index in place. Only a confident match is used: the best
+agent must clearly beat the runner-up and match enough of the request on its
+own. Otherwise the model still picks.
+
+``AgentRouter`` keeps the index in sync with an ``AgentDirectory``. The
+interface examples pass the user's answer from ``ask_human`` through
+``AgentRouter.annotate``.
+
+    cd coralizer && python -m benchmarks.bench_routing
+"""
+import math
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+
+_WORD = re.compile(r"[a-z0-9]{2,}")
+_URL = re.compile(r"\w+://\S+")
+_STOPWORDS = frozenset("""
+a about all an and any are as at be by can could do does for from get give has have how i in into is it its
+me my need of on or please some tell that the their them then there these this to using want was what when where
+which who will with would you your every
+agent agents capable responsible
+hi hello hey thanks thank help topic topics question questions ok okay yes no sure bye
+""".split())
+
+
+def _stem(word: str) -> str:
+    for suffix in ("ing", "ed", "es", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3 and not word.endswith("ss"):
+            word = word[:-len(suffix)]
+            break
+    return word[:-1] if word.endswith("e") and len(word) > 3 else word
+
+
+def terms(text: str) -> List[str]:
+    """Lowercased, stemmed words of ``text`` without stopwords and URLs; ``snake_case`` IDs split into words."""
+    text = _URL.sub(" ", text.lower()).replace("_", " ")
+    return [_stem(word) for word in _WORD.findall(text) if word not in _STOPWORDS]
+
+
+@dataclass
+class Route:
+    agent_id: str
+    score: float
+    confidence: float
+    matched: int
+    coverage: float
+    candidates: List[Tuple[str, float]]
+
+
+class RoutingIndex:
+    """Incremental BM25 index of agent descriptions.
+
+    Args:
+        min_confidence: ``route`` only answers when ``1 - runner_up / best`` is at least this.
+        min_coverage, min_matched: It also needs the best agent to match at least ``min_coverage``
+            of the query's terms, or at least ``min_matched`` of them, so one incidental word in
+            a long or off-topic request does not pick an agent.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, min_confidence: float = 0.5,
+                 min_coverage: float = 0.5, min_matched: int = 2):
+        self.k1 = k1
+        self.b = b
+        self.min_confidence = min_confidence
+        self.min_coverage = min_coverage
+        self.min_matched = min_matched
+        self.descriptions: Dict[str, str] = {}
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._lengths: Dict[str, int] = {}
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self.descriptions)
+
+    def add(self, agent_id: str, description: str):
+        if self.descriptions.get(agent_id) == description:
+            return
+        self.remove(agent_id)
+        counts = Counter(terms(f"{agent_id} {description}"))
+        for term, count in counts.items():
+            self._postings[term][agent_id] = count
+        self.descriptions[agent_id] = description
+        self._lengths[agent_id] = sum(counts.values())
+        self._total_length += self._lengths[agent_id]
+
+    def remove(self, agent_id: str):
+        if agent_id not in self.descriptions:
+            return
+        for term in set(terms(f"{agent_id} {self.descriptions.pop(agent_id)}")):
+            docs = self._postings[term]
+            docs.pop(agent_id, None)
+            if not docs:
+                del self._postings[term]
+        self._total_length -= self._lengths.pop(agent_id)
+
+    def sync(self, agents: Mapping[str, str]) -> Tuple[List[str], List[str]]:
+        """Make the index match ``agents`` (ID to description); returns the IDs added and removed."""
+        removed = [agent_id for agent_id in self.descriptions if agent_id not in agents]
+        for agent_id in removed:
+            self.remove(agent_id)
+        added = [agent_id for agent_id in agents if agent_id not in self.descriptions]
+        for agent_id, description in agents.items():
+            self.add(agent_id, description)
+        return added, removed
+
+    def rank(self, query: str, k: int = 3) -> List[Tuple[str, float]]:
+        """Top ``k`` agents for ``query`` with their BM25 scores, best first; agents scoring 0 are left out."""
+        n = len(self.descriptions)
+        if not n:
+            return []
+        average_length = self._total_length / n or 1.0
+        scores: Dict[str, float] = defaultdict(float)
+        for term in set(terms(query)):
+            docs = self._postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for agent_id, count in docs.items():
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[agent_id] / average_length)
+                scores[agent_id] += idf * count * (self.k1 + 1) / (count + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def matched(self, query: str, agent_id: str) -> Tuple[int, int]:
+        """How many of the distinct terms of ``query`` occur in ``agent_id``'s description, and of how many."""
+        query_terms = set(terms(query))
+        return sum(agent_id in self._postings.get(term, ()) for term in query_terms), len(query_terms)
+
+    def route(self, query: str) -> Optional[Route]:
+        """The best agent for ``query``, or ``None`` when no agent clearly and sufficiently matches."""
+        candidates = self.rank(query)
+        if not candidates:
+            return None
+        best_id, best = candidates[0]
+        runner_up = candidates[1][1] if len(candidates) > 1 else 0.0
+        confidence = 1 - runner_up / best
+        if confidence < self.min_confidence:
+            return None
+        matched, total = self.matched(query, best_id)
+        coverage = matched / total
+        if coverage < self.min_coverage and matched < self.min_matched:
+            return None
+        return Route(best_id, best, confidence, matched, coverage, candidates)
+
+
+_AGENT_LINE = re.compile(r"ID:\s*([^,\s]+)\s*,\s*(?:,\s*Description:\s*(.*))?$")
+
+
+def parse_agent_list(text: str) -> Dict[str, str]:
+    """Agent IDs and descriptions from a ``list_agents`` result (``includeDetails: true``)."""
+    agents = {}
+    for line in text.splitlines():
+        match = _AGENT_LINE.search(line.strip())
+        if match:
+            agents[match.group(1)] = (match.group(2) or "").strip()
+    return agents
+
+
+def describe_route(route: Optional[Route]) -> str:
+    """Text to append to the user's request for the model; empty when there is no confident route."""
+    if route is None:
+        return ""
+    return (f"\n\nSuggested agent: {route.agent_id} (matched locally from the agent descriptions, "
+            f"confidence {route.confidence:.2f}).")
+
+
+class AgentRouter:
+    """A ``RoutingIndex`` that follows an ``AgentDirectory``; routing never touches the network."""
+
+    def __init__(self, directory: Any, index: Optional[RoutingIndex] = None):
+        self.directory = directory
+        self.index = index or RoutingIndex()
+        self.index.sync(directory.agents)
+        directory.subscribe(lambda added, removed: self.index.sync(directory.agents))
+
+    def route(self, query: str) -> Optional[Route]:
+        return self.index.route(query)
+
+    def annotate(self, request: str) -> str:
+        """``request`` followed by the suggested agent or, without a confident match, the cached directory."""
+        route = self.route(request)
+        if route is not None:
+            return request + describe_route(route)
+        return f"{request}\n\n{self.directory.render()}"
@@ -0,0 +1,258 @@
+"""Compact rendering of tool schemas for agent system prompts.
+
+Every agent lists its Coral and MCP tools in the system prompt. Dumping
+``json.dumps(tool.args)`` per tool repeats JSON noise and shared definitions
+for every tool, so this module renders one signature line per tool instead::
+
+    - send_message(threadId: str, content: str, mentions: list[str]): Send a message...
+
+Shared ``$defs`` are written once in a ``Types:`` block, and tools that are
+already bound natively to the model can be listed by name only. That is the
+default for agents (``schema_mode_from_env``): LangChain and CAMEL agents bind
+their tools, so a signature in the prompt would pay for each schema twice.
+"""
+import json
+import logging
+import os
+import sys
+from typing import Any, Callable, Dict, Iterable, List, Literal, Optional, Tuple
+
+from .metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+SchemaMode = Literal["full", "compact", "omit"]
+
+SCHEMA_MODES = ("full", "compact", "omit")
+
+_JSON_TYPES = {
+    "string": "str",
+    "integer": "int",
+    "number": "float",
+    "boolean": "bool",
+    "null": "None",
+    "object": "dict",
+    "array": "list",
+}
+
+
+def schema_mode_from_env(default: SchemaMode = "omit") -> SchemaMode:
+    """Read the schema rendering mode from ``CORAL_TOOL_SCHEMAS``, for an agent that binds its tools natively."""
+    mode = os.getenv("CORAL_TOOL_SCHEMAS", default).strip().lower()
+    if mode not in SCHEMA_MODES:
+        raise ValueError(f"CORAL_TOOL_SCHEMAS must be one of {SCHEMA_MODES}, got '{mode}'")
+    return mode
+
+
+def tool_schema(tool: Any) -> Tuple[str, str, Dict[str, Any]]:
+    """Return ``(name, description, parameters)`` for a LangChain tool, CAMEL tool or plain dict."""
+    if isinstance(tool, dict):
+        parameters = tool.get("parameters") or tool.get("inputSchema") or tool.get("args") or {}
+        return tool.get("name", "unknown_tool"), tool.get("description") or "", parameters
+    if hasattr(tool, "get_openai_function_schema"):
+        schema = tool.get_openai_function_schema() or {}
+        name = schema.get("name") or getattr(tool.func, "__name__", "unknown_tool")
+        return name, schema.get("description") or "", schema.get("parameters") or {}
+    args_schema = getattr(tool, "args_schema", None)
+    if isinstance(args_schema, dict):
+        parameters = args_schema
+    elif hasattr(args_schema, "model_json_schema"):
+        parameters = args_schema.model_json_schema()
+    else:
+        parameters = {"type": "object", "properties": getattr(tool, "args", {})}
+    return tool.name, tool.description or "", parameters
+
+
+class _Renderer:
+    """Renders JSON schemas as compact type expressions, sharing ``$defs`` across tools."""
+
+    def __init__(self):
+        self.shared: Dict[str, str] = {}
+
+    def fields(self, schema: Dict[str, Any], defs: Dict[str, Any], stack: Tuple[str, ...] = ()) -> str:
+        required = set(schema.get("required", []))
+        rendered = []
+        for name, prop in (schema.get("properties") or {}).items():
+            prop = prop if isinstance(prop, dict) else {}
+            field = f"{name}{'' if name in required else '?'}: {self.type(prop, defs, stack)}"
+            if "default" in prop and prop["default"] is not None:
+                field += f"={json.dumps(prop['default'], default=str)}"
+            rendered.append(field)
+        return ", ".join(rendered)
+
+    def type(self, schema: Dict[str, Any], defs: Dict[str, Any], stack: Tuple[str, ...] = ()) -> str:
+        if not schema:
+            return "any"
+        if "$ref" in schema:
+            return self.ref(schema["$ref"].rsplit("/", 1)[-1], defs, stack)
+        for key in ("anyOf", "oneOf", "allOf"):
+            if key in schema:
+                parts = [self.type(option, defs, stack) for option in schema[key]]
+                return (" | " if key != "allOf" else " & ").join(dict.fromkeys(parts))
+        if "enum" in schema:
+            return "|".join(json.dumps(value, default=str) for value in schema["enum"])
+        if "const" in schema:
+            return json.dumps(schema["const"], default=str)
+        json_type = schema.get("type")
+        if isinstance(json_type, list):
+            return " | ".join(_JSON_TYPES.get(t, t) for t in json_type)
+        if json_type == "array":
+            items = schema.get("items")
+            return f"list[{self.type(items, defs, stack)}]" if isinstance(items, dict) and items else "list"
+        if json_type == "object" or "properties" in schema:
+            if schema.get("properties"):
+                return "{" + self.fields(schema, defs, stack) + "}"
+            return "dict"
+        return _JSON_TYPES.get(json_type, "any")
+
+    def ref(self, name: str, defs: Dict[str, Any], stack: Tuple[str, ...]) -> str:
+        if name in stack or name not in defs:
+            return name
+        body = self.type(defs[name], defs, stack + (name,))
+        if self.shared.setdefault(name, body) == body:
+            return name
+        # Same name, different shape in another tool: inline rather than alias.
+        return body
+
+
+def _one_line(text: str) -> str:
+    return " ".join(text.split())
+
+
+def get_tools_description(
+    tools: Iterable[Any],
+    mode: SchemaMode = "compact",
+    escape_braces: bool = True,
+) -> str:
+    """Render the tool list for a system prompt.
+
+    Args:
+        tools: LangChain tools, CAMEL ``FunctionTool``s or ``{"name", "description", "parameters"}`` dicts.
+        mode: ``"full"`` keeps the legacy ``json.dumps`` schema per tool, ``"compact"`` renders
+            minified signatures with shared definitions, ``"omit"`` lists names and descriptions
+            only, for tools whose schemas already reach the model through native tool binding.
+        escape_braces: Double ``{``/``}`` so the result can be embedded in a ``ChatPromptTemplate``.
+
+    Returns:
+        str: One line per tool, followed by a ``Types:`` block in compact mode when needed.
+    """
+    if mode not in SCHEMA_MODES:
+        raise ValueError(f"mode must be one of {SCHEMA_MODES}, got '{mode}'")
+    renderer = _Renderer()
+    lines = []
+    for tool in tools:
+        name, description, parameters = tool_schema(tool)
+        if mode == "full":
+            lines.append(f"Tool: {name}, Schema: {json.dumps(parameters.get('properties', parameters), default=str)}")
+            continue
+        description = _one_line(description)
+        if mode == "omit":
+            lines.append(f"- {name}: {description}" if description else f"- {name}")
+            continue
+        defs = {**parameters.get("definitions", {}), **parameters.get("$defs", {})}
+        signature = f"- {name}({renderer.fields(parameters, defs)})"
+        lines.append(f"{signature}: {description}" if description else signature)
+    if mode == "compact" and renderer.shared:
+        lines.append("Types:")
+        lines.extend(f"  {name} = {body}" for name, body in renderer.shared.items())
+    text = "\n".join(lines)
+    if escape_braces:
+        text = text.replace("{", "{{").replace("}", "}}")
+    return text
+
+
+class DescriptionCache:
+    """Memoizes ``get_tools_description`` for agents that share tool sets.
+
+    Every agent connected to the same Coral server gets identical Coral tools,
+    so a process hosting many agents renders that block once.
+    """
+
+    def __init__(self):
+        self._cache: Dict[Tuple, str] = {}
+        self.hits = 0
+        self.misses = 0
+        self._hit = CACHE_REQUESTS.labels("tool_descriptions", "hit")
+        self._miss = CACHE_REQUESTS.labels("tool_descriptions", "miss")
+
+    def __call__(self, tools: Iterable[Any], mode: SchemaMode = "compact", escape_braces: bool = True) -> str:
+        tools = list(tools)
+        key = (mode, escape_braces) + tuple(
+            json.dumps(tool_schema(tool), sort_keys=True, default=str) for tool in tools
+        )
+        if key in self._cache:
+            self.hits += 1
+            self._hit.inc()
+        else:
+            self.misses += 1
+            self._miss.inc()
+            self._cache[key] = get_tools_description(tools, mode=mode, escape_braces=escape_braces)
+        return self._cache[key]
+
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Count prompt tokens with ``tiktoken`` when installed, else estimate at 4 characters per token."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def measure_savings(tools: Iterable[Any]) -> Dict[str, int]:
+    """Token counts of the tool block in each mode for one agent."""
+    tools = list(tools)
+    return {mode: count_tokens(get_tools_description(tools, mode=mode)) for mode in SCHEMA_MODES}
+
+
+def report_savings(agents: Dict[str, Iterable[Any]]) -> str:
+    """Tabulate per-agent prompt token savings of ``compact`` and ``omit`` against ``full``."""
+    rows = [f"{'agent':<28}{'tools':>6}{'full':>8}{'compact':>9}{'saved':>8}{'omit':>7}{'saved':>8}"]
+    for agent, tools in agents.items():
+        tools = list(tools)
+        counts = measure_savings(tools)
+        full = counts["full"] or 1
+        rows.append(
+            f"{agent:<28}{len(tools):>6}{counts['full']:>8}"
+            f"{counts['compact']:>9}{1 - counts['compact'] / full:>8.0%}"
+            f"{counts['omit']:>7}{1 - counts['omit'] / full:>8.0%}"
+        )
+    return "\n".join(rows)
+
+
+def log_savings(agent_name: str, tools: Iterable[Any], log: Optional[Callable[[str], Any]] = None) -> None:
+    """Report prompt token savings for ``agent_name`` when ``CORAL_PROMPT_STATS`` is set.
+
+    Logged at INFO through this module's logger unless ``log`` is given.
+    """
+    if os.getenv("CORAL_PROMPT_STATS", "").lower() in ("1", "true", "yes"):
+        (log or logger.info)("Tool schema prompt tokens:\n" + report_savings({agent_name: tools}))
+
+
+def _load_agents(paths: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    agents: Dict[str, List[Dict[str, Any]]] = {}
+    for path in paths:
+        with open(path, "r") as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            agents[os.path.splitext(os.path.basename(path))[0]] = data
+        else:
+            agents.update(data)
+    return agents
+
+
+if __name__ == "__main__":
+    # Measurement mode: python -m coral_runtime.schema tools.json [...]
+    # Each file holds either a list of tool dicts or {"agent_name": [tool dicts]}.
+    if len(sys.argv) < 2:
+        print("usage: python -m coral_runtime.schema <tools.json> [...]")
+        sys.exit(2)
+    print(report_savings(_load_agents(sys.argv[1:])))
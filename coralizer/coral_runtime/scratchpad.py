@@ -0,0 +1,133 @@
+"""Keep a long ``AgentExecutor`` run's scratchpad within a token budget.
+
+A worker runs its whole plan in one ``ainvoke``. Every tool observation, such
+as a firecrawl scrape or a page of news markdown, stays in the scratchpad and
+is sent again with every later model call, so a plan's total prompt tokens
+grow with the square of its length. ``ScratchpadCompactor`` is passed as the
+executor's ``trim_intermediate_steps``. Before each model call, it leaves the
+``keep_recent`` newest steps as they are. While the scratchpad is over
+``budget`` tokens, it replaces the oldest large observations with a digest:
+the first ``preview_chars`` characters plus a ``payload:sha256:...`` reference
+to the full text in a ``PayloadStore``. The model reads the rest with
+``fetch_payload`` if it needs it.
+
+Only what the model sees is compacted. The executor's own step list, the
+callbacks and the logs still get every observation in full.
+
+Settings (all via environment):
+    CORAL_SCRATCHPAD_TOKENS=12000   budget for tool observations; unset or 0: off
+    CORAL_SCRATCHPAD_KEEP=2         newest steps never compacted
+    CORAL_SCRATCHPAD_PREVIEW=400    characters of each compacted observation kept
+
+    cd coralizer && python -m benchmarks.bench_scratchpad
+"""
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+from .payloads import PayloadStore, parse_ref
+from .schema import count_tokens
+
+Step = Tuple[Any, Any]
+
+
+def _text(observation: Any) -> str:
+    """The observation as the model sees it: LangChain sends non-string results as JSON."""
+    if isinstance(observation, str):
+        return observation
+    try:
+        return json.dumps(observation, ensure_ascii=False)
+    except Exception:
+        return str(observation)
+
+
+class ScratchpadCompactor:
+    """``trim_intermediate_steps`` callable that digests old observations once the scratchpad is over budget.
+
+    Args:
+        store: Where the full observations go; use the agent's ``PayloadStore`` so ``fetch_payload`` can read them.
+        budget: Tokens of tool observations allowed in the prompt.
+        keep_recent: Newest steps always sent verbatim.
+        preview_chars: Characters of a compacted observation kept inline.
+        min_tokens: Observations smaller than this are never compacted.
+
+    ``compacted`` and ``tokens_saved`` add up over model calls, so ``tokens_saved``
+    is the prompt tokens not sent.
+    """
+
+    def __init__(self, store: PayloadStore, budget: int = 12000, keep_recent: int = 2,
+                 preview_chars: int = 400, min_tokens: int = 200, max_cached: int = 256):
+        self.store = store
+        self.budget = budget
+        self.keep_recent = keep_recent
+        self.preview_chars = preview_chars
+        self.min_tokens = min_tokens
+        self.max_cached = max_cached
+        self.compacted = 0
+        self.tokens_saved = 0
+        # Keyed by the observation string itself: its hash is cached, so a step is counted and stored once per run.
+        self._tokens: "OrderedDict[str, int]" = OrderedDict()
+        self._digests: "OrderedDict[str, str]" = OrderedDict()
+
+    def _remember(self, cache: "OrderedDict[str, Any]", key: str, value: Any) -> Any:
+        cache[key] = value
+        if len(cache) > self.max_cached:
+            cache.popitem(last=False)
+        return value
+
+    def tokens(self, text: str) -> int:
+        cached = self._tokens.get(text)
+        return cached if cached is not None else self._remember(self._tokens, text, count_tokens(text))
+
+    def digest(self, text: str) -> str:
+        """The preview and reference that stand in for ``text``."""
+        cached = self._digests.get(text)
+        if cached is not None:
+            return cached
+        ref = self.store.put(text)
+        preview = text[:self.preview_chars].rstrip()
+        digest = (f"{preview}\n...\n[Earlier tool result compacted to save context: {ref.size} bytes, "
+                  f"about {self.tokens(text)} tokens. Read it with fetch_payload(ref=\"{ref.ref}\", offset=0, "
+                  f"length=4000) if you need more than this preview.]")
+        return self._remember(self._digests, text, digest)
+
+    def __call__(self, steps: List[Step]) -> List[Step]:
+        texts = [_text(observation) for _, observation in steps]
+        sizes = [self.tokens(text) for text in texts]
+        total = sum(sizes)
+        if total <= self.budget:
+            return steps
+        compacted = list(steps)
+        for i in range(max(0, len(steps) - self.keep_recent)):
+            if total <= self.budget:
+                break
+            # Payload stubs are already short and carry their own reference.
+            if sizes[i] < self.min_tokens or parse_ref(texts[i]):
+                continue
+            digest = self.digest(texts[i])
+            saved = sizes[i] - self.tokens(digest)
+            if saved <= 0:
+                continue
+            compacted[i] = (steps[i][0], digest)
+            total -= saved
+            self.compacted += 1
+            self.tokens_saved += saved
+        return compacted
+
+
+def scratchpad_compactor_from_env(store: Optional[PayloadStore] = None) -> Optional[ScratchpadCompactor]:
+    """A ``ScratchpadCompactor`` from the ``CORAL_SCRATCHPAD_*`` settings, or ``None`` unless a budget is set.
+
+    Without ``store``, full observations go to a ``PayloadStore`` under the temp directory.
+    """
+    budget = int(os.getenv("CORAL_SCRATCHPAD_TOKENS", 0) or 0)
+    if budget <= 0:
+        return None
+    return ScratchpadCompactor(
+        store or PayloadStore(os.path.join(tempfile.gettempdir(), "coral-payloads")),
+        budget=budget,
+        keep_recent=int(os.getenv("CORAL_SCRATCHPAD_KEEP", 2)),
+        preview_chars=int(os.getenv("CORAL_SCRATCHPAD_PREVIEW", 400)),
+    )
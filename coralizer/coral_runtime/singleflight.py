@@ -0,0 +1,149 @@
+"""Single-flight: concurrent identical calls share one upstream call.
+
+When several agents in one host, or several tool calls in one model turn, ask
+for the same thing at the same moment, each used to make its own upstream
+request: the same page scraped twice, the same news query run three times. A
+``SingleFlight`` group lets the first caller for a key make the call. Every
+caller that arrives with the same key before that call finishes waits for it
+and gets the same result, or the same exception. Nothing is kept afterwards,
+so this is not a cache: the next call after completion goes upstream again.
+
+It works for coroutines (``run``, shared within one event loop) and for
+blocking code in threads (``run_sync``). ``coalesce_tools`` applies it to
+LangChain tools, keyed by tool name and arguments, and ``coalesced`` applies it
+to a plain function, e.g. for CAMEL's ``FunctionTool``.
+
+Only coalesce calls without side effects, whose result doesn't depend on who
+asked. Coral's own tools (``send_message``...) are never coalesced.
+
+Settings (all via environment):
+    CORAL_SINGLE_FLIGHT_TOOLS=name,name   agent tools to coalesce ("*": all of them)
+
+    cd coralizer && python -m benchmarks.bench_single_flight
+"""
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, TypeVar
+
+from .metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# A shared call counts as a hit: the caller got its result without going upstream.
+_SHARED = CACHE_REQUESTS.labels("single_flight", "hit")
+_UPSTREAM = CACHE_REQUESTS.labels("single_flight", "miss")
+
+
+def call_key(name: str, *args: Any, **kwargs: Any) -> str:
+    """A key for a call of ``name``: its arguments as canonical JSON."""
+    return name + json.dumps([args, kwargs], sort_keys=True, default=repr, separators=(",", ":"))
+
+
+class SingleFlight:
+    """A group of keys whose concurrent calls are shared.
+
+    ``stats()`` counts ``calls``, ``upstream`` (calls actually made) and
+    ``shared`` (callers that waited for another caller's call).
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Future] = {}
+        self._futures: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.counts = {"calls": 0, "upstream": 0, "shared": 0}
+
+    def _count(self, shared: bool):
+        with self._lock:
+            self.counts["calls"] += 1
+            self.counts["shared" if shared else "upstream"] += 1
+        (_SHARED if shared else _UPSTREAM).inc()
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        """``await call()``, or wait for the call already in flight for ``key`` on this loop."""
+        key = (id(asyncio.get_running_loop()), key)
+        task = self._tasks.get(key)
+        self._count(shared=task is not None)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(call())
+            task.add_done_callback(lambda done: self._tasks.pop(key, None) if self._tasks.get(key) is done else None)
+        # Shielded: one caller giving up (its turn timed out) must not cancel the call for the others.
+        return await asyncio.shield(task)
+
+    def run_sync(self, key: Hashable, call: Callable[[], T]) -> T:
+        """``call()``, or block until the call already in flight for ``key`` in another thread finishes."""
+        with self._lock:
+            future = self._futures.get(key)
+            leader = future is None
+            if leader:
+                future = self._futures[key] = Future()
+            self.counts["calls"] += 1
+            self.counts["upstream" if leader else "shared"] += 1
+        (_UPSTREAM if leader else _SHARED).inc()
+        if not leader:
+            return future.result()
+        try:
+            result = call()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._futures[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+
+# Shared by every agent in the process, so agents in one host coalesce with each other.
+default_group = SingleFlight()
+
+
+def coalesced(func: Callable[..., Any], group: Optional[SingleFlight] = None, name: Optional[str] = None) -> Callable[..., Any]:
+    """``func`` (sync or async) with concurrent calls with equal arguments shared; keeps its signature."""
+    group = group or default_group
+    name = name or getattr(func, "__qualname__", repr(func))
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def call_once(*args, **kwargs):
+            return await group.run(call_key(name, *args, **kwargs), lambda: func(*args, **kwargs))
+        return call_once
+
+    @functools.wraps(func)
+    def call_once(*args, **kwargs):
+        return group.run_sync(call_key(name, *args, **kwargs), lambda: func(*args, **kwargs))
+    return call_once
+
+
+def single_flight_tools_from_env() -> Set[str]:
+    return {name.strip() for name in os.getenv("CORAL_SINGLE_FLIGHT_TOOLS", "").split(",") if name.strip()}
+
+
+def coalesce_tools(tools: List[Any], names: Optional[Set[str]] = None, group: Optional[SingleFlight] = None) -> List[Any]:
+    """LangChain tools named in ``names`` (default ``CORAL_SINGLE_FLIGHT_TOOLS``; ``"*"``: all) with calls shared.
+
+    Calls are keyed by tool name and arguments, so equal calls from different agents share one call.
+    """
+    names = single_flight_tools_from_env() if names is None else names
+    wrapped = []
+    for tool in tools:
+        if "*" in names or tool.name in names:
+            update = {}
+            if getattr(tool, "coroutine", None) is not None:
+                update["coroutine"] = coalesced(tool.coroutine, group, name=tool.name)
+            if getattr(tool, "func", None) is not None:
+                update["func"] = coalesced(tool.func, group, name=tool.name)
+            tool = tool.model_copy(update=update) if update else tool
+        wrapped.append(tool)
+    return wrapped
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The runtime is imported as ``coral_runtime``, as the agents and benchmarks do.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
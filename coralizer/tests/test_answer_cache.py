@@ -0,0 +1,72 @@
+import asyncio
+
+from langchain_core.tools import StructuredTool
+
+from coral_runtime.answer_cache import AnswerCache, Mention, add_pending, record_replies
+
+
+def send_message_tool(sent):
+    async def send(**kwargs):
+        sent.append(kwargs)
+        return "Message sent successfully"
+    return StructuredTool(name="send_message", description="send", coroutine=send,
+                          args_schema={"type": "object", "properties": {}})
+
+
+def test_replies_in_one_thread_answer_its_mentions_in_order():
+    cache, sent, pending = AnswerCache(), [], {}
+    [send] = record_replies([send_message_tool(sent)], pending, cache, "tools")
+    add_pending(pending, [
+        Mention("t1", "alice", "latest news on rust"),
+        Mention("t2", "bob", "latest news on go"),
+        Mention("t1", "alice", "latest news on zig"),
+    ])
+
+    async def replies():
+        await send.coroutine(threadId="t1", content="rust news", mentions=["alice"])
+        await send.coroutine(threadId="t2", content="go news", mentions=["bob"])
+        await send.coroutine(threadId="t1", content="zig news", mentions=["alice"])
+        await send.coroutine(threadId="t1", content="anything else?", mentions=["alice"])
+
+    asyncio.run(replies())
+    assert cache.get("latest news on rust", "tools") == "rust news"
+    assert cache.get("latest news on go", "tools") == "go news"
+    assert cache.get("latest news on zig", "tools") == "zig news"
+    assert pending == {} and len(sent) == 4
+
+
+def test_error_replies_are_not_cached():
+    cache, pending = AnswerCache(), {}
+    [send] = record_replies([send_message_tool([])], pending, cache, "tools")
+    add_pending(pending, [Mention("t1", "alice", "scrape example.com")])
+    asyncio.run(send.coroutine(threadId="t1", content="Error: timed out"))
+    assert cache.get("scrape example.com", "tools") is None and pending == {}
+
+
+def test_non_ascii_entities_get_their_own_key():
+    cache = AnswerCache()
+    cache.put("latest news on 北京", "Beijing answer")
+    assert cache.get("latest news on 上海") is None
+    assert cache.get("Latest  news on 北京!") == "Beijing answer"
+
+
+def test_operators_and_numbers_are_part_of_the_key():
+    cache = AnswerCache()
+    cache.put("What is 2.5*4?", "10")
+    assert cache.get("What is 2.5+4?") is None
+    assert cache.get("what is 2.5 * 4") == "10"
+
+
+LONG = ("please collect the latest headlines and a short summary of each story about the {} economy "
+        "from the major outlets published during the last week")
+
+
+def test_fuzzy_hits_need_the_same_entities_urls_and_numbers():
+    cache = AnswerCache(fuzzy_threshold=0.85)
+    cache.put(LONG.format("Lisbon"), "Lisbon answer")
+    assert cache.get(LONG.format("Porto")) is None
+    assert cache.get(LONG.format("Lisbon") + " please") == "Lisbon answer"
+    cache.put("scrape https://example.com/a and list every heading and link on the page with its anchor text", "A")
+    assert cache.get("scrape https://example.com/b and list every heading and link on the page with its anchor text") is None
+    cache.put("summarise the top 5 stories on the front page of the site and keep each summary short", "five")
+    assert cache.get("summarise the top 6 stories on the front page of the site and keep each summary short") is None
@@ -0,0 +1,21 @@
+import pytest
+from camel.memories import ScoreBasedContextCreator
+
+from benchmarks.bench_camel_memory import ApproxTokenCounter, step_records
+from coral_runtime.camel_memory import TokenBoundedMemory
+
+
+@pytest.mark.parametrize("budget", [300, 1000, 4000])
+def test_context_stays_within_the_budget(budget):
+    memory = TokenBoundedMemory(ScoreBasedContextCreator(ApproxTokenCounter(), 20000), token_budget=budget)
+    for step in range(200):
+        records = step_records(step)
+        memory.write_records(records)
+        newest = memory._count([record.to_openai_message() for record in records])
+        _, tokens = memory.get_context()
+        # Only a newest turn that is over budget on its own may exceed it, and then without a summary.
+        assert tokens <= max(budget, newest)
+        assert memory._summary_tokens <= budget // 4
+        if newest > budget:
+            assert memory._summary_tokens == 0
+    assert memory.evicted > 0
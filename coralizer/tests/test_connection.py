@@ -0,0 +1,26 @@
+import asyncio
+
+import pytest
+
+from coral_runtime.connection import ConnectionFailed, SupervisedConnection
+
+
+def test_wait_ready_before_start_raises():
+    async def main():
+        connection = SupervisedConnection("test", {"transport": "none"})
+        with pytest.raises(ConnectionFailed, match="not started"):
+            await connection.wait_ready()
+
+    asyncio.run(main())
+
+
+def test_supervisor_that_gives_up_leaves_no_tasks_behind():
+    async def main():
+        connection = SupervisedConnection("test", {"transport": "none"}, max_attempts=0)
+        with pytest.raises(ConnectionFailed, match="supervisor stopped"):
+            await connection.__aenter__()
+        await asyncio.sleep(0)
+        assert isinstance(connection._failure, ValueError)
+        return asyncio.all_tasks() - {asyncio.current_task()}
+
+    assert asyncio.run(main()) == set()
@@ -0,0 +1,60 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from coral_runtime.cpu_pool import async_tool, cpu_bound, executor_for, process_pool, shutdown_process_pool
+
+
+@cpu_bound
+def rank(pages):
+    return sorted(pages)
+
+
+def fetch(url):
+    return url
+
+
+@pytest.fixture
+def threads(monkeypatch):
+    monkeypatch.delenv("CORAL_CPU_TOOLS", raising=False)
+    monkeypatch.delenv("CORAL_CPU_POOL", raising=False)
+    pool = ThreadPoolExecutor(max_workers=1)
+    yield pool
+    pool.shutdown()
+    shutdown_process_pool()
+
+
+def test_io_bound_tools_run_in_threads(threads):
+    assert executor_for(fetch, "fetch", threads=threads) is threads
+
+
+def test_marked_and_listed_tools_run_in_the_process_pool(threads, monkeypatch):
+    assert executor_for(rank, "rank", threads=threads) is process_pool()
+    assert executor_for(fetch, "fetch", cpu=True, threads=threads) is process_pool()
+    monkeypatch.setenv("CORAL_CPU_TOOLS", "fetch, other")
+    assert executor_for(fetch, "fetch", threads=threads) is process_pool()
+    # An explicit classification wins over the marker.
+    assert executor_for(rank, "rank", cpu=False, threads=threads) is threads
+
+
+def test_process_pool_can_be_turned_off(threads, monkeypatch):
+    monkeypatch.setenv("CORAL_CPU_POOL", "0")
+    assert executor_for(rank, "rank", threads=threads) is threads
+
+
+def test_unpicklable_cpu_tools_fall_back_to_threads(threads, caplog):
+    @cpu_bound
+    def closure(pages):
+        return pages
+
+    with caplog.at_level(logging.WARNING, logger="coral_runtime.cpu_pool"):
+        assert executor_for(closure, "closure", threads=threads) is threads
+    assert "cannot be pickled" in caplog.text
+
+
+def test_async_tool_runs_cpu_bound_functions_in_another_process(threads):
+    assert asyncio.run(async_tool(os.getpid, cpu=True)()) != os.getpid()
+    assert asyncio.run(async_tool(os.getpid, cpu=False)()) == os.getpid()
@@ -0,0 +1,81 @@
+import asyncio
+from types import SimpleNamespace
+
+from coral_runtime.directory import AgentDirectory
+
+
+class FakeCoral:
+    """Answers ``list_agents`` the way the Coral server does, from ``agents``."""
+
+    def __init__(self, agents):
+        self.agents = dict(agents)
+        self.calls = 0
+        self.fail = False
+
+    async def call_tool(self, name, arguments):
+        assert name == "list_agents" and arguments == {"includeDetails": True}
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("coral down")
+        lines = [f"ID: {agent_id}, , Description: {description}" for agent_id, description in self.agents.items()]
+        text = f"Registered Agents ({len(lines)}):\n" + "\n".join(lines)
+        return SimpleNamespace(content=[SimpleNamespace(text=text)])
+
+
+def test_listeners_hear_about_joins_leaves_and_new_descriptions():
+    coral = FakeCoral({"me": "the interface", "news": "fetches news", "crawl": "scrapes pages"})
+    directory = AgentDirectory(coral, self_id="me")
+    changes = []
+    directory.subscribe(lambda added, removed: changes.append((sorted(added), sorted(removed))))
+
+    async def main():
+        await directory.refresh()
+        await directory.refresh()
+        coral.agents.pop("crawl")
+        coral.agents["math"] = "solves equations"
+        coral.agents["news"] = "fetches world news"
+        await directory.refresh()
+
+    asyncio.run(main())
+    # The unchanged second refresh notifies nobody.
+    assert changes == [(["crawl", "news"], []), (["math", "news"], ["crawl"])]
+    assert directory.agents == {"news": "fetches world news", "math": "solves equations"}
+    assert directory.version == 2
+
+
+def test_poller_picks_up_changes_and_survives_failures():
+    coral = FakeCoral({"news": "fetches news"})
+    directory = AgentDirectory(coral, poll_interval=0.01)
+
+    async def main():
+        changed = asyncio.Event()
+        directory.subscribe(lambda added, removed: changed.set() if "math" in added else None)
+        async with directory:
+            assert directory.agents == {"news": "fetches news"}
+            coral.fail = True
+            await asyncio.sleep(0.05)
+            # Failed refreshes keep the cached copy.
+            assert directory.agents == {"news": "fetches news"}
+            coral.fail = False
+            coral.agents["math"] = "solves equations"
+            await asyncio.wait_for(changed.wait(), 5)
+        calls = coral.calls
+        await asyncio.sleep(0.05)
+        return calls
+
+    calls = asyncio.run(main())
+    assert directory.agents == {"news": "fetches news", "math": "solves equations"}
+    # Stopped: no more polling once the context exits.
+    assert coral.calls == calls
+
+
+def test_render_says_how_old_the_copy_is():
+    now = [100.0]
+    directory = AgentDirectory(FakeCoral({}), clock=lambda: now[0])
+    assert "not been loaded" in directory.render()
+    directory.apply({"news": "fetches news"})
+    now[0] += 42
+    assert directory.render().splitlines() == [
+        "Connected agents (1), directory refreshed 42s ago:",
+        "ID: news, Description: fetches news",
+    ]
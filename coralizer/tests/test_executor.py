@@ -0,0 +1,57 @@
+import asyncio
+
+from langchain.agents import create_tool_calling_agent
+from langchain_core.messages import AIMessage
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.tools import StructuredTool
+
+from benchmarks.bench_scratchpad import ScriptedModel
+from coral_runtime.executor import create_concurrent_executor
+
+PROMPT = ChatPromptTemplate.from_messages([("system", "Scripted."), ("placeholder", "{agent_scratchpad}")])
+
+
+def tracked_tools(calls, in_flight, peak):
+    def make(name):
+        async def call(**kwargs):
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+            await asyncio.sleep(0.02)
+            in_flight[0] -= 1
+            return name
+        return StructuredTool.from_function(coroutine=call, name=name, description=name,
+                                            args_schema={"type": "object", "properties": {}})
+    return [make(f"tool_{i}") for i in range(calls)]
+
+
+def one_turn(tools):
+    return [AIMessage(content="", tool_calls=[{"name": tool.name, "args": {}, "id": f"call_{i}"}
+                                              for i, tool in enumerate(tools)]),
+            AIMessage(content="done")]
+
+
+def test_tool_calls_of_a_turn_stay_within_the_bound():
+    async def main():
+        in_flight, peak = [0], [0]
+        tools = tracked_tools(6, in_flight, peak)
+        agent = create_tool_calling_agent(ScriptedModel(turns=one_turn(tools)), tools, PROMPT)
+        result = await create_concurrent_executor(agent, tools, max_concurrency=2).ainvoke({})
+        return result, peak[0]
+
+    result, peak = asyncio.run(main())
+    assert result["output"] == "done"
+    assert peak == 2
+
+
+def test_concurrent_runs_get_their_own_bound():
+    async def main():
+        in_flight, peak = [0], [0]
+        tools = tracked_tools(2, in_flight, peak)
+        # One executor shared by two runs, as the interface agent's sessions share one.
+        turns = one_turn(tools)
+        agent = create_tool_calling_agent(ScriptedModel(turns=[turns[0], turns[0], turns[1], turns[1]]), tools, PROMPT)
+        executor = create_concurrent_executor(agent, tools, max_concurrency=1)
+        await asyncio.gather(executor.ainvoke({}), executor.ainvoke({}))
+        return peak[0]
+
+    assert asyncio.run(main()) == 2
@@ -0,0 +1,83 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from coral_runtime import host
+from coral_runtime.agent import AgentDefinition
+
+
+def definition(agent_id):
+    return AgentDefinition(agent_id=agent_id, agent_description=agent_id, mcp_server_url="http://mcp.test/sse")
+
+
+@pytest.fixture
+def delays(monkeypatch):
+    """The (failures, base, cap) of every restart, with the wait itself skipped."""
+    delays = []
+
+    def backoff_delay(failures, base, cap):
+        delays.append((failures, base, cap))
+        return 0.0
+    monkeypatch.setattr(host, "backoff_delay", backoff_delay)
+    return delays
+
+
+def scripted_runs(monkeypatch, outcomes):
+    """Replace ``run_agent``: each run of an agent takes the next outcome, an exception or a clean return."""
+    runs = {}
+
+    async def run_agent(definition, model=None, describe=None, ready=None):
+        script = outcomes[definition.agent_id]
+        runs[definition.agent_id] = runs.get(definition.agent_id, 0) + 1
+        outcome = script.pop(0) if script else None
+        if outcome is None:
+            await asyncio.Event().wait()
+        if isinstance(outcome, Exception):
+            raise outcome
+    monkeypatch.setattr(host, "run_agent", run_agent)
+    return runs
+
+
+def shared():
+    async def aclose():
+        pass
+    return SimpleNamespace(model=None, describe=None, aclose=aclose)
+
+
+def test_restart_backoff_grows_with_failures_and_resets_after_a_clean_run(monkeypatch, delays):
+    scripted_runs(monkeypatch, {"news": [RuntimeError("1"), RuntimeError("2"), RuntimeError("3"), "ok",
+                                         RuntimeError("4")]})
+
+    async def main():
+        task = asyncio.create_task(host.supervise_agent(definition("news"), shared(), restart_base=0.5, restart_max=8))
+        while len(delays) < 5:
+            await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert delays == [(1, 0.5, 8), (2, 0.5, 8), (3, 0.5, 8), (0, 0.5, 8), (1, 0.5, 8)]
+
+
+def test_restart_delays_use_full_jitter_up_to_the_cap():
+    for failures in range(10):
+        for _ in range(20):
+            assert 0 <= host.backoff_delay(failures, 1.0, 60.0) <= min(60.0, 2 ** failures)
+
+
+def test_a_crashing_agent_does_not_stop_the_others(monkeypatch, delays):
+    runs = scripted_runs(monkeypatch, {"flaky": [RuntimeError("boom")] * 3, "steady": []})
+
+    async def main():
+        task = asyncio.create_task(host.run_host([definition("flaky"), definition("steady")], shared()))
+        while runs.get("flaky", 0) < 4:
+            await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert runs == {"flaky": 4, "steady": 1}
+    assert [failures for failures, _, _ in delays] == [1, 2, 3]
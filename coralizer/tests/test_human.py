@@ -0,0 +1,165 @@
+import asyncio
+import random
+from types import SimpleNamespace
+from xml.sax.saxutils import quoteattr
+
+from langchain_core.tools import StructuredTool
+from starlette.testclient import TestClient
+
+from coral_runtime.answer_cache import parse_mentions
+from coral_runtime.human import NO_MENTIONS, MentionRouter, QueueChannel, WebChannel, serve_sessions
+
+SESSIONS = 50
+
+
+def _result(text):
+    return SimpleNamespace(content=[SimpleNamespace(text=text)], isError=False)
+
+
+class FakeCoral:
+    """Coral's messaging for one agent: like the server, it keeps a single pending ``wait_for_mentions``."""
+
+    def __init__(self):
+        self.threads = 0
+        self.messages = 0
+        self.unread = []
+        self.waiter = None
+        self.waits = 0
+
+    def mention(self, thread_id, content):
+        self.messages += 1
+        self.unread.append(f'<message id="m{self.messages}" threadId={quoteattr(thread_id)} '
+                           f'senderId="worker" content={quoteattr(content)} />')
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    async def worker_reply(self, thread_id, content):
+        await asyncio.sleep(random.uniform(0, 0.05))
+        self.mention(thread_id, f"reply: {content}")
+
+    async def call_tool(self, name, arguments):
+        if name == "create_thread":
+            self.threads += 1
+            return _result(f"Thread created successfully:\nID: thread-{self.threads}\nName: {arguments['threadName']}\n"
+                           f"Creator: interface\nParticipants: worker")
+        if name == "send_message":
+            asyncio.create_task(self.worker_reply(arguments["threadId"], arguments["content"]))
+            return _result("Message sent successfully")
+        if name == "wait_for_mentions":
+            self.waits += 1
+            if not self.unread:
+                # A newer wait replaces this one on the server; the older waiter just times out.
+                self.waiter = waiter = asyncio.get_running_loop().create_future()
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter), arguments["timeoutMs"] / 1000)
+                except asyncio.TimeoutError:
+                    pass
+            if not self.unread:
+                return _result(NO_MENTIONS)
+            messages, self.unread = self.unread, []
+            return _result(f"<messages>{''.join(messages)}</messages>")
+        raise ValueError(name)
+
+
+def coral_tools(coral):
+    """The Coral tools as langchain_mcp_adapters builds them: coroutines returning ``(content, artifact)``."""
+    def tool(name):
+        async def call(**kwargs):
+            return (coral_text(await coral.call_tool(name, kwargs)), None)
+        return StructuredTool(name=name, description=name, coroutine=call, response_format="content_and_artifact",
+                              args_schema={"type": "object", "properties": {}})
+    return {t.name: t for t in (tool("create_thread"), tool("send_message"), tool("wait_for_mentions"))}
+
+
+def coral_text(result):
+    return "\n".join(part.text for part in result.content)
+
+
+async def conversation(channel, tools):
+    """One turn of the interface agent's workflow, as its prompt scripts it."""
+    topic = await channel.ask("How can I assist you today?")
+    created, _ = await tools["create_thread"].coroutine(threadName=topic, participantIds=["worker"])
+    thread_id = created.split("ID: ")[1].split("\n")[0]
+    await tools["send_message"].coroutine(threadId=thread_id, content=topic, mentions=["worker"])
+    replies = []
+    while not replies:
+        text, _ = await tools["wait_for_mentions"].coroutine(timeoutMs=2000)
+        replies = parse_mentions(text)
+    await channel.ask("\n".join(f"{reply.thread_id}|{reply.content}" for reply in replies))
+
+
+def test_concurrent_sessions_get_their_own_mentions():
+    async def main():
+        coral = FakeCoral()
+        channel = QueueChannel()
+        router = MentionRouter(coral, channel, poll_ms=1000)
+        tools = {tool.name: tool for tool in router.tools(list(coral_tools(coral).values()))}
+
+        async def user(session_id):
+            assert await channel.next_question(session_id, timeout=5) == "How can I assist you today?"
+            channel.answer(session_id, f"topic {session_id}")
+            summary = await channel.next_question(session_id, timeout=10)
+            channel.answer(session_id, "bye")
+            channel.close_session(session_id)
+            return summary
+
+        async with channel, router:
+            server = asyncio.create_task(serve_sessions(channel, lambda session_id: conversation(channel, tools)))
+            for i in range(SESSIONS):
+                channel.open_session(f"s{i}")
+            summaries = await asyncio.wait_for(asyncio.gather(*(user(f"s{i}") for i in range(SESSIONS))), 30)
+            server.cancel()
+            await asyncio.gather(server, return_exceptions=True)
+        return coral, summaries
+
+    coral, summaries = asyncio.run(main())
+    threads = set()
+    for i, summary in enumerate(summaries):
+        lines = summary.split("\n")
+        # Exactly one reply, the worker's answer to this session's own instruction.
+        assert len(lines) == 1, summary
+        thread_id, content = lines[0].split("|")
+        assert content == f"reply: topic s{i}"
+        threads.add(thread_id)
+    assert len(threads) == SESSIONS
+    # Every mention was read by the router's single reader.
+    assert coral.messages == SESSIONS
+
+
+def test_mentions_in_unowned_threads_go_to_a_waiting_session():
+    async def main():
+        router = MentionRouter(FakeCoral())
+        router.own("thread-a", "a")
+        waiting = asyncio.create_task(router.wait(1000, session_id="b"))
+        await asyncio.sleep(0)
+        router.deliver('<messages><message threadId="thread-x" senderId="w" content="hello" /></messages>')
+        return await waiting, await router.wait(10, session_id="a")
+
+    text, nothing = asyncio.run(main())
+    assert [m.thread_id for m in parse_mentions(text)] == ["thread-x"]
+    assert nothing == NO_MENTIONS
+
+
+def test_mentions_for_closed_sessions_are_dropped():
+    async def main():
+        channel = QueueChannel()
+        channel.open_session("a")
+        router = MentionRouter(FakeCoral(), channel)
+        router.own("thread-a", "a")
+        channel.close_session("a")
+        return router.deliver('<messages><message threadId="thread-a" senderId="w" content="late" /></messages>')
+
+    assert asyncio.run(main()) == 0
+
+
+def test_polling_does_not_reopen_a_closed_session():
+    channel = WebChannel()
+    with TestClient(channel.app()) as client:
+        assert client.get("/sessions/s1/question", params={"timeout": 0}).status_code == 404
+        assert client.post("/sessions/s1").status_code == 204
+        assert client.get("/sessions/s1/question", params={"timeout": 0}).json() == {"question": None}
+        assert client.delete("/sessions/s1").status_code == 204
+        response = client.get("/sessions/s1/question", params={"timeout": 0})
+        assert response.status_code == 404
+        assert response.json() == {"closed": True}
+    assert not channel.is_open("s1")
@@ -0,0 +1,67 @@
+import io
+import logging
+import threading
+
+import pytest
+
+from coral_runtime.logs import AgentFilter, configure_logging, set_log_agent, stop_logging
+
+
+@pytest.fixture
+def output():
+    stream = io.StringIO()
+    yield stream
+    stop_logging()
+    logging.getLogger().handlers.clear()
+    logging.getLogger().setLevel(logging.WARNING)
+
+
+def test_agent_levels_are_applied_per_agent(output):
+    configure_logging(level="INFO", fmt="text", stream=output, agent_levels=["DEBUG", None])
+    assert logging.getLogger().level == logging.DEBUG
+    logger = logging.getLogger("test.agents")
+
+    def agent(agent_id, level):
+        set_log_agent(agent_id, level)
+        logger.debug(f"{agent_id} debug")
+        logger.info(f"{agent_id} info")
+
+    for args in (("verbose", "DEBUG"), ("quiet", None)):
+        thread = threading.Thread(target=agent, args=args)
+        thread.start()
+        thread.join()
+    stop_logging()
+    lines = output.getvalue()
+    assert "verbose debug" in lines and "verbose info" in lines
+    assert "quiet info" in lines and "quiet debug" not in lines
+
+
+def test_set_log_agent_leaves_the_root_level_alone(output):
+    configure_logging(level="WARNING", fmt="text", stream=output)
+    thread = threading.Thread(target=set_log_agent, args=("verbose", "DEBUG"))
+    thread.start()
+    thread.join()
+    assert logging.getLogger().level == logging.WARNING
+
+
+def sampled(sampler, events):
+    kept = []
+
+    def agent():
+        # The agent's own level, so the test does not depend on the configured default.
+        set_log_agent("agent", "DEBUG")
+        for event in events:
+            kept.append(sampler.filter(logging.makeLogRecord({"levelno": logging.INFO, "msg": "step", "event": event})))
+    thread = threading.Thread(target=agent)
+    thread.start()
+    thread.join()
+    return kept
+
+
+def test_sampling_counts_stay_bounded():
+    assert sampled(AgentFilter(sample_every=2), ["tool_call"] * 4) == [True, False, True, False]
+    sampler = AgentFilter(sample_every=2, max_keys=8)
+    kept = sampled(sampler, [f"event-{i % 20}" for i in range(100)])
+    assert len(sampler._seen) == 8
+    # Every pair fell out before it came round again, so each record started a fresh count.
+    assert all(kept)
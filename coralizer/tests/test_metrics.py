@@ -0,0 +1,105 @@
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from coral_runtime.metrics import (CONTENT_TYPE, RECONNECTS, TOOL_CALLS, TOOLS_IN_FLIGHT, Counter, Gauge, Histogram,
+                                   Registry, agent_label, serve_metrics, timed)
+
+
+@pytest.fixture
+def registry():
+    return Registry()
+
+
+def test_text_format(registry):
+    requests = Counter("test_requests_total", "Requests.", ["agent"], registry=registry)
+    up = Gauge("test_up", "Up.", registry=registry)
+    latency = Histogram("test_seconds", "Latency.", ["agent"], buckets=(0.1, 1), registry=registry)
+    requests.labels('a "quoted"\nagent').inc(2)
+    up.set_function(lambda: True)
+    for value in (0.05, 0.5, 5):
+        latency.labels(agent="x").observe(value)
+
+    assert registry.render().splitlines() == [
+        "# HELP test_requests_total Requests.",
+        "# TYPE test_requests_total counter",
+        'test_requests_total{agent="a \\"quoted\\"\\nagent"} 2',
+        "# HELP test_up Up.",
+        "# TYPE test_up gauge",
+        "test_up 1",
+        "# HELP test_seconds Latency.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{agent="x",le="0.1"} 1',
+        'test_seconds_bucket{agent="x",le="1"} 2',
+        'test_seconds_bucket{agent="x",le="+Inf"} 3',
+        'test_seconds_sum{agent="x"} 5.55',
+        'test_seconds_count{agent="x"} 3',
+    ]
+
+
+def test_threads_write_their_own_cells(registry):
+    calls = Counter("test_calls_total", "Calls.", registry=registry)
+    barrier = threading.Barrier(8)
+
+    def work():
+        barrier.wait()
+        for _ in range(10000):
+            calls.inc()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    series = calls.labels()
+    # One cell per writing thread, kept after the thread has exited.
+    assert len(series._cells) == 8
+    assert series.value() == 80000
+
+
+def test_wrong_label_count_is_rejected(registry):
+    with pytest.raises(ValueError):
+        Counter("test_labelled_total", "Labelled.", ["agent", "tool"], registry=registry).labels("only-one")
+
+
+def test_metrics_endpoint():
+    RECONNECTS.labels("test-endpoint").inc()
+    server = serve_metrics(0)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(url + "/metrics", timeout=5) as response:
+            assert response.headers["Content-Type"] == CONTENT_TYPE
+            body = response.read().decode()
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(url + "/other", timeout=5)
+        assert error.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert 'coral_reconnects_total{connection="test-endpoint"} 1' in body
+    assert "# TYPE coral_event_loop_lag_seconds histogram" in body
+
+
+def test_timed_tools_count_outcomes_and_in_flight_calls():
+    agent = agent_label()
+    in_flight = TOOLS_IN_FLIGHT.labels(agent)
+
+    def scrape(url):
+        assert in_flight.value() == 1
+        if url == "bad":
+            raise ValueError(url)
+        return url
+
+    tool = timed(scrape, "test_scrape")
+    assert tool("good") == "good"
+    with pytest.raises(ValueError):
+        tool("bad")
+
+    def calls(outcome):
+        # Bucket counts; the last column is the sum of the observed seconds.
+        return sum(TOOL_CALLS.labels(agent, "test_scrape", outcome).totals()[:-1])
+
+    assert calls("ok") == calls("error") == 1
+    assert in_flight.value() == 0
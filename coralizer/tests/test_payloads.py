@@ -0,0 +1,126 @@
+import asyncio
+import os
+import re
+import threading
+
+import pytest
+
+from coral_runtime.payloads import REF_PREFIX, PayloadStore, offloaded, ref_digest
+
+TEXT = "naïve café — 日本語 🙂 " * 50
+
+
+@pytest.fixture(params=["gzip", None])
+def store(tmp_path, request):
+    return PayloadStore(str(tmp_path / "store"), compress=request.param)
+
+
+def footer(text):
+    return tuple(map(int, re.search(r"\[bytes (\d+)-(\d+) of (\d+)", text).groups()))
+
+
+def test_refs_must_be_a_digest(store, tmp_path):
+    ref = store.put(TEXT)
+    assert ref_digest(ref.ref) == ref_digest(ref.digest) == ref.digest
+    secret = tmp_path / "secret"
+    secret.with_suffix(".json").write_text('{"size": 6, "mime": "text/plain", "compression": null}')
+    secret.with_suffix(".body").write_text("secret")
+    outside = os.path.relpath(secret, os.path.join(store.root, "xx"))
+    for bad in ("../" + outside, outside, REF_PREFIX + "../secret", ref.digest[:-1], ref.ref + "/..", "", "x" * 64):
+        with pytest.raises(ValueError):
+            ref_digest(bad)
+        assert store.fetch(bad).startswith("Error: not a payload reference")
+        with pytest.raises(ValueError):
+            store.read(bad)
+
+
+@pytest.mark.parametrize("length", [1, 2, 3, 5, 7, 100])
+def test_reads_never_split_a_character(store, length):
+    ref = store.put(TEXT)
+    data, pieces, offset = TEXT.encode(), [], 0
+    while offset < ref.size:
+        text = store.fetch(ref.ref, offset, length)
+        body, _, tail = text.rpartition("\n")
+        start, end, size = footer(tail)
+        assert start == offset and end > start and size == ref.size
+        assert "�" not in body
+        assert body.encode() == data[start:end]
+        pieces.append(body)
+        offset = end
+    assert "".join(pieces) == TEXT
+
+
+def test_offsets_inside_a_character_move_to_the_next_one(store):
+    ref = store.put("日本")
+    body, _, tail = store.fetch(ref.ref, 1, 10).rpartition("\n")
+    assert body == "本" and footer(tail) == (3, 6, 6)
+
+
+def test_negative_offset_is_clamped(store):
+    ref = store.put("hello world")
+    body, _, tail = store.fetch(ref.ref, -5, 5).rpartition("\n")
+    assert body == "hello"
+    assert tail == "[bytes 0-5 of 11; 6 remaining, continue with offset=5]"
+
+
+def test_missing_payload(store):
+    assert store.fetch("0" * 64).startswith("Error: no payload")
+
+
+def age(store, ref, seconds):
+    path = store._path(ref.digest) + ".json"
+    stored_at = os.stat(path).st_mtime - seconds
+    os.utime(path, (stored_at, stored_at))
+
+
+def test_expired_payloads_are_deleted_when_the_store_is_opened(tmp_path):
+    root = str(tmp_path / "store")
+    store = PayloadStore(root, ttl=60)
+    old, new = store.put("old " * 100), store.put("new " * 100)
+    age(store, old, 120)
+    reopened = PayloadStore(root, ttl=60)
+    assert reopened.deleted == 1
+    assert reopened.fetch(old.ref).startswith("Error: no payload")
+    assert reopened.fetch(new.ref).startswith("new new")
+    assert not os.path.exists(store._path(old.digest) + ".body")
+
+
+def test_put_keeps_the_store_under_its_size_limit(tmp_path):
+    store = PayloadStore(str(tmp_path / "store"), compress=None, max_bytes=3500, ttl=None)
+    refs = [store.put(f"{i} " + "x" * 1000) for i in range(3)]
+    for seconds, ref in zip((30, 20, 10), refs):
+        age(store, ref, seconds)
+    store.put("0 " + "x" * 1000)  # stored again, so now the most recent
+    store.put("3 " + "x" * 1000)
+    # Four payloads of about 1 KB each: the least recently stored one goes.
+    assert store.deleted == 1
+    assert store._disk_bytes <= 3500
+    assert store.fetch(refs[1].ref).startswith("Error: no payload")
+    assert store.stat(refs[0].ref).size == store.stat(refs[2].ref).size == refs[0].size
+
+
+def test_a_payload_larger_than_the_limit_is_still_returned(tmp_path):
+    store = PayloadStore(str(tmp_path / "store"), compress=None, max_bytes=100)
+    ref = store.put(TEXT)
+    assert store.fetch(ref.ref, 0, 6).startswith("naïve")
+
+
+def test_async_wrappers_store_in_a_worker_thread(tmp_path):
+    store = PayloadStore(str(tmp_path / "store"), threshold=100)
+    threads = []
+    put = store.put
+
+    def recording_put(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return put(*args, **kwargs)
+    store.put = recording_put
+
+    async def scrape(url: str) -> str:
+        """Scrape a page."""
+        return TEXT
+
+    wrapped = offloaded(scrape, store)
+    result = asyncio.run(wrapped("https://example.com"))
+    assert wrapped.__name__ == "scrape" and wrapped.__doc__ == "Scrape a page."
+    assert REF_PREFIX in result
+    assert threads and threads[0] is not threading.main_thread()
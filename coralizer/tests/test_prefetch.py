@@ -0,0 +1,91 @@
+import time
+from collections import Counter
+
+import pytest
+
+from coral_runtime.prefetch import Prefetcher, page_key, result_urls
+
+
+class Pages:
+    """A fetch function that returns ``size`` characters per page and counts calls per URL."""
+
+    def __init__(self, size=100, failing=()):
+        self.size = size
+        self.failing = set(failing)
+        self.calls = Counter()
+
+    def __call__(self, url):
+        self.calls[url] += 1
+        if url in self.failing:
+            raise ConnectionError(url)
+        return url[-1] * self.size
+
+
+def settle(prefetcher):
+    for entry in list(prefetcher._pages.values()):
+        try:
+            entry.future.result(timeout=5)
+        except Exception:
+            pass
+
+
+@pytest.fixture
+def pages():
+    return Pages()
+
+
+def test_least_recently_read_page_is_evicted(pages):
+    prefetcher = Prefetcher(pages, top_k=3, max_pages=2)
+    prefetcher.prefetch(["https://a", "https://b"])
+    settle(prefetcher)
+    assert prefetcher.get("https://a/") == "a" * 100
+    prefetcher.prefetch(["https://c"])
+    settle(prefetcher)
+    assert list(prefetcher._pages) == ["a", "c"]
+    assert prefetcher.get("https://b") == "b" * 100
+    stats = prefetcher.stats()
+    assert (stats["prefetched"], stats["hits"], stats["misses"], stats["wasted"]) == (3, 1, 1, 1)
+    assert pages.calls["https://b"] == 2
+    prefetcher.close()
+
+
+def test_pages_are_evicted_past_the_byte_limit(pages):
+    prefetcher = Prefetcher(pages, top_k=3, max_pages=10, max_bytes=250)
+    prefetcher.prefetch(["https://a", "https://b", "https://c"])
+    settle(prefetcher)
+    stats = prefetcher.stats()
+    assert list(prefetcher._pages) == ["b", "c"]
+    assert stats["bytes"] == 200 and stats["wasted"] == 1
+    prefetcher.close()
+
+
+def test_expired_pages_are_fetched_again(pages):
+    prefetcher = Prefetcher(pages, ttl=0.05)
+    prefetcher.prefetch(["https://a"])
+    settle(prefetcher)
+    time.sleep(0.1)
+    assert prefetcher.get("https://a") == "a" * 100
+    assert pages.calls["https://a"] == 2
+    assert prefetcher.stats()["wasted"] == 1
+    # An expired page is prefetched again rather than skipped as cached.
+    time.sleep(0.1)
+    assert prefetcher.prefetch(["https://a"]) == 1
+    prefetcher.close()
+
+
+def test_failed_prefetch_is_retried_by_the_read():
+    pages = Pages(failing={"https://a"})
+    prefetcher = Prefetcher(pages)
+    prefetcher.prefetch(["https://a"])
+    settle(prefetcher)
+    assert prefetcher.stats()["errors"] == 1
+    pages.failing.clear()
+    assert prefetcher.get("https://a") == "a" * 100
+    assert pages.calls["https://a"] == 2
+    prefetcher.close()
+
+
+def test_result_urls_and_keys():
+    results = [{"url": "https://a/"}, {"link": "http://b"}, {"title": "no url"}, "ftp://c", "https://d"]
+    assert result_urls(results) == ["https://a/", "http://b", "https://d"]
+    assert page_key("https://a/") == page_key("http://a") == "a"
@@ -0,0 +1,129 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import openai
+
+from coral_runtime.ratelimit import (BACKGROUND, INTERACTIVE, AsyncRateLimitedTransport, RateLimitedTransport,
+                                     RateLimiter, rate_limited_model)
+
+
+def test_loops_and_threads_share_one_budget():
+    limiter = RateLimiter(rpm=1200, burst_seconds=0.05)  # 20 per second, one at a time
+    granted = []
+
+    async def calls(n):
+        for _ in range(n):
+            await limiter.acquire()
+            granted.append(time.monotonic())
+
+    def sync_calls(n):
+        for _ in range(n):
+            limiter.acquire_sync()
+            granted.append(time.monotonic())
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=asyncio.run, args=(calls(4),)) for _ in range(2)]
+    threads += [threading.Thread(target=sync_calls, args=(4,)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert len(granted) == 16 and limiter.requests == 16
+    # The first call spends the burst; the other 15 come at 20 per second.
+    assert time.monotonic() - started >= 15 / 20 * 0.9
+    assert limiter.stats()["queued"] == 0
+
+
+def test_sync_and_async_callers_share_the_priority_queue():
+    limiter = RateLimiter(rpm=6000, burst_seconds=0.01)
+    limiter._paused_until = limiter.clock() + 0.3  # as after a 429
+    order = []
+
+    def background(i):
+        limiter.acquire_sync(priority=BACKGROUND)
+        order.append(f"sync-{i}")
+
+    async def interactive():
+        await asyncio.sleep(0.1)  # queue behind the background callers
+        await limiter.acquire(priority=INTERACTIVE)
+        order.append("interactive")
+
+    threads = [threading.Thread(target=background, args=(i,)) for i in range(3)]
+    threads.append(threading.Thread(target=asyncio.run, args=(interactive(),)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert order[0] == "interactive"
+    assert sorted(order[1:]) == ["sync-0", "sync-1", "sync-2"]
+
+
+def test_cancelled_waiters_leave_the_queue():
+    async def main():
+        limiter = RateLimiter(rpm=6000, burst_seconds=0.01)
+        limiter._paused_until = limiter.clock() + 0.2
+        waiters = [asyncio.create_task(limiter.acquire()) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        waiters[0].cancel()
+        await asyncio.wait_for(asyncio.gather(*waiters[1:]), 5)
+        return limiter
+
+    limiter = asyncio.run(main())
+    assert limiter.requests == 2 and limiter.stats()["queued"] == 0
+
+
+def throttled(calls):
+    def handle(request):
+        calls.append(request)
+        return httpx.Response(429, headers={"retry-after-ms": "1"}, json={"error": {"message": "slow down"}})
+    return httpx.MockTransport(handle)
+
+
+def test_sdk_does_not_retry_429s_the_transport_gave_up_on():
+    calls = []
+    transport = RateLimitedTransport(RateLimiter(), throttled(calls), max_retries=2)
+    client = openai.OpenAI(api_key="fake", base_url="http://model.test/v1", max_retries=3,
+                           http_client=httpx.Client(transport=transport))
+    try:
+        client.chat.completions.create(model="m", messages=[{"role": "user", "content": "hi"}])
+    except openai.RateLimitError:
+        pass
+    # The transport's 1 + 2 attempts, not (1 + 2) * (1 + 3).
+    assert len(calls) == 3
+
+
+def test_async_transport_marks_its_last_429():
+    async def main():
+        calls = []
+        transport = AsyncRateLimitedTransport(RateLimiter(), throttled(calls), max_retries=1)
+        async with httpx.AsyncClient(transport=transport) as client:
+            response = await client.post("http://model.test/v1/chat/completions", json={})
+        return calls, response
+
+    calls, response = asyncio.run(main())
+    assert len(calls) == 2
+    assert response.status_code == 429 and response.headers["x-should-retry"] == "false"
+
+
+def test_camel_models_go_through_the_limiter_without_sdk_retries():
+    from camel.models import ModelFactory
+    from camel.types import ModelPlatformType, ModelType
+
+    async def main():
+        calls = []
+        limiter = RateLimiter()
+        model = ModelFactory.create(model_platform=ModelPlatformType.OPENAI, model_type=ModelType.GPT_4O_MINI,
+                                    api_key="fake", url="http://model.test/v1")
+        rate_limited_model(model, limiter)
+        model._async_client._client._transport.transport = throttled(calls)
+        try:
+            await model._async_client.chat.completions.create(model="m", messages=[{"role": "user", "content": "hi"}])
+        except openai.RateLimitError:
+            pass
+        return calls, limiter
+
+    calls, limiter = asyncio.run(main())
+    # The transport's 1 + 5 attempts, each one granted by the shared limiter.
+    assert len(calls) == 6 and limiter.requests == 6
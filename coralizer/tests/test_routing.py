@@ -0,0 +1,63 @@
+import pytest
+
+from coral_runtime.routing import RoutingIndex, describe_route
+
+AGENTS = {
+    "world_news_agent": "You are world_news_agent, responsible for fetching and generating news topics based on mentions "
+                        "from other agents",
+    "firecrawl": "You are an firecrawl agent capable of scraping, crawling, and extracting data from web pages and URLs, "
+                 "as well as performing deep research and generating structured data for analysis.",
+    "user_interaction_agent": "You are user_interaction_agent, responsible for engaging with users, processing "
+                              "instructions, and coordinating with other agents",
+}
+
+
+@pytest.fixture
+def index():
+    index = RoutingIndex()
+    index.sync(AGENTS)
+    return index
+
+
+@pytest.mark.parametrize("query, agent_id", [
+    ("tell me the news", "world_news_agent"),
+    ("latest news", "world_news_agent"),
+    ("Scrape https://coralprotocol.org and summarise the page", "firecrawl"),
+    ("crawl the docs site and extract every code sample", "firecrawl"),
+    ("scrape this page for me", "firecrawl"),
+])
+def test_routes_clear_requests(index, query, agent_id):
+    route = index.route(query)
+    assert route is not None and route.agent_id == agent_id
+    assert "Suggested agent: " + agent_id in describe_route(route)
+
+
+@pytest.mark.parametrize("query", [
+    "hi, what topics can you help with",
+    "hello",
+    "thanks!",
+    "ok, bye",
+])
+def test_small_talk_is_not_routed(index, query):
+    assert index.route(query) is None
+
+
+@pytest.mark.parametrize("query", [
+    "What is the integral of x squared? do some research",
+    "book me a flight to Lisbon",
+    "generate a poem about the sea",
+    "what's the weather in Paris",
+    "",
+])
+def test_requests_no_agent_covers_are_not_routed(index, query):
+    assert index.route(query) is None
+    assert describe_route(index.route(query)) == ""
+
+
+def test_one_incidental_word_in_a_long_request_is_not_a_route(index):
+    query = "What's the latest news on climate change?"
+    assert index.rank(query)[0][0] == "world_news_agent"
+    assert index.matched(query, "world_news_agent") == (1, 4)
+    assert index.route(query) is None
+    index.min_coverage = 0.25
+    assert index.route(query).agent_id == "world_news_agent"
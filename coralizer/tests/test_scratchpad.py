@@ -0,0 +1,64 @@
+import pytest
+
+from coral_runtime.payloads import PayloadStore, parse_ref
+from coral_runtime.scratchpad import ScratchpadCompactor
+
+
+def page(word, words=1500):
+    return " ".join(f"{word}{i}" for i in range(words))
+
+
+@pytest.fixture
+def compactor(tmp_path):
+    return ScratchpadCompactor(PayloadStore(str(tmp_path / "store")), budget=0, keep_recent=2, preview_chars=50)
+
+
+def test_under_budget_steps_are_left_alone(compactor):
+    steps = [("search", page("a")), ("scrape", page("b"))]
+    compactor.budget = sum(compactor.tokens(text) for _, text in steps)
+    assert compactor(steps) is steps
+    assert compactor.compacted == 0
+
+
+def test_recent_steps_are_kept_and_old_observations_digested(compactor):
+    steps = [(f"step{i}", page(word)) for i, word in enumerate("abcd")]
+    sizes = [compactor.tokens(text) for _, text in steps]
+    # Room for the two newest pages and a little more: both older ones must go.
+    compactor.budget = sizes[2] + sizes[3] + sizes[0] // 2
+    compacted = compactor(steps)
+    assert compacted[2:] == steps[2:]
+    for (action, digest), (original_action, original) in zip(compacted[:2], steps[:2]):
+        assert action == original_action
+        assert digest.startswith(original[:40]) and len(digest) < len(original) // 10
+        ref = "payload:sha256:" + parse_ref(digest)
+        assert compactor.store.read(ref).decode() == original
+    assert compactor.compacted == 2
+    assert sum(compactor.tokens(text) for _, text in compacted) <= compactor.budget
+
+
+def test_compaction_stops_once_under_budget(compactor):
+    steps = [(f"step{i}", page(word)) for i, word in enumerate("abcd")]
+    sizes = [compactor.tokens(text) for _, text in steps]
+    compactor.budget = sum(sizes) - sizes[0] // 2
+    compacted = compactor(steps)
+    assert compacted[0][1] != steps[0][1]
+    assert compacted[1:] == steps[1:]
+
+
+def test_small_observations_and_stubs_are_not_compacted(compactor):
+    stub = compactor.store.offload(page("s", 3000))
+    assert parse_ref(stub)
+    steps = [("small", "ok"), ("stub", stub), ("recent", page("r")), ("latest", page("l"))]
+    compactor.budget = 1
+    assert compactor(steps) == steps
+
+
+def test_digests_are_stored_once_per_observation(compactor):
+    steps = [(f"step{i}", page(word)) for i, word in enumerate("abc")]
+    compactor.budget = compactor.tokens(steps[2][1]) + 100
+    first = compactor(steps)
+    stored, saved = compactor.store.stored, compactor.tokens_saved
+    # The next model call sends the same steps again.
+    assert compactor(steps) == first
+    assert compactor.store.stored == stored == 1
+    assert compactor.tokens_saved == 2 * saved
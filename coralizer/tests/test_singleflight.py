@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from coral_runtime.singleflight import SingleFlight, call_key, coalesced
+
+
+def test_concurrent_callers_share_one_call():
+    group = SingleFlight()
+    calls = []
+
+    async def search(query):
+        calls.append(query)
+        await asyncio.sleep(0.05)
+        return f"results for {query}"
+
+    async def main():
+        once = coalesced(search, group)
+        return await asyncio.gather(*(once("news") for _ in range(5)), once("weather"))
+
+    results = asyncio.run(main())
+    assert results == ["results for news"] * 5 + ["results for weather"]
+    assert sorted(calls) == ["news", "weather"]
+    assert group.stats() == {"calls": 6, "upstream": 2, "shared": 4}
+    # Nothing is kept: the next call goes upstream again.
+    asyncio.run(coalesced(search, group)("news"))
+    assert calls.count("news") == 2
+
+
+def test_callers_share_the_error():
+    group = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.02)
+        raise ValueError("upstream down")
+
+    async def main():
+        return await asyncio.gather(*(group.run("key", fail) for _ in range(3)), return_exceptions=True)
+
+    errors = asyncio.run(main())
+    assert all(isinstance(error, ValueError) for error in errors)
+    assert group.stats()["upstream"] == 1
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    group = SingleFlight()
+    finished = []
+
+    async def scrape():
+        await asyncio.sleep(0.05)
+        finished.append(True)
+        return "page"
+
+    async def main():
+        first = asyncio.create_task(group.run("page", scrape))
+        second = asyncio.create_task(group.run("page", scrape))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "page"
+    assert finished == [True]
+
+
+def test_threads_share_one_call():
+    group = SingleFlight()
+    calls, results = [], []
+    started = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        time.sleep(0.05)
+        return "page"
+
+    def leader():
+        results.append(group.run_sync("page", fetch))
+
+    def follower():
+        started.wait()
+        results.append(group.run_sync("page", fetch))
+
+    threads = [threading.Thread(target=leader)] + [threading.Thread(target=follower) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["page"] * 4 and len(calls) == 1
+    assert group.stats() == {"calls": 4, "upstream": 1, "shared": 3}
+
+
+def test_call_key_ignores_keyword_order():
+    assert call_key("search", query="a", limit=3) == call_key("search", limit=3, query="a")
+    assert call_key("search", "a") != call_key("scrape", "a")
@@ -1,8 +1,13 @@
-import pydantic, traceback, json
-from typing import Literal, Optional
+import pydantic, traceback, json, os, sys
+from typing import List, Literal, Optional
 from langchain_openai import ChatOpenAI
 from langchain_mcp_adapters.client import MultiServerMCPClient
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from coral_runtime.ratelimit import rate_limited_client
+from coral_runtime.schema import get_tools_description
+from coral_runtime.singleflight import default_group
+
 class AgentGenerator:
 
     def __init__(
@@ -11,24 +16,28 @@ class AgentGenerator:
                 mcp_server_url: pydantic.HttpUrl,
                 timeout: int = 5,
                 read_timeout: int = 1200,
-                mcp_connection_type: Literal["sse", "stdio"] = "sse"
+                mcp_connection_type: Literal["sse", "stdio"] = "sse",
+                mcp_command: Optional[List[str]] = None
     ):
         self.agent_name = agent_name
         self.mcp_server_url = mcp_server_url
         self.mcp_connection_type = mcp_connection_type
+        self.mcp_command = mcp_command or []
         self.client: Optional[MultiServerMCPClient] = None
         self.session = None
         self.timeout = timeout
         self.read_timeout = read_timeout
     
     def get_tools_description(self):
-        tools = self.client.get_tools()
-        return "\n".join(
-            f"Tool: {tool.name}, Schema: {json.dumps(tool.args).replace('{', '{{').replace('}', '}}')}"
-            for tool in tools
-        )
+        return get_tools_description(self.client.get_tools(), mode="compact", escape_braces=False)
 
     def get_mcp_description(self, agent_name):
+        # Coralizing the same server from several threads at once asks the model only once.
+        server = self.mcp_server_url if self.mcp_connection_type == "sse" else " ".join(self.mcp_command)
+        return default_group.run_sync(("mcp_description", agent_name, str(server)),
+                                      lambda: self._describe(agent_name))
+
+    def _describe(self, agent_name):
         formatted_tools = self.get_tools_description()
         system_prompt = (
             "You are an AI system tasked with summarizing the purpose and capabilities of an agent, "
@@ -44,7 +53,8 @@ class AgentGenerator:
         openai_helper = ChatOpenAI(
             model="gpt-4o-mini",
             temperature=0,
-            response_format={"type": "json_object"}
+            response_format={"type": "json_object"},
+            http_client=rate_limited_client()
         )
 
         response = openai_helper.invoke(system_prompt)
@@ -55,11 +65,15 @@ class AgentGenerator:
 
 
 
+    def connection_config(self):
+        if self.mcp_connection_type == "stdio":
+            # The server inherits our environment so API keys such as FIRECRAWL_API_KEY reach it.
+            return {"transport": "stdio", "command": self.mcp_command[0], "args": self.mcp_command[1:], "env": dict(os.environ)}
+        return {"transport": "sse", "url": self.mcp_server_url, "timeout": self.timeout, "sse_read_timeout": self.read_timeout}
+
     async def mcp_connection(self):
         try:
-            async with MultiServerMCPClient(connections={
-                "mcp": {"transport": self.mcp_connection_type, "url": self.mcp_server_url, "timeout": self.timeout, "sse_read_timeout": self.read_timeout}
-            }) as self.client:
+            async with MultiServerMCPClient(connections={"mcp": self.connection_config()}) as self.client:
                 self.session = self.client.sessions
                 print(f"Connected to MCP session for agent: {self.agent_name}")
                 return True
@@ -1,14 +1,46 @@
 import os
+import sys
+import json
+import shlex
 import asyncio
 import traceback
+
+# coral_runtime lives one directory up; this script runs from utils/ (or as python utils/coralizer.py).
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from agent_generator import AgentGenerator
+from coral_runtime.agent import AgentDefinition
+
+FLEET_FILE = "coral_agents.json"
+
+def add_to_fleet(definition: AgentDefinition, path: str = FLEET_FILE):
+    """Add or replace the agent in the fleet file run by `python -m coral_runtime.host`."""
+    fleet = []
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            fleet = json.load(f)
+    fleet = [entry for entry in fleet if entry.get("agentId") != definition.agent_id]
+    fleet.append(definition.to_dict())
+    with open(path, "w") as f:
+        json.dump(fleet, f, indent=2)
+
+def render_agent_file(base_code: str, agent_name: str, agent_description: str, mcp_server_url: str = "",
+                      mcp_transport: str = "sse", mcp_command: list = None) -> str:
+    """Fill the `base_coralizer.py` template in for one agent."""
+    base_code = base_code.replace('"agentId": "",', f'"agentId": "{agent_name}",')
+    base_code = base_code.replace("MCP_SERVER_URL = ''", f"MCP_SERVER_URL = '{mcp_server_url}'")
+    base_code = base_code.replace("MCP_TRANSPORT = 'sse'", f"MCP_TRANSPORT = '{mcp_transport}'")
+    base_code = base_code.replace("MCP_COMMAND = []", f"MCP_COMMAND = {json.dumps(mcp_command or [])}")
+    base_code = base_code.replace('"agentDescription": ""', f'"agentDescription": {json.dumps(agent_description)}')
+    return base_code
 
-async def create_agent_file(agent_name: str, mcp_server_url: str):
+async def create_agent_file(agent_name: str, mcp_server_url: str = "", mcp_transport: str = "sse", mcp_command: list = None):
+    mcp_command = mcp_command or []
     try:
         coralizer = AgentGenerator(
             agent_name=agent_name,
             mcp_server_url=mcp_server_url,
-            mcp_connection_type="sse"
+            mcp_connection_type=mcp_transport,
+            mcp_command=mcp_command
         )
         connection = await coralizer.mcp_connection()
         if not connection:
@@ -18,12 +50,8 @@ async def create_agent_file(agent_name: str, mcp_server_url: str):
 
         # Read base template
         with open('utils/base_coralizer.py', 'r') as py_file:
-            base_code = py_file.read()
-
-        # Customize the template
-        base_code = base_code.replace('"agentId": "",', f'"agentId": "{agent_name}",')
-        base_code = base_code.replace("MCP_SERVER_URL = ''", f"MCP_SERVER_URL = '{mcp_server_url}'")
-        base_code = base_code.replace('"agentDescription": ""', f'"agentDescription": "{agent_description}"')
+            base_code = render_agent_file(py_file.read(), agent_name, agent_description,
+                                          mcp_server_url, mcp_transport, mcp_command)
 
         # Write agent file
         filename = f"{agent_name.lower()}_coral_agent.py"
@@ -31,6 +59,15 @@ async def create_agent_file(agent_name: str, mcp_server_url: str):
             f.write(base_code)
         print(f"File '{filename}' created successfully.")
 
+        add_to_fleet(AgentDefinition(
+            agent_id=agent_name,
+            agent_description=agent_description,
+            mcp_server_url=mcp_server_url,
+            mcp_transport=mcp_transport,
+            mcp_command=mcp_command,
+        ))
+        print(f"Agent '{agent_name}' added to '{FLEET_FILE}'.")
+
     except Exception as e:
         print(f'Error coralizing the agent: {str(e)}')
         print(traceback.format_exc())
@@ -38,5 +75,10 @@ async def create_agent_file(agent_name: str, mcp_server_url: str):
 
 if __name__ == "__main__":
     agent_name = input("Enter the agent name: ").strip()
-    mcp_server_url = input("Enter the MCP server URL: ").strip()
-    asyncio.run(create_agent_file(agent_name, mcp_server_url))
\ No newline at end of file
+    mcp_transport = input("Enter the MCP transport (sse/stdio) [sse]: ").strip().lower() or "sse"
+    if mcp_transport == "stdio":
+        mcp_command = shlex.split(input("Enter the command that starts the MCP server: ").strip())
+        asyncio.run(create_agent_file(agent_name, mcp_transport="stdio", mcp_command=mcp_command))
+    else:
+        mcp_server_url = input("Enter the MCP server URL: ").strip()
+        asyncio.run(create_agent_file(agent_name, mcp_server_url))
\ No newline at end of file
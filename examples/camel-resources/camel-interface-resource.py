@@ -1,8 +1,9 @@
 import asyncio
+import logging
 import os
-import json
+import sys
 from camel.toolkits.mcp_toolkit import MCPClient
-from camel.toolkits import HumanToolkit, MCPToolkit 
+from camel.toolkits import FunctionTool, MCPToolkit
 from camel.models import ModelFactory
 from camel.types import ModelPlatformType, ModelType
 from camel.agents import ChatAgent
@@ -12,18 +13,19 @@ from mcp import ClientSession
 from mcp.types import BlobResourceContents, ResourceContents, TextResourceContents
 from typing import Union, Optional, List
 
-async def get_tools_description(tools):
-    descriptions = []
-    for tool in tools:
-        tool_name = getattr(tool.func, '__name__', 'unknown_tool')
-        schema = tool.get_openai_function_schema() or {}
-        arg_names = list(schema.get('parameters', {}).get('properties', {}).keys()) if schema else []
-        description = tool.get_function_description() or 'No description'
-        schema_str = json.dumps(schema, default=str).replace('{', '{{').replace('}', '}}')
-        descriptions.append(
-            f"Tool: {tool_name}, Args: {arg_names}, Description: {description}, Schema: {schema_str}"
-        )
-    return "\n".join(descriptions)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "coralizer"))
+from coral_runtime.directory import AgentDirectory
+from coral_runtime.human import HumanChannel, MentionRouter, human_channel_from_env, serve_sessions
+from coral_runtime.logs import configure_logging, set_log_agent
+from coral_runtime.metrics import invocation, metrics_from_env, timed_camel_tools, timed_model, watch_loop_lag
+from coral_runtime.ratelimit import rate_limited_model
+from coral_runtime.routing import AgentRouter
+from coral_runtime.schema import get_tools_description, schema_mode_from_env, log_savings
+
+logger = logging.getLogger(__name__)
+
+# Tools are bound to the ChatAgent natively, so by default the prompt only names them.
+SCHEMA_MODE = schema_mode_from_env()
 
 class SimpleBlob:
     """A simple class to hold resource data, MIME type, and metadata."""
@@ -78,7 +80,7 @@ async def load_mcp_resources(
             resource_blobs = await get_mcp_resource(session, uri)
             blobs.extend(resource_blobs)
         except Exception as e:
-            print(f"Error fetching resource {uri}: {e}")
+            logger.warning(f"Error fetching resource {uri}: {e}")
             continue
     return blobs
 
@@ -102,6 +104,33 @@ async def get_resources(
     except Exception as e:
         raise RuntimeError(f"Error fetching resources: {e}")
 
+def directory_tools(directory: AgentDirectory, channel: HumanChannel) -> List[FunctionTool]:
+    router = AgentRouter(directory)
+
+    async def ask_human(question: str) -> str:
+        r"""Ask the human a question and wait for their answer.
+
+        Args:
+            question (str): The question to ask the human.
+
+        Returns:
+            str: The human's answer, followed by a "Suggested agent:" line when
+                an agent clearly matches the request, or else by the connected
+                agents and their descriptions.
+        """
+        return router.annotate(await channel.ask(question))
+
+    def agent_directory() -> str:
+        r"""Return the connected agents and their descriptions from the local
+        cache, with how old it is. Instant; use it instead of list_agents.
+
+        Returns:
+            str: One line per agent with its ID and description.
+        """
+        return directory.render()
+
+    return [FunctionTool(ask_human), FunctionTool(agent_directory)]
+
 async def main():
     base_url_1 = "http://localhost:5555/devmode/exampleApplication/privkey/session1/sse"
     params_1 = {
@@ -111,87 +140,92 @@ async def main():
     }
     query_string = urllib.parse.urlencode(params_1)
     MCP_SERVER_URL_1 = f"{base_url_1}?{query_string}"
+    configure_logging()
+    set_log_agent(params_1["agentId"])
+    metrics_from_env(params_1["agentId"])
+    watch_loop_lag()
     
-    coral_server = MCPClient(
-        command_or_url=MCP_SERVER_URL_1,
-        timeout=300.0
-    )
-    await coral_server.__aenter__()
-    print(f"Connected to MCP server as user_interface_agent at {MCP_SERVER_URL_1}")
-
     model = ModelFactory.create(
         model_platform=ModelPlatformType.OPENAI,
         model_type=ModelType.GPT_4O_MINI,
         api_key=os.getenv("OPENAI_API_KEY"),
         model_config_dict={"temperature": 0.3, "max_tokens": 16000},
     )
-
-    while True:
-        try:
-            resources = await get_resources(coral_server, uris=None)
-            if not resources:
+    timed_model(rate_limited_model(model))
+    channel = human_channel_from_env()
+
+    # Polled in the background; the agent reads it through local tools instead of list_agents.
+    # Sessions share one agentId, so their wait_for_mentions calls go through one reader.
+    # Each context is closed on the way out, whether or not serving the sessions raised.
+    async with MCPClient(command_or_url=MCP_SERVER_URL_1, timeout=300.0) as coral_server, \
+            AgentDirectory(coral_server.session, self_id=params_1["agentId"]) as directory, channel, \
+            MentionRouter(coral_server.session, channel) as mentions:
+        logger.info(f"Connected to MCP server as user_interface_agent at {MCP_SERVER_URL_1}")
+        local_tools = directory_tools(directory, channel)
+
+        async def converse(session_id):
+            try:
+                resources = await get_resources(coral_server, uris=None)
+                if not resources:
+                    agent_resources = "NA"
+                    logger.info("No resources found.")
+                else:
+                    agent_resources = "\n".join(str(blob.data) for blob in resources)
+                    logger.info(f"Resources fetched: {len(resources)}")
+            except Exception as e:
+                logger.warning(f"Error retrieving resources: {e}")
                 agent_resources = "NA"
-                print("No resources found.")
-            else:
-                agent_resources = "\n".join(str(blob.data) for blob in resources)
-                print("Resources fetched:")
-                # for blob in resources:
-                #     print(blob.data)
-        except Exception as e:
-            print(f"Error retrieving resources: {e}")
-            agent_resources = "NA"
-
-        resource_sys_message = agent_resources
-
-        mcp_toolkit = MCPToolkit([coral_server])
-        tools = mcp_toolkit.get_tools() + HumanToolkit().get_tools()
-        tools_description = await get_tools_description(tools)
-
-        sys_msg = (
-            f"""You are an agent interacting with the tools from Coral Server and having your own Human Tool to ask have a conversation with Human.
-            Your resources, provided in `resource_sys_message`, contain thread-based conversations between agents in XML format. 
-            Each thread includes details such as thread ID, participant agent IDs, message content, and timestamps. 
-            Use these resources to understand past agent interactions and inform your decisions when coordinating with other agents or responding to user queries.
-
-            Follow these steps in order:
-            1. Use `list_agents` to list all connected agents and get their descriptions.
-            2. Use `ask_human_via_console` to ask, "How can I assist you today?" and capture expect response.
-            3. Take 2 seconds to think and understand the user's intent and decide the right agent to handle the request based on list of agents. 
-            4. If the user wants any information about the coral server, use the tools to get the information and pass it to the user. Do not send any message to any other agent, just give the information and go to Step 1.
-            5. Once you have the right agent, use `create_thread` to create a thread with the selected agent. If no agent is available, use the `ask_human` tool to specify the agent you want to use.
-            6. Use your logic to determine the task you want that agent to perform and create a message for them which instructs the agent to perform the task called "instruction". 
-            7. Use `send_message` to send a message in the thread, mentioning the selected agent, with content: "instructions".
-            8. Use `wait_for_mentions` with a 30 seconds timeout to wait for a response from the agent you mentioned.
-            9. Show the entire conversation in the thread to the user.
-            10. Wait for 3 seconds and then use `ask_human` to ask the user if they need anything else and keep waiting for their response.
-            11. If the user asks for something else, repeat the process from step 1.
-
-            Use only listed tools: {tools_description}
-            Your resources are: {resource_sys_message}"""
-        )
-
-        camel_agent = ChatAgent(
-            system_message=sys_msg,
-            model=model,
-            tools=tools,
-        )
-        print("ChatAgent initialized with updated resources!")
-        print("Resource System Message before agent question:")
-        print(resource_sys_message)
-
-        prompt = "As the user_interaction_agent on the Coral Server, initiate your workflow by listing all connected agents and asking the user how you can assist them."
-        try:
-            response = await camel_agent.astep(prompt)
-            print("Agent Reply:")
-            print(response.msgs[0].content)
-        except Exception as e:
-            print(f"Error processing agent response: {e}")
-
-        await asyncio.sleep(3)
-
-        continue
 
-    await coral_server.__aexit__(None, None, None)
+            resource_sys_message = agent_resources
+
+            mcp_toolkit = MCPToolkit([coral_server])
+            tools = timed_camel_tools(mentions.camel_tools(mcp_toolkit.get_tools()) + local_tools, mentions=False)
+            tools_description = get_tools_description(tools, mode=SCHEMA_MODE, escape_braces=False)
+            log_savings("user_interface_agent", tools)
+
+            sys_msg = (
+                f"""You are an agent interacting with the tools from Coral Server and having your own Human Tool to ask have a conversation with Human.
+                Your resources, provided in `resource_sys_message`, contain thread-based conversations between agents in XML format. 
+                Each thread includes details such as thread ID, participant agent IDs, message content, and timestamps. 
+                Use these resources to understand past agent interactions and inform your decisions when coordinating with other agents or responding to user queries.
+
+                Follow these steps in order:
+                1. Use `ask_human` to ask, "How can I assist you today?" and capture expect response.
+                2. If the response ends with a "Suggested agent:" line, that agent was already matched to the request: select it and go to step 4. Otherwise the response ends with the connected agents and their descriptions (`agent_directory` returns them again at any time).
+                3. Take 2 seconds to think and understand the user's intent and decide the right agent to handle the request based on list of agents. 
+                4. If the user wants any information about the coral server, use the tools to get the information and pass it to the user. Do not send any message to any other agent, just give the information and go to Step 1.
+                5. Once you have the right agent, use `create_thread` to create a thread with the selected agent. If no agent is available, use the `ask_human` tool to specify the agent you want to use.
+                6. Use your logic to determine the task you want that agent to perform and create a message for them which instructs the agent to perform the task called "instruction". 
+                7. Use `send_message` to send a message in the thread, mentioning the selected agent, with content: "instructions".
+                8. Use `wait_for_mentions` with a 30 seconds timeout to wait for a response from the agent you mentioned.
+                9. Show the entire conversation in the thread to the user.
+                10. Wait for 3 seconds and then use `ask_human` to ask the user if they need anything else and keep waiting for their response.
+                11. If the user asks for something else, repeat the process from step 1.
+
+                Use only listed tools: {tools_description}
+                Your resources are: {resource_sys_message}"""
+            )
+
+            camel_agent = ChatAgent(
+                system_message=sys_msg,
+                model=model,
+                tools=tools,
+            )
+            logger.info("ChatAgent initialized with updated resources!")
+            logger.debug(f"Resource system message: {resource_sys_message}", extra={"event": "resources"})
+
+            prompt = "As the user_interaction_agent on the Coral Server, initiate your workflow by asking the user how you can assist them."
+            try:
+                with invocation(params_1["agentId"]):
+                    response = await camel_agent.astep(prompt)
+                logger.info(f"Agent reply: {response.msgs[0].content}", extra={"event": "agent_reply"})
+            except Exception as e:
+                logger.exception(f"Error processing agent response: {e}")
+
+            await asyncio.sleep(3)
+
+        # One conversation per user session (CORAL_HUMAN_CHANNEL=web serves many at once).
+        await serve_sessions(channel, converse)
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -13,5 +13,6 @@ MODEL_CONFIG = {
 }
 
 # Agent Settings
-MESSAGE_WINDOW_SIZE = 4096 * 50
+# Memory is bounded by tokens: history plus a summary of evicted turns stays under the budget.
+MEMORY_TOKEN_BUDGET = 8000
 TOKEN_LIMIT = 20000 
\ No newline at end of file
@@ -1,21 +1,36 @@
 import asyncio  # Manages asynchronous operations
+import logging
 import os  # Provide interaction with the operating system.
+import sys
 from time import sleep
 
 from camel.agents import ChatAgent  # creates Agents
 from camel.models import ModelFactory  # encapsulates LLM
-from camel.toolkits import HumanToolkit, MCPToolkit  # import tools
+from camel.toolkits import FunctionTool, MCPToolkit  # import tools
 from camel.toolkits.mcp_toolkit import MCPClient
 from camel.types import ModelPlatformType, ModelType
 from dotenv import load_dotenv
 
-from config import PLATFORM_TYPE, MODEL_TYPE, MODEL_CONFIG, MESSAGE_WINDOW_SIZE, TOKEN_LIMIT
+from config import PLATFORM_TYPE, MODEL_TYPE, MODEL_CONFIG, MEMORY_TOKEN_BUDGET, TOKEN_LIMIT
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "coralizer"))
+from coral_runtime.camel_memory import TokenBoundedMemory
+from coral_runtime.logs import configure_logging, set_log_agent
+from coral_runtime.metrics import invocation, metrics_from_env, timed_camel_tools, timed_model, watch_loop_lag
+from coral_runtime.payloads import camel_fetch_payload, payload_store_from_env
+from coral_runtime.ratelimit import rate_limited_model
+
+logger = logging.getLogger(__name__)
 
 # load_dotenv()
 
 from prompts import get_tools_description, get_user_message
 
 async def main():
+    configure_logging()
+    set_log_agent("user_interaction_agent")
+    metrics_from_env("user_interaction_agent")
+    watch_loop_lag()
     # Simply add the Coral server address as a tool
     coral_url = os.getenv("CORAL_CONNECTION_URL", default = "http://localhost:5555/devmode/exampleApplication/privkey/session1/sse?waitForAgents=3&agentId=user_interaction_agent")
     server = MCPClient(coral_url, timeout=300.0)
@@ -23,19 +38,23 @@ async def main():
     mcp_toolkit = MCPToolkit([server])
 
     async with mcp_toolkit.connection() as connected_mcp_toolkit:
-        print("Connected to coral server.")
+        logger.info("Connected to coral server.")
         camel_agent = await create_interface_agent(connected_mcp_toolkit)
 
         # Step the agent continuously
         for i in range(20):  #This should be infinite, but for testing we limit it to 20 to avoid accidental API fees
-            resp = await camel_agent.astep(get_user_message())
+            with invocation("user_interaction_agent"):
+                resp = await camel_agent.astep(get_user_message())
             msgzero = resp.msgs[0]
-            msgzerojson = msgzero.to_dict()
-            print(msgzerojson)
+            logger.info(f"user_interaction_agent: {msgzero.content}", extra={"event": "agent_reply", "reply": msgzero.to_dict()})
             sleep(10)
 
 async def create_interface_agent(connected_mcp_toolkit):
     tools = connected_mcp_toolkit.get_tools()
+    payloads = payload_store_from_env()
+    if payloads is not None:
+        # Worker answers may arrive as a preview plus a payload reference.
+        tools.append(FunctionTool(camel_fetch_payload(payloads)))
     sys_msg = (
         f"""
             You are a helpful assistant responsible for interacting with the user and working with other agents to meet the user's requests. You can interact with other agents using the chat tools.
@@ -63,10 +82,10 @@ async def create_interface_agent(connected_mcp_toolkit):
     )
     camel_agent = ChatAgent(  # create agent with our mcp tools
         system_message=sys_msg,
-        model=model,
-        tools=tools,
-        message_window_size=MESSAGE_WINDOW_SIZE,
-        token_limit=TOKEN_LIMIT
+        model=timed_model(rate_limited_model(model)),
+        # Mentions here are worker replies to this agent's own requests, not work to answer.
+        tools=timed_camel_tools(tools, mentions=False),
+        memory=TokenBoundedMemory.for_model(model, token_budget=MEMORY_TOKEN_BUDGET, token_limit=TOKEN_LIMIT),
     )
     camel_agent.reset()
     camel_agent.memory.clear()
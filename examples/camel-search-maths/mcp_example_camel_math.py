@@ -1,35 +1,52 @@
 import asyncio
+import logging
 import os
+import sys
 from time import sleep
 
 from camel.agents import ChatAgent
 from camel.models import ModelFactory
-from camel.toolkits import MCPToolkit, MathToolkit
+from camel.toolkits import FunctionTool, MCPToolkit, MathToolkit
 from camel.toolkits.mcp_toolkit import MCPClient
 from camel.types import ModelPlatformType, ModelType
 from prompts import get_tools_description, get_user_message
 from dotenv import load_dotenv
-from config import PLATFORM_TYPE, MODEL_TYPE, MODEL_CONFIG, MESSAGE_WINDOW_SIZE, TOKEN_LIMIT
+from config import PLATFORM_TYPE, MODEL_TYPE, MODEL_CONFIG, MEMORY_TOKEN_BUDGET, TOKEN_LIMIT
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "coralizer"))
+from coral_runtime.camel_memory import TokenBoundedMemory
+from coral_runtime.cpu_pool import async_tool
+from coral_runtime.logs import configure_logging, set_log_agent
+from coral_runtime.metrics import invocation, metrics_from_env, timed_camel_tools, timed_model, watch_loop_lag
+from coral_runtime.ratelimit import rate_limited_model
+
+logger = logging.getLogger(__name__)
 
 # load_dotenv()
 
 async def main():
+    configure_logging()
+    set_log_agent("math_agent")
+    metrics_from_env("math_agent")
+    watch_loop_lag()
     # Simply add the Coral server address as a tool
-    print("Starting MCP client...")
+    logger.info("Starting MCP client...")
     coral_url = os.getenv("CORAL_CONNECTION_URL", default = "http://localhost:5555/devmode/exampleApplication/privkey/session1/sse?agentId=math_agent")
     server = MCPClient(coral_url, timeout=300.0)
     mcp_toolkit = MCPToolkit([server])
 
     async with mcp_toolkit.connection() as connected_mcp_toolkit:
-        tools = connected_mcp_toolkit.get_tools() + MathToolkit().get_tools()
+        # Off the event loop that holds the Coral connection.
+        math_tools = [FunctionTool(async_tool(tool.func)) for tool in MathToolkit().get_tools()]
+        tools = connected_mcp_toolkit.get_tools() + math_tools
         camel_agent = await create_math_agent(tools)
 
         # Step the agent continuously
         for i in range(20):  #This should be infinite, but for testing we limit it to 20 to avoid accidental API fees
-            resp = await camel_agent.astep(get_user_message())
+            with invocation("math_agent"):
+                resp = await camel_agent.astep(get_user_message())
             msgzero = resp.msgs[0]
-            msgzerojson = msgzero.to_dict()
-            print(msgzerojson)
+            logger.info(f"math_agent: {msgzero.content}", extra={"event": "agent_reply", "reply": msgzero.to_dict()})
             sleep(10)
 
 
@@ -54,10 +71,9 @@ async def create_math_agent(tools):
     )
     camel_agent = ChatAgent(
         system_message=sys_msg,
-        model=model,
-        tools=tools,
-        message_window_size=MESSAGE_WINDOW_SIZE,
-        token_limit=TOKEN_LIMIT
+        model=timed_model(rate_limited_model(model)),
+        tools=timed_camel_tools(tools),
+        memory=TokenBoundedMemory.for_model(model, token_budget=MEMORY_TOKEN_BUDGET, token_limit=TOKEN_LIMIT),
     )
     camel_agent.reset()
     camel_agent.memory.clear()
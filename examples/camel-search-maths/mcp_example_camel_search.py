@@ -1,5 +1,7 @@
 import asyncio
+import logging
 import os
+import sys
 from time import sleep
 
 from camel.agents import ChatAgent
@@ -12,36 +14,69 @@ from camel.types import ModelPlatformType, ModelType
 from prompts import get_tools_description, get_user_message
 from tools import JinaBrowsingToolkit
 from dotenv import load_dotenv
-from config import PLATFORM_TYPE, MODEL_TYPE, MODEL_CONFIG, MESSAGE_WINDOW_SIZE, TOKEN_LIMIT
+from config import PLATFORM_TYPE, MODEL_TYPE, MODEL_CONFIG, MEMORY_TOKEN_BUDGET, TOKEN_LIMIT
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "coralizer"))
+from coral_runtime.camel_memory import TokenBoundedMemory
+from coral_runtime.cpu_pool import async_tool
+from coral_runtime.logs import configure_logging, set_log_agent
+from coral_runtime.metrics import invocation, metrics_from_env, timed_camel_tools, timed_model, watch_loop_lag
+from coral_runtime.payloads import camel_fetch_payload, offloaded, payload_store_from_env
+from coral_runtime.prefetch import prefetcher_from_env
+from coral_runtime.ratelimit import rate_limited_model
+from coral_runtime.singleflight import coalesced
+
+logger = logging.getLogger(__name__)
 
 # load_dotenv()
 
 async def main():
+    configure_logging()
+    set_log_agent("search_agent")
+    metrics_from_env("search_agent")
+    watch_loop_lag()
     # Simply add the Coral server address as a tool
     coral_url = os.getenv("CORAL_CONNECTION_URL", default = "http://localhost:5555/devmode/exampleApplication/privkey/session1/sse?waitForAgents=3&agentId=search_agent")
     server = MCPClient(coral_url, timeout=300.0)
     mcp_toolkit = MCPToolkit([server])
 
     async with mcp_toolkit.connection() as connected_mcp_toolkit:
-        camel_agent = await create_search_agent(connected_mcp_toolkit)
+        camel_agent, prefetcher = await create_search_agent(connected_mcp_toolkit)
 
         # Step the agent continuously
         for i in range(20):  #This should be infinite, but for testing we limit it to 20 to avoid accidental API fees
-            resp = await camel_agent.astep(get_user_message())
+            with invocation("search_agent"):
+                resp = await camel_agent.astep(get_user_message())
             msgzero = resp.msgs[0]
-            msgzerojson = msgzero.to_dict()
-            print(msgzerojson)
+            logger.info(f"search_agent: {msgzero.content}", extra={"event": "agent_reply", "reply": msgzero.to_dict()})
+            if prefetcher is not None:
+                stats = prefetcher.stats()
+                logger.info(f"search_agent: prefetch {stats}", extra={"event": "prefetch", **stats})
             sleep(10)
 
 
 async def create_search_agent(connected_mcp_toolkit):
     search_toolkit = SearchToolkit()
     browse_toolkit = JinaBrowsingToolkit()
-    search_tools = [
-        FunctionTool(search_toolkit.search_google),
-        FunctionTool(browse_toolkit.get_url_content),
-        FunctionTool(browse_toolkit.get_url_content_with_context),
+    search_google = search_toolkit.search_google
+    browse_toolkit.prefetcher = prefetcher_from_env(browse_toolkit.fetch_page)
+    if browse_toolkit.prefetcher is not None:
+        # Start fetching the top hits while the model reads the search results.
+        search_google = browse_toolkit.prefetcher.after_search(search_google)
+    # CAMEL calls sync tools on the event loop that holds the Coral connection: run them elsewhere.
+    # All three are read-only, so equal calls in flight at the same time share one request.
+    search_functions = [
+        coalesced(async_tool(search_google)),
+        coalesced(async_tool(browse_toolkit.get_url_content)),
+        # Without prefetch, fetches and scans the whole page in a worker process, so only the URL and
+        # the matches cross over. With it, the page is already in this process's cache.
+        coalesced(async_tool(browse_toolkit.get_url_content_with_context, cpu=browse_toolkit.prefetcher is None)),
     ]
+    payloads = payload_store_from_env()
+    if payloads is not None:
+        # Whole pages go to the local payload store; the model and the thread get a preview and a reference.
+        search_functions = [offloaded(func, payloads) for func in search_functions] + [camel_fetch_payload(payloads)]
+    search_tools = [FunctionTool(func) for func in search_functions]
     tools = connected_mcp_toolkit.get_tools() + search_tools
     sys_msg = (
         f"""
@@ -62,14 +97,13 @@ async def create_search_agent(connected_mcp_toolkit):
     )
     camel_agent = ChatAgent(
         system_message=sys_msg,
-        model=model,
-        tools=tools,
-        message_window_size=MESSAGE_WINDOW_SIZE,
-        token_limit=TOKEN_LIMIT
+        model=timed_model(rate_limited_model(model)),
+        tools=timed_camel_tools(tools),
+        memory=TokenBoundedMemory.for_model(model, token_budget=MEMORY_TOKEN_BUDGET, token_limit=TOKEN_LIMIT),
     )
     camel_agent.reset()
     camel_agent.memory.clear()
-    return camel_agent
+    return camel_agent, browse_toolkit.prefetcher
 
 
 if __name__ == "__main__":
@@ -5,6 +5,9 @@ from camel.toolkits import BaseToolkit
 
 
 class JinaBrowsingToolkit(BaseToolkit):
+    # Optional coral_runtime.prefetch.Prefetcher built on fetch_page; pages then come from its cache.
+    prefetcher = None
+
     def get_url_content(self, url: str) -> str:
         r"""Fetch the content of a URL using the r.jina.ai service.
 
@@ -14,7 +17,15 @@ class JinaBrowsingToolkit(BaseToolkit):
         Returns:
             str: The markdown content of the URL.
         """
+        try:
+            if self.prefetcher is not None:
+                return self.prefetcher.get(url)
+            return self.fetch_page(url)
+        except requests.RequestException as e:
+            return f"Error fetching URL content: {e!s}"
 
+    def fetch_page(self, url: str) -> str:
+        r"""Fetch a URL through r.jina.ai, raising :obj:`requests.RequestException` on failure."""
         # Replace http with https and add https if not present
         if not url.startswith("https://"):
             url = "https://" + url.lstrip("https://").lstrip("http://")
@@ -27,12 +38,9 @@ class JinaBrowsingToolkit(BaseToolkit):
         auth_token = os.environ.get('JINA_AUTH_TOKEN')
         if auth_token:
             headers['Authorization'] = f'Bearer {auth_token}'
-        try:
-            response = requests.get(jina_url, headers=headers)
-            response.raise_for_status()
-            return response.text
-        except requests.RequestException as e:
-            return f"Error fetching URL content: {e!s}"
+        response = requests.get(jina_url, headers=headers)
+        response.raise_for_status()
+        return response.text
 
     def get_url_content_with_context(
         self,
@@ -58,10 +66,13 @@ class JinaBrowsingToolkit(BaseToolkit):
         if content.startswith("Error fetching URL content"):
             return content
 
+        # Lowercase once: pages run to megabytes, and this used to repeat per match.
+        haystack = content.lower()
+        needle = search_string.lower()
         instances = []
         start = 0
         while True:
-            index = content.lower().find(search_string.lower(), start)
+            index = haystack.find(needle, start)
             if index == -1 or len(instances) >= max_instances:
                 break
 
@@ -1,23 +1,34 @@
 import asyncio
 import os
-import json
 import logging
-from langchain_mcp_adapters.client import MultiServerMCPClient
 from langchain.prompts import ChatPromptTemplate
 from langchain.chat_models import init_chat_model
-from langchain.agents import create_tool_calling_agent, AgentExecutor
-from langchain.tools import Tool
+from langchain.agents import create_tool_calling_agent
+from langchain.tools import StructuredTool, Tool
 from dotenv import load_dotenv
-from anyio import ClosedResourceError
 import urllib.parse
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "coralizer"))
+from coral_runtime.connection import SupervisedConnection
+from coral_runtime.ratelimit import INTERACTIVE, rate_limited_async_client, set_priority
+from coral_runtime.executor import ModelTimer, create_concurrent_executor
+from coral_runtime.directory import AGENT_DIRECTORY_DESCRIPTION, AgentDirectory
+from coral_runtime.payloads import fetch_payload_tool, payload_store_from_env
+from coral_runtime.human import MentionRouter, SessionClosed, human_channel_from_env, serve_sessions
+from coral_runtime.routing import AgentRouter
+from coral_runtime.logs import configure_logging, set_log_agent
+from coral_runtime.metrics import invocation, metrics_from_env, watch_loop_lag
+from coral_runtime.schema import get_tools_description, schema_mode_from_env, log_savings
 
-# Setup logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 
+# Setup logging: queued, off the agent loop (CORAL_LOG_FORMAT=json for JSON lines)
+configure_logging()
+
 base_url = "http://localhost:5555/devmode/exampleApplication/privkey/session1/sse"
 params = {
     "waitForAgents": 2,
@@ -26,29 +37,34 @@ params = {
 }
 query_string = urllib.parse.urlencode(params)
 MCP_SERVER_URL = f"{base_url}?{query_string}"
+# Reconnects skip the waitForAgents handshake.
+RECONNECT_URL = f"{base_url}?{urllib.parse.urlencode({k: v for k, v in params.items() if k != 'waitForAgents'})}"
 
 AGENT_NAME = "user_interaction_agent"
 
-def get_tools_description(tools):
-    return "\n".join(
-        f"Tool: {tool.name}, Schema: {json.dumps(tool.args).replace('{', '{{').replace('}', '}}')}"
-        for tool in tools
-    )
+# Set in main(); adds the suggested target agent, or the cached agent directory, to each user request.
+router = None
+# Console by default; CORAL_HUMAN_CHANNEL=web serves many users at once from a local chat page.
+channel = human_channel_from_env()
 
 async def ask_human_tool(question: str) -> str:
-    print(f"Agent asks: {question}")
-    return input("Your response: ")
+    # Waits for the user of the session this invocation serves, without blocking the event loop.
+    response = await channel.ask(question)
+    if router is None:
+        return response
+    return router.annotate(response)
 
 async def create_interface_agent(client, tools):
-    tools_description = get_tools_description(tools)
+    tools_description = get_tools_description(tools, mode=schema_mode_from_env())
+    log_savings(AGENT_NAME, tools, logger.info)
     
     prompt = ChatPromptTemplate.from_messages([
         (
             "system",
             f"""You are an agent interacting with the tools from Coral Server and having your own Human Tool to ask have a conversation with Human. 
             Follow these steps in order:
-            1. Use `list_agents` to list all connected agents and  get their descriptions.
-            2. Use `ask_human` to ask, "How can I assist you today?" and capture the response.
+            1. Use `ask_human` to ask, "How can I assist you today?" and capture the response.
+            2. If the response ends with a "Suggested agent:" line, that agent was already matched to the request: select it and go to step 4. Otherwise the response ends with the connected agents and their descriptions (`agent_directory` returns them again at any time).
             3. Take 2 seconds to think and understand the user's intent and decide the right agent to handle the request based on list of agents. 
             4. If the user wants any information about the coral server, use the tools to get the information and pass it to the user. Do not send any message to any other agent, just give the information and go to Step 1.
             5. Once you have the right agent, use `create_thread` to create a thread with the selected agent. If no agent is available, use the `ask_human` tool to specify the agent you want to use.
@@ -69,53 +85,64 @@ async def create_interface_agent(client, tools):
             model_provider="openai",
             api_key=os.getenv("OPENAI_API_KEY"),
             temperature=0.3,
-            max_tokens=16000
+            max_tokens=16000,
+            http_async_client=rate_limited_async_client(),
+            callbacks=[ModelTimer()],
         )
 
     agent = create_tool_calling_agent(model, tools, prompt)
-    return AgentExecutor(agent=agent, tools=tools, verbose=True)
+    # The interface sends the mentions and waits for replies, so it has no mentions of its own to track.
+    return create_concurrent_executor(agent, tools, mentions=False)
 
 async def main():
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            async with MultiServerMCPClient(
-                connections={
-                    "coral": {
-                        "transport": "sse",
-                        "url": MCP_SERVER_URL,
-                        "timeout": 300,
-                        "sse_read_timeout": 300,
-                    }
-                }
-            ) as client:
-                logger.info(f"Connected to MCP server at {MCP_SERVER_URL}")
-                tools = client.get_tools() + [Tool(
-                    name="ask_human",
-                    func=None,
-                    coroutine=ask_human_tool,
-                    description="Ask the user a question and wait for a response."
-                )]
-                # logger.info(f"Tools Description:\n{get_tools_description(tools)}")
-                await (await create_interface_agent(client, tools)).ainvoke({})
-        except ClosedResourceError as e:
-            logger.error(f"ClosedResourceError on attempt {attempt + 1}: {e}")
-            if attempt < max_retries - 1:
-                logger.info("Retrying in 5 seconds...")
-                await asyncio.sleep(5)
-                continue
-            else:
-                logger.error("Max retries reached. Exiting.")
-                raise
-        except Exception as e:
-            logger.error(f"Unexpected error on attempt {attempt + 1}: {e}")
-            if attempt < max_retries - 1:
-                logger.info("Retrying in 5 seconds...")
-                await asyncio.sleep(5)
-                continue
-            else:
-                logger.error("Max retries reached. Exiting.")
+    # Model calls of the user-facing agent go ahead of queued worker calls.
+    set_priority(INTERACTIVE)
+    set_log_agent(AGENT_NAME)
+    metrics_from_env(AGENT_NAME)
+    watch_loop_lag()
+    sse = {"transport": "sse", "timeout": 300, "sse_read_timeout": 300}
+    async with SupervisedConnection(
+        "coral", {**sse, "url": MCP_SERVER_URL}, reconnect_connection={**sse, "url": RECONNECT_URL},
+    ) as coral, AgentDirectory(coral, self_id=params["agentId"]) as directory, channel, \
+            MentionRouter(coral, channel) as mentions:
+        logger.info(f"Connected to MCP server at {MCP_SERVER_URL}")
+        global router
+        router = AgentRouter(directory)
+        # Sessions share one agentId, so their wait_for_mentions calls go through one reader.
+        tools = mentions.tools(await coral.get_tools()) + [Tool(
+            name="ask_human",
+            func=None,
+            coroutine=ask_human_tool,
+            description="Ask the user a question and wait for a response."
+        ), StructuredTool.from_function(
+            func=directory.render,
+            name="agent_directory",
+            description=AGENT_DIRECTORY_DESCRIPTION,
+        )]
+        payloads = payload_store_from_env()
+        if payloads is not None:
+            # Worker answers may arrive as a preview plus a payload reference.
+            tools.append(fetch_payload_tool(payloads))
+        # logger.info(f"Tools Description:\n{get_tools_description(tools)}")
+        agent_executor = await create_interface_agent(coral, tools)
+
+        # The executor and tools are built once; after a dropped connection only the session is re-established.
+        async def converse(session_id):
+            try:
+                with invocation(AGENT_NAME):
+                    await agent_executor.ainvoke({})
+            except SessionClosed:
                 raise
+            except Exception as e:
+                logger.error(f"Error in agent loop for session {session_id}: {e}")
+                if coral.connected:
+                    await asyncio.sleep(5)
+                else:
+                    logger.info("Waiting for the Coral connection to recover...")
+                    await coral.wait_ready()
+
+        # One conversation loop per user session, all sharing the connection, tools and executor.
+        await serve_sessions(channel, converse)
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -1,26 +1,38 @@
 import asyncio
 import os
-import json
 import logging
 import re
 from langchain_mcp_adapters.client import MultiServerMCPClient
 from langchain.prompts import ChatPromptTemplate
 from langchain.chat_models import init_chat_model
-from langchain.agents import create_tool_calling_agent, AgentExecutor
+from langchain.agents import create_tool_calling_agent
 from langchain_core.tools import tool
 import worldnewsapi
 from worldnewsapi.rest import ApiException
 from dotenv import load_dotenv
 from anyio import ClosedResourceError
 import urllib.parse
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "coralizer"))
+from coral_runtime.answer_cache import answer_cache_from_env, answer_mentions, record_replies, toolset_key
+from coral_runtime.executor import ModelTimer, create_concurrent_executor
+from coral_runtime.payloads import fetch_payload_tool, offload_messages, offload_results, payload_store_from_env
+from coral_runtime.ratelimit import rate_limited_async_client
+from coral_runtime.logs import configure_logging, set_log_agent
+from coral_runtime.metrics import invocation, metrics_from_env, watch_loop_lag
+from coral_runtime.schema import get_tools_description, schema_mode_from_env, log_savings
+from coral_runtime.scratchpad import scratchpad_compactor_from_env
+from coral_runtime.singleflight import coalesce_tools
 
-# Setup logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 
+# Setup logging: queued, off the agent loop (CORAL_LOG_FORMAT=json for JSON lines)
+configure_logging()
+
 base_url = "http://localhost:5555/devmode/exampleApplication/privkey/session1/sse"
 params = {
     "waitForAgents": 2,
@@ -43,12 +55,6 @@ if not os.getenv("OPENAI_API_KEY"):
 if not os.getenv("WORLD_NEWS_API_KEY"):
     raise ValueError("WORLD_NEWS_API_KEY is not set in environment variables.")
 
-def get_tools_description(tools):
-    return "\n".join(
-        f"Tool: {tool.name}, Schema: {json.dumps(tool.args).replace('{', '{{').replace('}', '}}')}"
-        for tool in tools
-    )
-
 @tool
 def WorldNewsTool(
     text: str,
@@ -117,10 +123,12 @@ def WorldNewsTool(
         logger.error(f"Unexpected error in WorldNewsTool: {str(e)}")
         return {"result": f"Unexpected error: {str(e)}. Please try again later."}
 
-async def create_world_news_agent(client, tools, agent_tool):
-    tools_description = get_tools_description(tools)
-    agent_tools_description = get_tools_description(agent_tool)
-    prompt = ChatPromptTemplate.from_messages([
+async def create_world_news_agent(client, tools, agent_tool, mentions_input=False, **executor_options):
+    schema_mode = schema_mode_from_env()
+    tools_description = get_tools_description(tools, mode=schema_mode)
+    agent_tools_description = get_tools_description(agent_tool, mode=schema_mode)
+    log_savings(AGENT_NAME, tools, logger.info)
+    messages = [
         (
             "system",
             f"""You are an agent interacting with the tools from Coral Server and having your own tools. Your task is to perform any instructions coming from any agent. 
@@ -141,20 +149,29 @@ async def create_world_news_agent(client, tools, agent_tool):
                 ),
                 ("placeholder", "{agent_scratchpad}")
 
-    ])
+    ]
+    if mentions_input:
+        # Answer cache mode: mentions arrive as a human turn instead of via wait_for_mentions.
+        messages.insert(1, ("human", "{input}"))
+    prompt = ChatPromptTemplate.from_messages(messages)
 
     model = init_chat_model(
             model="gpt-4o-mini",
             model_provider="openai",
             api_key=os.getenv("OPENAI_API_KEY"),
             temperature=0.3,
-            max_tokens=16000
+            max_tokens=16000,
+            http_async_client=rate_limited_async_client(),
+            callbacks=[ModelTimer()],
         )
     agent = create_tool_calling_agent(model, tools, prompt)
-    return AgentExecutor(agent=agent, tools=tools, verbose=True)
+    return create_concurrent_executor(agent, tools, **executor_options)
 
 
 async def main():
+    set_log_agent(AGENT_NAME)
+    metrics_from_env(AGENT_NAME)
+    watch_loop_lag()
     async with MultiServerMCPClient(
         connections={
             "coral": {
@@ -166,15 +183,39 @@ async def main():
         }
     ) as client:
         logger.info(f"Connected to MCP server at {MCP_SERVER_URL}")
-        tools = client.get_tools() + [WorldNewsTool]
-        agent_tool = [WorldNewsTool]
+        coral_tools = client.get_tools()
+        # Read-only, so equal concurrent queries share one API call.
+        agent_tool = coalesce_tools([WorldNewsTool], names={WorldNewsTool.name})
+        cache = answer_cache_from_env()
+        pending = {}
+        if cache is not None:
+            toolset = toolset_key(coral_tools + agent_tool)
+            coral_tools = record_replies(coral_tools, pending, cache, toolset)
+        payloads = payload_store_from_env()
+        if payloads is not None:
+            # Large results go to the local payload store; threads carry a preview and a reference.
+            coral_tools = offload_messages(coral_tools, payloads)
+            agent_tool = offload_results(agent_tool, payloads) + [fetch_payload_tool(payloads)]
+        # Older news results in a long plan are digested so each model call stays within a token budget.
+        scratchpad = scratchpad_compactor_from_env(payloads)
+        executor_options = {}
+        if scratchpad is not None:
+            executor_options["trim_intermediate_steps"] = scratchpad
+            if payloads is None:
+                agent_tool = agent_tool + [fetch_payload_tool(scratchpad.store)]
+        tools = coral_tools + agent_tool
         # logger.info(f"Tools Description:\n{get_tools_description(tools)}")
-        agent_executor = await create_world_news_agent(client, tools, agent_tool)
+        agent_executor = await create_world_news_agent(client, tools, agent_tool, mentions_input=cache is not None,
+                                                       **executor_options)
         
         while True:
             try:
                 logger.info("Starting new agent invocation")
-                await agent_executor.ainvoke({"agent_scratchpad": []})
+                with invocation(AGENT_NAME):
+                    if cache is None:
+                        await agent_executor.ainvoke({"agent_scratchpad": []})
+                    else:
+                        await answer_mentions(AGENT_NAME, client.sessions["coral"], agent_executor, cache, toolset, pending)
                 logger.info("Completed agent invocation, restarting loop")
                 await asyncio.sleep(1)
             except Exception as e: